@@ -1,11 +1,17 @@
 import tkinter as tk
 from tkinter import filedialog, simpledialog, messagebox
 import json
-from PIL import Image
+from PIL import Image, ImageTk
 import io
 import math
 import lib_bonds as lb
 from lib_bonds import FLOWSIDE, FlyEdge, NODETYPE
+from lib_graph import GraphModel
+from lib_report import ReportJob
+from lib_spatial import SpatialGrid, density_raster, fit_bounds
+
+GRAPH_FILETYPES = [('JSON', '*.json'), ('Graph snapshot', f'*{lb.SNAPSHOT_SUFFIX}')]
+REPORT_POLL_MS = 100
 
 class GraphEditorApp:
     def __init__(self, root):
@@ -30,9 +36,8 @@ class GraphEditorApp:
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
         # State
-        self.nodes = []  # list of dicts: {id, x, y, label, type}
-        self.edges = []  # list of dicts: {id, startNodeId, endNodeId, label}
-        self.next_id = 1
+        # nodes {id, x, y, label, type, nodetype}, edges {id, startNodeId, endNodeId, label} and their bonds
+        self.graph = GraphModel()
         self.current_mode = 'select'  # 'select', 'edge', or NODETYPE.value
         self.current_nodetype = None  # Will store the NODETYPE when in node creation mode
         self.edge_start_node = None
@@ -50,6 +55,8 @@ class GraphEditorApp:
         self.box_select_last_pos = None  # Store last mouse position for box selection
         self.edge_drag_start = None    # Store start node for edge dragging
         self.edge_drag_end = None      # Store current mouse position for edge preview
+        self.report_job = None         # ReportJob running in the background, if any
+        self.report_edge_ids = []      # edge ids in the order of the job's bonds
 
         # Colors
         self.SELECTION_COLOR = '#3b82f6'  # blue-500
@@ -60,6 +67,15 @@ class GraphEditorApp:
         self.INACTIVE_BTN_BG = '#f5f5f5'  # gray-100
         self.INACTIVE_BTN_FG = 'black'    # black text
 
+        # Level of detail: below these zoom scales labels, then arrowheads and tees are dropped
+        # and below the last one nodes and edges are drawn as simplified geometry
+        self.LOD_LABEL_SCALE = 0.6
+        self.LOD_DECORATION_SCALE = 0.35
+        self.LOD_SIMPLE_SCALE = 0.2
+        self.VIEW_MARGIN = 40  # pixels drawn beyond the canvas edges
+        self.MINIMAP_SIZE = (160, 120)
+        self.MINIMAP_DELAY_MS = 300
+
         # Setup UI
         self.create_toolbar()
         self.create_canvas()
@@ -87,6 +103,8 @@ class GraphEditorApp:
         self.root.bind('<KeyPress-T>', self.handle_t_key)
         self.root.bind('<KeyPress-0>', self.handle_0_key)
         self.root.bind('<KeyPress-1>', self.handle_1_key)
+        self.root.bind('<KeyPress-m>', self.toggle_minimap)
+        self.root.bind('<KeyPress-M>', self.toggle_minimap)
 
         # Clipboard for copy/paste
         self.clipboard_nodes = []
@@ -128,7 +146,11 @@ class GraphEditorApp:
         # Action buttons
         tk.Button(toolbar, text="Save Graph", width=12, command=self.save_graph).pack(pady=2)
         tk.Button(toolbar, text="Load Graph", width=12, command=self.load_graph).pack(pady=2)
-        tk.Button(toolbar, text="Report", width=12, command=self.report).pack(pady=2)
+        self.report_btn = tk.Button(toolbar, text="Report", width=12, command=self.report)
+        self.report_btn.pack(pady=2)
+        self.cancel_report_btn = tk.Button(toolbar, text="Cancel Report", width=12, command=self.cancel_report,
+                                           state=tk.DISABLED)
+        self.cancel_report_btn.pack(pady=2)
         tk.Button(toolbar, text="Save PNG", width=12, command=self.save_png).pack(pady=2)
           # Delete and Clear buttons
         delete_btn = tk.Button(toolbar, text="Delete", width=12, command=self.delete_selected, state=tk.DISABLED)
@@ -149,6 +171,40 @@ class GraphEditorApp:
         self.canvas.bind('<B2-Motion>', self.do_pan)
         self.canvas.bind('<ButtonRelease-2>', self.end_pan)
         self.canvas.bind('<Button-3>', self.show_context_menu)  # Right-click context menu
+        self.canvas.bind('<Configure>', lambda event: self.draw_view())
+
+        # Canvas items kept per visible model element, updated in place by draw_view()
+        self.node_items = {}  # node_id: {'type', 'shape', 'label': item}
+        self.edge_items = {}  # edge_id: {'line', 'arrow', 'tee', 'label': item}
+        self.drawn_selected_nodes = set()  # drawn in the selection color
+        self.drawn_selected_edges = set()
+        self.lod = self.detail_level()
+        # World-coordinate index for hit testing and culling, kept up to date with the model:
+        # node positions and the boxes around edges (node center to node center)
+        self.node_grid = SpatialGrid()
+        self.edge_grid = SpatialGrid()
+        # Overlays, hidden until an edge drag or box selection shows them
+        self.edge_preview = self.canvas.create_line(0, 0, 0, 0, fill='gray', width=2, dash=(5, 5),
+                                                    state=tk.HIDDEN, tags=('edge_preview',))
+        self.edge_preview_arrow = self.canvas.create_polygon(0, 0, 0, 0, 0, 0, fill='gray', outline='gray',
+                                                             state=tk.HIDDEN, tags=('edge_preview',))
+        self.selection_box = self.canvas.create_rectangle(0, 0, 0, 0, outline=self.BOX_SELECT_COLOR, width=1,
+                                                          dash=(2, 2), state=tk.HIDDEN, tags=('selection_box',))
+
+        # Minimap over the bottom-right corner: a cached density image of the whole graph
+        # and the outline of the visible part; click or drag on it to move the view
+        width, height = self.MINIMAP_SIZE
+        self.minimap = tk.Canvas(self.main_container, width=width, height=height, bg='white',
+                                 highlightthickness=1, highlightbackground='gray')
+        self.minimap_picture = self.minimap.create_image(0, 0, anchor=tk.NW)
+        self.minimap_view = self.minimap.create_rectangle(0, 0, 0, 0, outline=self.SELECTION_COLOR, width=2)
+        self.minimap_bounds = (0.0, 0.0, 1.0)
+        self.minimap_image = None
+        self.minimap_job = None
+        self.show_minimap = False
+        self.minimap.bind('<Button-1>', self.on_minimap_click)
+        self.minimap.bind('<B1-Motion>', self.on_minimap_click)
+        self.toggle_minimap()
 
     def setup_context_menu(self):
         """Initialize the right-click context menu"""
@@ -205,13 +261,13 @@ class GraphEditorApp:
         status_text = mode_info.get(self.current_mode, "Ready")# Add selection information if in select mode
         if self.current_mode == 'select':
             if self.selected_nodes:
-                selected_nodes = [node for node in self.nodes if node['id'] in self.selected_nodes]
+                selected_nodes = [self.graph.nodes[node_id] for node_id in self.selected_nodes]
                 if len(selected_nodes) == 1:
                     status_text += f" | Selected Node: {selected_nodes[0]['label']}"
                 else:
                     status_text += f" | Selected {len(selected_nodes)} Nodes"
             if self.selected_edges:
-                selected_edges = [edge for edge in self.edges if edge['id'] in self.selected_edges]
+                selected_edges = [self.graph.edges[edge_id] for edge_id in self.selected_edges]
                 if len(selected_edges) == 1:
                     status_text += f" | Selected Edge: {selected_edges[0]['label']}"
                 else:
@@ -239,17 +295,17 @@ class GraphEditorApp:
             label = self.get_next_node_label(self.current_nodetype.value)
             # Determine if this is a junction (0 or 1) or regular node
             node_type = 'junction' if self.current_nodetype.value in ['0', '1'] else 'node'
-            self.nodes.append({
-                'id': self.next_id,
+            node = self.graph.add_node({
                 'x': x,
                 'y': y,
                 'label': label,
                 'type': node_type,
                 'nodetype': self.current_nodetype.value
             })
-            self.next_id += 1
             self.update_status()
-            self.draw()
+            self.index_node(node['id'])
+            self.draw_node(node['id'])
+            self.schedule_minimap()
         elif self.current_mode == 'edge':
             node = self.get_node_at(x, y)
             if node:
@@ -285,9 +341,9 @@ class GraphEditorApp:
                 if node['id'] in self.selected_nodes:
                     self.is_dragging = True
                     self.drag_start_offsets.clear()
-                    for n in self.nodes:
-                        if n['id'] in self.selected_nodes:
-                            self.drag_start_offsets[n['id']] = (x - n['x'], y - n['y'])
+                    for node_id in self.selected_nodes:
+                        n = self.graph.nodes[node_id]
+                        self.drag_start_offsets[node_id] = (x - n['x'], y - n['y'])
 
             elif edge:
                 if is_multi_select:
@@ -312,7 +368,8 @@ class GraphEditorApp:
 
             self.update_delete_button_state()
             self.update_status()
-            self.draw()
+            self.refresh_selection()
+            self.draw_overlays()
 
     def on_mouse_move(self, event):
         if self.is_panning: # Pan logic should take precedence if active
@@ -322,20 +379,20 @@ class GraphEditorApp:
         if self.is_dragging and self.current_mode == 'select':
             x, y = self.screen_to_world(event.x, event.y)
             # Move all selected nodes
-            for node in self.nodes:
-                if node['id'] in self.selected_nodes:
-                    offset_x, offset_y = self.drag_start_offsets[node['id']]
-                    node['x'] = x - offset_x
-                    node['y'] = y - offset_y
-            self.draw()
+            for node_id in self.selected_nodes:
+                node = self.graph.nodes[node_id]
+                offset_x, offset_y = self.drag_start_offsets[node_id]
+                node['x'] = x - offset_x
+                node['y'] = y - offset_y
+            self.redraw_nodes(self.selected_nodes)
         elif self.edge_drag_start and self.current_mode == 'edge':
             # Update edge drag preview
             self.edge_drag_end = (event.x, event.y)
-            self.draw()
+            self.draw_overlays()
         elif self.box_select_start and self.current_mode == 'select':
             # Update box selection
             self.box_select_last_pos = (event.x, event.y)
-            self.draw()
+            self.draw_overlays()
 
     def on_mouse_up(self, event):
         if self.is_panning: # Ensure panning state is correctly reset
@@ -345,6 +402,7 @@ class GraphEditorApp:
         if self.is_dragging and self.current_mode == 'select':
             self.is_dragging = False
             self.drag_start_offsets.clear()
+            self.schedule_minimap()
         elif self.edge_drag_start and self.current_mode == 'edge':
             # Check if we ended on a different node
             x, y = self.screen_to_world(event.x, event.y)
@@ -352,14 +410,14 @@ class GraphEditorApp:
             if end_node and end_node != self.edge_drag_start:
                 # Create the edge
                 next_number = self.get_next_edge_number()
-                self.edges.append({
-                    'id': self.next_id,
+                edge = self.graph.add_edge({
                     'startNodeId': self.edge_drag_start['id'],
                     'endNodeId': end_node['id'],
-                    'label': next_number,
-                    'flow_side': FLOWSIDE.IDK.value
+                    'label': next_number
                 })
-                self.next_id += 1
+                self.index_edge(edge['id'])
+                self.draw_edge(edge['id'])
+                self.raise_nodes()
                 self.update_status_temp(f"Edge created from {self.edge_drag_start['label']} to {end_node['label']}")
             else:
                 self.update_status_temp("Edge creation cancelled - must end on a different node")
@@ -367,7 +425,7 @@ class GraphEditorApp:
             # Clean up edge drag state
             self.edge_drag_start = None
             self.edge_drag_end = None
-            self.draw()
+            self.draw_overlays()
         elif self.box_select_start and self.current_mode == 'select':
             # Get selection box coordinates in screen space
             x1, y1 = self.box_select_start
@@ -384,23 +442,20 @@ class GraphEditorApp:
                 self.selected_edges.clear()
             
             # Select nodes in box
-            for node in self.nodes:
-                if wx1 <= node['x'] <= wx2 and wy1 <= node['y'] <= wy2:
-                    self.selected_nodes.add(node['id'])
+            in_box = self.node_grid.query(wx1, wy1, wx2, wy2)
+            self.selected_nodes |= in_box
             
             # Select edges with both endpoints in box
-            for edge in self.edges:
-                start_node = next((n for n in self.nodes if n['id'] == edge['startNodeId']), None)
-                end_node = next((n for n in self.nodes if n['id'] == edge['endNodeId']), None)
-                if start_node and end_node:
-                    if (wx1 <= start_node['x'] <= wx2 and wy1 <= start_node['y'] <= wy2 and
-                        wx1 <= end_node['x'] <= wx2 and wy1 <= end_node['y'] <= wy2):
+            for node_id in in_box:
+                for edge in self.graph.incident(node_id):
+                    if edge['startNodeId'] in in_box and edge['endNodeId'] in in_box:
                         self.selected_edges.add(edge['id'])
             
             # Clean up box selection
             self.box_select_start = None
             self.box_select_last_pos = None
-            self.draw()
+            self.refresh_selection()
+            self.draw_overlays()
             self.update_status()
             self.update_delete_button_state()
 
@@ -415,7 +470,10 @@ class GraphEditorApp:
             self.pan_x += dx
             self.pan_y += dy
             self.last_mouse = (event.x, event.y)
-            self.draw()
+            # Sizes are in screen pixels, so panning shifts every item by the same amount;
+            # only the items entering or leaving the view need drawing
+            self.canvas.move('graph', dx, dy)
+            self.draw_view(refresh=False)
 
     def end_pan(self, event):
         self.is_panning = False
@@ -428,11 +486,13 @@ class GraphEditorApp:
         # adjust pan to zoom on cursor
         self.pan_x = event.x - wx * self.scale
         self.pan_y = event.y - wy * self.scale
-        self.draw()
+        self.draw_view()
 
     def get_node_at(self, x, y):
-        # Check in reverse order so top nodes are found first (if overlapping)
-        for node in reversed(self.nodes):
+        # Only nodes within the largest hit area (half a junction width) can be hit
+        hits = []
+        for node_id in self.node_grid.near(x, y, 15 / self.scale):
+            node = self.graph.nodes[node_id]
             # Define hit area based on node type, in world coordinates
             if node['type'] == 'junction':
                 # Junction: rectangle centered at node['x'], node['y']
@@ -441,7 +501,7 @@ class GraphEditorApp:
                 half_height_world = (3) / self.scale # 3 is half of JUNCTION_HEIGHT in HTML
                 if (node['x'] - half_width_world <= x <= node['x'] + half_width_world and
                     node['y'] - half_height_world <= y <= node['y'] + half_height_world):
-                    return node
+                    hits.append(node)
             else: # 'node' type
                 # Node: circle centered at node['x'], node['y']
                 # Radius is fixed in screen pixels (5), so convert to world for hit check
@@ -449,17 +509,17 @@ class GraphEditorApp:
                 hit_radius_world = 10 / self.scale 
                 dist_sq = (x - node['x'])**2 + (y - node['y'])**2
                 if dist_sq < hit_radius_world**2:
-                    return node
-        return None
+                    hits.append(node)
+        # Newest node first (drawn on top if overlapping)
+        return max(hits, key=lambda n: n['id']) if hits else None
 
     def get_edge_at(self, x, y):
         # Convert world coordinates to screen coordinates for hit testing
         tolerance = 5 / self.scale  # 5 pixels tolerance in world coordinates
-        for edge in reversed(self.edges):
-            start_node = next((n for n in self.nodes if n['id'] == edge['startNodeId']), None)
-            end_node = next((n for n in self.nodes if n['id'] == edge['endNodeId']), None)
-            if not start_node or not end_node:
-                continue
+        hits = []
+        for edge_id in self.edge_grid.near(x, y, tolerance):
+            edge = self.graph.edges[edge_id]
+            start_node, end_node = self.graph.ends(edge_id)
 
             # Calculate distance from point to line segment
             x1, y1 = start_node['x'], start_node['y']
@@ -477,8 +537,8 @@ class GraphEditorApp:
             
             dist_sq = (px-proj_x)**2 + (py-proj_y)**2
             if dist_sq <= tolerance**2:
-                return edge
-        return None
+                hits.append(edge)
+        return max(hits, key=lambda e: e['id']) if hits else None
 
     def get_edge_connection_point(self, source_node, target_node):
         """Calculate the point where an edge should connect to a node, with appropriate offset."""
@@ -517,173 +577,320 @@ class GraphEditorApp:
                 'y': source_node['y'] + NODE_CONNECTION_OFFSET * math.sin(angle)
             }
 
-    def draw_arrowhead(self, x1, y1, x2, y2, color):
-        """Draw a single-wing arrowhead at point (x2, y2)."""
+    def arrowhead_coords(self, x1, y1, x2, y2, headlen=10, angle_wing=math.pi / 7):
+        """Polygon (tip, wing, base) of a single-wing arrowhead at point (x2, y2)."""
         # Calculate angle of the line
         angle = math.atan2(y2 - y1, x2 - x1)
-        
-        # Arrowhead parameters
-        headlen = 10  # Length of arrowhead
-        angle_wing = math.pi / 7  # Angle of the wing (about 25.7 degrees)
-        
+
         # Calculate the point for the single wing
         wing_x = x2 - headlen * math.cos(angle - angle_wing)
         wing_y = y2 - headlen * math.sin(angle - angle_wing)
-        
+
         # Calculate a point halfway back along the edge for the base of the arrowhead
         base_x = x2 - headlen * 0.5 * math.cos(angle)
         base_y = y2 - headlen * 0.5 * math.sin(angle)
-        
-        # Draw filled arrowhead
-        self.canvas.create_polygon(
-            x2, y2,  # Tip
-            wing_x, wing_y,  # Wing point
-            base_x, base_y,  # Base point
-            fill=color, outline=color
-        )
+        return x2, y2, wing_x, wing_y, base_x, base_y
 
-    def draw_tee(self, x, y, angle, color, length=12):
-        """Draw a Tee (perpendicular line) at (x, y) with given angle and length."""
-        # Tee is perpendicular to the edge
+    def tee_coords(self, x, y, angle, length=12):
+        """Line of a Tee (perpendicular to the edge) at (x, y) with given angle and length."""
         perp_angle = angle + math.pi / 2
         dx = (length / 2) * math.cos(perp_angle)
         dy = (length / 2) * math.sin(perp_angle)
-        x1 = x - dx
-        y1 = y - dy
-        x2 = x + dx
-        y2 = y + dy
-        self.canvas.create_line(x1, y1, x2, y2, fill=color, width=3)
+        return x - dx, y - dy, x + dx, y + dy
+
+    def edge_screen_coords(self, edge_id):
+        """Screen coordinates (x1, y1, x2, y2) of an edge between its connection points."""
+        start_node, end_node = self.graph.ends(edge_id)
+        start_point = self.get_edge_connection_point(start_node, end_node)
+        end_point = self.get_edge_connection_point(end_node, start_node)
+        return (*self.world_to_screen(start_point['x'], start_point['y']),
+                *self.world_to_screen(end_point['x'], end_point['y']))
+
+    def index_node(self, node_id):
+        node = self.graph.nodes[node_id]
+        self.node_grid.insert(node_id, node['x'], node['y'])
+
+    def index_edge(self, edge_id):
+        start_node, end_node = self.graph.ends(edge_id)
+        self.edge_grid.insert(edge_id, start_node['x'], start_node['y'], end_node['x'], end_node['y'])
+
+    def detail_level(self):
+        """3 full detail, 2 without labels, 1 without arrowheads and tees, 0 simplified geometry."""
+        if self.scale >= self.LOD_LABEL_SCALE:
+            return 3
+        if self.scale >= self.LOD_DECORATION_SCALE:
+            return 2
+        if self.scale >= self.LOD_SIMPLE_SCALE:
+            return 1
+        return 0
+
+    def visible_world_rect(self):
+        """World rectangle (x1, y1, x2, y2) shown by the canvas, with a margin for labels."""
+        margin = self.VIEW_MARGIN
+        x1, y1 = self.screen_to_world(-margin, -margin)
+        x2, y2 = self.screen_to_world(self.canvas.winfo_width() + margin, self.canvas.winfo_height() + margin)
+        return x1, y1, x2, y2
+
+    def _item_part(self, items, part, create):
+        """The item of one part of a node or edge, created on first use."""
+        if part not in items:
+            items[part] = create()
+        return items[part]
+
+    def _drop_part(self, items, part):
+        if part in items:
+            self.canvas.delete(items.pop(part))
+
+    def draw_edge(self, edge_id):
+        """Create or update the canvas items (line, arrowhead, tee, label) of one edge at the current detail level."""
+        edge = self.graph.edges[edge_id]
+        if self.lod == 0:
+            # Simplified geometry: center to center, no connection offsets
+            start_node, end_node = self.graph.ends(edge_id)
+            x1, y1 = self.world_to_screen(start_node['x'], start_node['y'])
+            x2, y2 = self.world_to_screen(end_node['x'], end_node['y'])
+        else:
+            x1, y1, x2, y2 = self.edge_screen_coords(edge_id)
+        # Set edge color based on selection
+        is_selected = edge_id in self.selected_edges
+        edge_color = self.SELECTION_COLOR if is_selected else self.DEFAULT_COLOR
+        if is_selected:
+            self.drawn_selected_edges.add(edge_id)
+        else:
+            self.drawn_selected_edges.discard(edge_id)
+
+        canvas = self.canvas
+        tags = ("graph", "edge", f"edge_{edge_id}")
+        items = self.edge_items.get(edge_id)
+        if items is None:
+            items = self.edge_items[edge_id] = {'line': canvas.create_line(0, 0, 0, 0, tags=tags)}
+        canvas.coords(items['line'], x1, y1, x2, y2)
+        canvas.itemconfig(items['line'], fill=edge_color, width=2 if is_selected else 1)
+
+        if self.lod >= 2:
+            arrow = self._item_part(items, 'arrow', lambda: canvas.create_polygon(0, 0, 0, 0, 0, 0, tags=tags))
+            canvas.coords(arrow, *self.arrowhead_coords(x1, y1, x2, y2))
+            canvas.itemconfig(arrow, fill=edge_color, outline=edge_color)
+        else:
+            self._drop_part(items, 'arrow')
+
+        # Tee at start if flow_side == SRC, at end if flow_side == DEST
+        flow_side = self.graph.flow_side(edge_id)
+        if self.lod >= 2 and flow_side != FLOWSIDE.IDK:
+            tee = self._item_part(items, 'tee', lambda: canvas.create_line(0, 0, 0, 0, width=3, tags=tags))
+            x, y = (x1, y1) if flow_side == FLOWSIDE.SRC else (x2, y2)
+            canvas.coords(tee, *self.tee_coords(x, y, math.atan2(y2 - y1, x2 - x1)))
+            canvas.itemconfig(tee, fill=edge_color)
+        else:
+            self._drop_part(items, 'tee')
+
+        if self.lod >= 3:
+            # Label slightly to the left of and above the midpoint
+            label = self._item_part(items, 'label', lambda: canvas.create_text(
+                0, 0, font=("Inter", 10), tags=("graph", "edge_label", f"edge_label_{edge_id}")))
+            canvas.coords(label, (x1 + x2) / 2 - 10, (y1 + y2) / 2 - 10)
+            canvas.itemconfig(label, text=edge['label'], fill=edge_color)
+        else:
+            self._drop_part(items, 'label')
+
+    def draw_node(self, node_id):
+        """Create or update the canvas items (shape, label) of one node or junction at the current detail level."""
+        node = self.graph.nodes[node_id]
+        x, y = self.world_to_screen(node['x'], node['y'])
+        # Set node color based on selection
+        is_selected = node_id in self.selected_nodes
+        node_color = self.SELECTION_COLOR if is_selected else self.DEFAULT_COLOR
+        if is_selected:
+            self.drawn_selected_nodes.add(node_id)
+        else:
+            self.drawn_selected_nodes.discard(node_id)
+
+        canvas = self.canvas
+        is_junction = node['type'] == 'junction'
+        items = self.node_items.get(node_id)
+        if items is not None and items['type'] != node['type']:
+            # A loaded graph reused the id for the other kind of node
+            self.delete_items(self.node_items.pop(node_id))
+            items = None
+        if items is None:
+            create = canvas.create_rectangle if is_junction else canvas.create_oval
+            items = self.node_items[node_id] = {
+                'type': node['type'],
+                'shape': create(0, 0, 0, 0, tags=("graph", "node", f"node_{node_id}")),
+            }
+        # Simplified geometry: smaller shapes when zoomed far out
+        half_w, half_h = ((15, 3) if is_junction else (5, 5)) if self.lod > 0 else ((6, 1.5) if is_junction else (2, 2))
+        canvas.coords(items['shape'], x - half_w, y - half_h, x + half_w, y + half_h)
+        canvas.itemconfig(items['shape'], fill=node_color)
+        if self.lod >= 3:
+            label = self._item_part(items, 'label', lambda: canvas.create_text(
+                0, 0, font=("Inter", 10), tags=("graph", "node_label", f"node_label_{node_id}")))
+            canvas.coords(label, x, y - 15 if is_junction else y + 15)
+            canvas.itemconfig(label, text=node['label'], fill=node_color)
+        else:
+            self._drop_part(items, 'label')
+
+    def delete_items(self, items):
+        self.canvas.delete(*(item for part, item in items.items() if part != 'type'))
 
     def draw(self):
-        self.canvas.delete('all')
-        # draw edges
-        for edge in self.edges:
-            start_node_obj = next((n for n in self.nodes if n['id'] == edge['startNodeId']), None)
-            end_node_obj = next((n for n in self.nodes if n['id'] == edge['endNodeId']), None)
-            if not start_node_obj or not end_node_obj:
-                continue
+        """
+        Bring the canvas in line with the model after it changed: the spatial index is
+        updated for every node and edge, then draw_view draws the visible part.
+        """
+        for node_id in [n for n in self.node_grid.boxes if n not in self.graph.nodes]:
+            self.node_grid.remove(node_id)
+        for edge_id in [e for e in self.edge_grid.boxes if e not in self.graph.edges]:
+            self.edge_grid.remove(edge_id)
+        for node_id in self.graph.nodes:
+            self.index_node(node_id)
+        for edge_id in self.graph.edges:
+            self.index_edge(edge_id)
+        self.draw_view()
+        self.schedule_minimap()
+
+    def draw_view(self, refresh=True):
+        """
+        Draw the nodes and edges inside the visible world rectangle at the detail level of the
+        current zoom; items that left the view are deleted. Items are kept per node and edge
+        and only moved and recolored. With refresh=False items still in view are assumed to
+        be in place (after canvas.move while panning) and only items entering the view are drawn.
+        """
+        lod = self.detail_level()
+        if lod != self.lod:
+            self.lod = lod
+            refresh = True
+        view = self.visible_world_rect()
+        node_ids = self.node_grid.query(*view)
+        edge_ids = self.edge_grid.query(*view)
+
+        for node_id in [n for n in self.node_items if n not in node_ids]:
+            self.delete_items(self.node_items.pop(node_id))
+            self.drawn_selected_nodes.discard(node_id)
+        for edge_id in [e for e in self.edge_items if e not in edge_ids]:
+            self.delete_items(self.edge_items.pop(edge_id))
+            self.drawn_selected_edges.discard(edge_id)
+
+        created = False
+        for edge_id in edge_ids:
+            if refresh or edge_id not in self.edge_items:
+                created |= edge_id not in self.edge_items
+                self.draw_edge(edge_id)
+        for node_id in node_ids:
+            if refresh or node_id not in self.node_items:
+                created |= node_id not in self.node_items
+                self.draw_node(node_id)
+        if created:
+            self.raise_nodes()
+        self.draw_overlays()
+        self.draw_minimap_view()
+
+    def raise_nodes(self):
+        """Keep nodes on top of edges created after them."""
+        self.canvas.tag_raise('node')
+        self.canvas.tag_raise('node_label')
+
+    def redraw_nodes(self, node_ids):
+        """Update only the given nodes and the edges touching them, e.g. while dragging."""
+        edge_ids = {edge['id'] for node_id in node_ids for edge in self.graph.incident(node_id)}
+        for node_id in node_ids:
+            self.index_node(node_id)
+        for edge_id in edge_ids:
+            self.index_edge(edge_id)
+            self.draw_edge(edge_id)
+        for node_id in node_ids:
+            self.draw_node(node_id)
+
+    def refresh_selection(self):
+        """Recolor the nodes and edges whose selection changed since they were drawn."""
+        for node_id in (self.selected_nodes ^ self.drawn_selected_nodes) & self.node_items.keys():
+            self.draw_node(node_id)
+        for edge_id in (self.selected_edges ^ self.drawn_selected_edges) & self.edge_items.keys():
+            self.draw_edge(edge_id)
+
+    def schedule_minimap(self):
+        """Re-render the minimap image once the model stops changing."""
+        if self.minimap_job is not None:
+            self.root.after_cancel(self.minimap_job)
+        self.minimap_job = self.root.after(self.MINIMAP_DELAY_MS, self.render_minimap)
+
+    def render_minimap(self):
+        """Cache a downsampled density image of the whole graph for the minimap."""
+        self.minimap_job = None
+        width, height = self.MINIMAP_SIZE
+        xs = [node['x'] for node in self.graph.nodes.values()]
+        ys = [node['y'] for node in self.graph.nodes.values()]
+        self.minimap_bounds = fit_bounds(xs, ys, width, height)
+        raster = density_raster(xs, ys, width, height, self.minimap_bounds)
+        # Points in the diagram colors on white
+        image = Image.fromarray(255 - raster).convert('RGB')
+        self.minimap_image = ImageTk.PhotoImage(image)
+        self.minimap.itemconfig(self.minimap_picture, image=self.minimap_image)
+        self.draw_minimap_view()
+
+    def draw_minimap_view(self):
+        """Outline the visible part of the graph on the cached minimap image."""
+        x0, y0, scale = self.minimap_bounds
+        x1, y1, x2, y2 = self.visible_world_rect()
+        margin = self.VIEW_MARGIN / self.scale
+        self.minimap.coords(self.minimap_view, (x1 + margin - x0) * scale, (y1 + margin - y0) * scale,
+                            (x2 - margin - x0) * scale, (y2 - margin - y0) * scale)
+
+    def on_minimap_click(self, event):
+        """Center the view on the clicked point of the minimap."""
+        x0, y0, scale = self.minimap_bounds
+        wx, wy = x0 + event.x / scale, y0 + event.y / scale
+        self.pan_x = self.canvas.winfo_width() / 2 - wx * self.scale
+        self.pan_y = self.canvas.winfo_height() / 2 - wy * self.scale
+        self.draw_view()
+
+    def toggle_minimap(self, event=None):
+        self.show_minimap = not self.show_minimap
+        if self.show_minimap:
+            self.minimap.place(in_=self.canvas, relx=1.0, rely=1.0, x=-8, y=-8, anchor=tk.SE)
+        else:
+            self.minimap.place_forget()
 
-            # Get connection points with offsets
-            start_point = self.get_edge_connection_point(start_node_obj, end_node_obj)
-            end_point = self.get_edge_connection_point(end_node_obj, start_node_obj)
-            
-            # Convert to screen coordinates
-            x1, y1 = self.world_to_screen(start_point['x'], start_point['y'])
-            x2, y2 = self.world_to_screen(end_point['x'], end_point['y'])
-              # Set edge color based on selection
-            is_selected = edge['id'] in self.selected_edges
-            edge_color = self.SELECTION_COLOR if is_selected else self.DEFAULT_COLOR
-            
-            # Draw the edge line
-            self.canvas.create_line(
-                x1, y1, x2, y2,
-                fill=edge_color,
-                width=2 if is_selected else 1,
-                tags=("edge", f"edge_{edge['id']}")
-            )
-            
-            # Draw custom arrowhead
-            self.draw_arrowhead(x1, y1, x2, y2, edge_color)
-
-            # Draw Tee at start if flow_side == SRC, at end if flow_side == DEST
-            flow_side = edge.get('flow_side', 0)
-            angle = math.atan2(y2 - y1, x2 - x1)
-            if flow_side == FLOWSIDE.SRC.value:
-                self.draw_tee(x1, y1, angle, edge_color)
-            elif flow_side == FLOWSIDE.DEST.value:
-                self.draw_tee(x2, y2, angle, edge_color)
-            
-            # Draw label at midpoint
-            mx = (x1 + x2) / 2 - 10  # Offset label slightly to the left of the midpoint
-            my = (y1 + y2) / 2 - 10  # Offset label slightly above the line
-            self.canvas.create_text(
-                mx, my,
-                text=edge['label'],
-                font=("Inter", 10),
-                fill=edge_color,
-                tags=("edge_label", f"edge_label_{edge['id']}"))
-        
-        # draw nodes
-        for node in self.nodes:
-            x, y = self.world_to_screen(node['x'], node['y'])            # Set node color based on selection
-            is_selected = node['id'] in self.selected_nodes
-            node_color = self.SELECTION_COLOR if is_selected else self.DEFAULT_COLOR
-            
-            if node['type']=='junction':
-                self.canvas.create_rectangle(x-15, y-3, x+15, y+3, 
-                                         fill=node_color,
-                                         tags=("node", f"node_{node['id']}"))
-                self.canvas.create_text(x, y-15, 
-                                    text=node['label'], 
-                                    font=("Inter", 10),
-                                    fill=node_color,
-                                    tags=("node_label", f"node_label_{node['id']}"))
-            else:
-                self.canvas.create_oval(x-5, y-5, x+5, y+5, 
-                                    fill=node_color,
-                                    tags=("node", f"node_{node['id']}"))
-                self.canvas.create_text(x, y+15, 
-                                    text=node['label'], 
-                                    font=("Inter", 10),
-                                    fill=node_color,                                    tags=("node_label", f"node_label_{node['id']}"))        # Draw edge drag preview if in progress
+    def draw_overlays(self):
+        """Edge drag preview and selection box, shown on top of the graph while in use."""
+        canvas = self.canvas
         if self.edge_drag_start and self.edge_drag_end and self.current_mode == 'edge':
-            # Get start node screen position
+            # Start at the node, end at the mouse (already in screen coordinates)
             start_x, start_y = self.world_to_screen(self.edge_drag_start['x'], self.edge_drag_start['y'])
-            # End position is already in screen coordinates
             end_x, end_y = self.edge_drag_end
-            
-            # Draw preview line with dashed style
-            self.canvas.create_line(
-                start_x, start_y, end_x, end_y,
-                fill='gray',
-                width=2,
-                dash=(5, 5),  # Dashed line for preview
-                tags=('edge_preview',)
-            )
-            
-            # Draw small arrowhead at end
-            angle = math.atan2(end_y - start_y, end_x - start_x)
-            headlen = 8
-            angle_wing = math.pi / 6
-            wing_x = end_x - headlen * math.cos(angle - angle_wing)
-            wing_y = end_y - headlen * math.sin(angle - angle_wing)
-            base_x = end_x - headlen * 0.5 * math.cos(angle)
-            base_y = end_y - headlen * 0.5 * math.sin(angle)
-            
-            self.canvas.create_polygon(
-                end_x, end_y,
-                wing_x, wing_y,
-                base_x, base_y,
-                fill='gray', outline='gray',
-                tags=('edge_preview_arrow',)
-            )
-
-        # Re-draw selection box if it exists (must be drawn last to appear on top)
+            canvas.coords(self.edge_preview, start_x, start_y, end_x, end_y)
+            canvas.coords(self.edge_preview_arrow,
+                          *self.arrowhead_coords(start_x, start_y, end_x, end_y, headlen=8, angle_wing=math.pi / 6))
+            canvas.itemconfig('edge_preview', state=tk.NORMAL)
+            canvas.tag_raise('edge_preview')
+        else:
+            canvas.itemconfig('edge_preview', state=tk.HIDDEN)
+
         if self.box_select_start and self.box_select_last_pos:
             x1, y1 = self.box_select_start
             x2, y2 = self.box_select_last_pos
-            self.canvas.create_rectangle(
-                min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2),
-                outline=self.BOX_SELECT_COLOR,
-                width=1,
-                dash=(2, 2),  # Creates a dashed line effect
-                tags=('selection_box',)
-            )
+            canvas.coords(self.selection_box, min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+            canvas.itemconfig(self.selection_box, state=tk.NORMAL)
+            canvas.tag_raise(self.selection_box)
+        else:
+            canvas.itemconfig(self.selection_box, state=tk.HIDDEN)
 
     def save_graph(self):
-        data = {'nodes': self.nodes, 'edges': self.edges, 'next_id': self.next_id}
-        path = filedialog.asksaveasfilename(defaultextension='.json', filetypes=[('JSON','*.json')])
+        data = self.graph.to_json()
+        path = filedialog.asksaveasfilename(defaultextension='.json', filetypes=GRAPH_FILETYPES)
         if path:
-            with open(path, 'w') as f:
-                json.dump(data, f, indent=2)
+            if path.endswith(lb.SNAPSHOT_SUFFIX):
+                lb.save_snapshot(path, data)
+            else:
+                with open(path, 'w') as f:
+                    json.dump(data, f, indent=2)
 
     def load_graph(self):
-        path = filedialog.askopenfilename(filetypes=[('JSON','*.json')])
+        path = filedialog.askopenfilename(filetypes=GRAPH_FILETYPES)
         if path:
-            with open(path) as f:
-                data = json.load(f)
+            try:
+                data = lb.read_graph_data(path)
                 # Ensure all nodes have 'nodetype' set, default based on type or label
-                self.nodes = []
                 for node in data['nodes']:
                     if 'nodetype' not in node:
                         # Try to infer nodetype from label for backward compatibility
@@ -693,77 +900,71 @@ class GraphEditorApp:
                         except ValueError:
                             # Default to SE for regular nodes, 0 for junctions
                             node['nodetype'] = '0' if node.get('type') == 'junction' else 'SE'
-                    self.nodes.append(node)
-                
-                # Ensure all edges have 'flow_side' set, default to 0 (IDK)
-                self.edges = [dict(edge, flow_side=edge.get('flow_side', FLOWSIDE.IDK.value)) for edge in data['edges']]
-                self.next_id = data.get('next_id', self.next_id)
-                self.draw()
-    def get_unique_node_identifier(self, node):
-        """Generate a unique identifier for a node based on its type and id."""
-        nodetype = node.get('nodetype', 'SE')
-        id = node.get('id', 0)
-        return f"{nodetype}_{id:02d}"  # Format id with leading zeros for consistency
 
+                # Edges without 'flow_side' start with IDK causality
+                graph = GraphModel.from_json(data)
+            except (OSError, ValueError, KeyError, TypeError) as err:
+                # keep the current graph; a half-read file must not replace it
+                messagebox.showerror("Open Graph", f"Cannot load {path}:\n{err}")
+                self.update_status_temp("Load failed")
+                return
+            self.graph = graph
+            self.selected_nodes.clear()
+            self.selected_edges.clear()
+            self.draw()
     def report(self):
-        # Save the current graph to graph.json in the workspace
-        # data = {
-        #     'nodes': self.nodes,
-        #     'edges': self.edges,
-        #     'next_id': self.next_id
-        # }
-
-        ns = [ self.get_unique_node_identifier(node) for node in self.nodes ]  # Create unique identifiers for nodes
-        ns = list(set(ns))  # Remove duplicates
-
-        # create edge list
-        es = []
-
-        for edge in self.edges:
-            num = int(edge.get("label", 0))
-            start_node_id = 0
-            end_node_id = 0
-
-            start_node_id = edge["startNodeId"] if "startNodeId" in edge else 0
-            end_node_id = edge["endNodeId"] if "endNodeId" in edge else 0
-
-            start_node_name = "IDK"
-            for node in self.nodes:
-                if node.get("id", 0) == start_node_id:
-                    start_node_name = self.get_unique_node_identifier(node)
-
-            end_node_name = "IDK"
-            for node in self.nodes:
-                if node.get("id", 0) == end_node_id:
-                    end_node_name = self.get_unique_node_identifier(node)
-
-            es.append(FlyEdge(label_num=num, src=start_node_name, dest=end_node_name, pwr_to_dest=1, flow_side=FLOWSIDE.IDK))
+        # Causality, plot and equations run in a background process; poll_report applies the results
+        if self.report_job is not None:
+            self.update_status_temp("Report already running")
+            return
+        try:
+            es = self.graph.bonds()
+        except ValueError as err:
+            self.update_status_temp(str(err))
+            return
+        self.report_edge_ids = list(self.graph.edges)
+        self.report_job = ReportJob(es, self.graph.node_names(), "graph.png", "bond_equations.txt").start()
+        self.report_btn.config(state=tk.DISABLED)
+        self.cancel_report_btn.config(state=tk.NORMAL)
+        self.root.after(REPORT_POLL_MS, self.poll_report)
+
+    def apply_report_causality(self, flow_sides):
+        # Edges deleted or re-created while the report ran keep their own causality
+        job_bonds = self.report_job.bonds
+        for edge_id, bond, flow_side in zip(self.report_edge_ids, job_bonds, flow_sides):
+            if edge_id in self.graph.edges and self.graph.bond(edge_id) is bond:
+                bond.flow_side = FLOWSIDE(flow_side)
+        self.draw()
 
-        lb.assign_causality_to_all_nodes(es)
-        lb.plot_graph(es, ns, f"graph.png")
-        lb.report_equations(es, report_all=True, file_name=f"bond_equations.txt")
+    def poll_report(self):
+        job = self.report_job
+        if job is None:
+            return
+        for kind, value in job.poll():
+            if kind in ("causality", "done"):
+                self.apply_report_causality(value)
+        if job.result is not None:
+            for e in job.bonds:
+                # print edge data
+                print(f"Edge {e.num:2d}: {e.src:5s} -> {e.dest:5s}, Flow Side: {e.flow_side.name}")
+            self.finish_report(f"Report done in {job.elapsed:.1f} s: graph.png, bond_equations.txt")
+        elif job.error is not None:
+            self.finish_report(f"Report failed: {job.error}", duration=6000)
+        else:
+            self.status_bar.config(text=f"Report: {job.stage}... {job.elapsed:.0f} s (Cancel Report to stop)")
+            self.root.after(REPORT_POLL_MS, self.poll_report)
 
-        
-        for e in es:
-            target_edge = next((edge for edge in self.edges if int(edge['label']) == e.num), None)
-            # print flow_side
-            # if e.flow_side == FLOWSIDE.SRC, set edges[num].flow_side = FLOWSIDE.SRC
-            if e.flow_side == FLOWSIDE.SRC and target_edge:
-                target_edge['flow_side'] = FLOWSIDE.SRC.value
-            elif e.flow_side == FLOWSIDE.DEST and target_edge:
-                target_edge['flow_side'] = FLOWSIDE.DEST.value
-            
-            # print edge data
-            print(f"Edge {e.num:2d}: {e.src:5s} -> {e.dest:5s}, Flow Side: {e.flow_side.name}")
-        
-        self.draw()
+    def cancel_report(self):
+        if self.report_job is not None:
+            self.report_job.cancel()
+            self.finish_report("Report cancelled")
 
-        # try:
-        #     with open('graph.json', 'w') as f:
-        #         json.dump(data, f, indent=2)
-        #     self.update_status_temp("Graph saved to graph.json")
-        # except Exception as e:
-        #     self.update_status_temp(f"Error saving graph: {e}")
+    def finish_report(self, message, duration=3000):
+        self.report_job = None
+        self.report_edge_ids = []
+        self.report_btn.config(state=tk.NORMAL)
+        self.cancel_report_btn.config(state=tk.DISABLED)
+        self.update_status_temp(message, duration)
 
     def save_png(self):
         path = filedialog.asksaveasfilename(defaultextension='.png', filetypes=[('PNG','*.png')])
@@ -779,25 +980,20 @@ class GraphEditorApp:
         
         # Delete selected nodes and their connected edges
         if self.selected_nodes:
-            original_edge_count = len(self.edges)
-            # Remove any edges connected to any selected node
-            self.edges = [edge for edge in self.edges 
-                         if edge['startNodeId'] not in self.selected_nodes 
-                         and edge['endNodeId'] not in self.selected_nodes]
-            total_edges_deleted = original_edge_count - len(self.edges)
-            
-            # Remove the selected nodes
-            original_node_count = len(self.nodes)
-            self.nodes = [node for node in self.nodes if node['id'] not in self.selected_nodes]
-            total_nodes_deleted = original_node_count - len(self.nodes)
+            # Remove the selected nodes and any edges connected to them
+            for node_id in self.selected_nodes:
+                removed = self.graph.remove_node(node_id)
+                total_edges_deleted += len(removed)
+                self.selected_edges.difference_update(edge['id'] for edge in removed)
+            total_nodes_deleted = len(self.selected_nodes)
             self.selected_nodes.clear()
             self.dragging_node = None
             
         # Delete selected edges
         if self.selected_edges:
-            original_edge_count = len(self.edges)
-            self.edges = [edge for edge in self.edges if edge['id'] not in self.selected_edges]
-            total_edges_deleted += original_edge_count - len(self.edges)
+            for edge_id in self.selected_edges:
+                self.graph.remove_edge(edge_id)
+            total_edges_deleted += len(self.selected_edges)
             self.selected_edges.clear()
             
         # Update status message
@@ -821,9 +1017,9 @@ class GraphEditorApp:
 
     def clear_canvas(self):
         if messagebox.askyesno("Clear All", "Are you sure you want to clear the entire canvas?"):
-            self.nodes = []
-            self.edges = []
-            self.next_id = 1
+            self.graph = GraphModel()
+            self.selected_nodes.clear()
+            self.selected_edges.clear()
             self.selected_node = None
             self.selected_edge = None
             self.dragging_node = None
@@ -834,8 +1030,7 @@ class GraphEditorApp:
             self.update_status_temp("Canvas cleared")
 
     def clear_causality(self):
-        for edge in self.edges:
-            edge['flow_side'] = FLOWSIDE.IDK.value
+        self.graph.clear_causality()
         self.draw()
         self.update_status_temp("Causality cleared (all flow sides set to IDK)")
 
@@ -947,20 +1142,7 @@ class GraphEditorApp:
 
     def get_next_edge_number(self):
         """Find the next available integer value for edge labels"""
-        # Get all edge labels that are integers
-        used_numbers = set()
-        for edge in self.edges:
-            try:
-                num = int(edge['label'])
-                used_numbers.add(num)
-            except ValueError:
-                continue
-        
-        # Find the first unused integer starting from 1
-        next_num = 1
-        while next_num in used_numbers:
-            next_num += 1
-        return str(next_num)
+        return str(self.graph.next_bond_number())
 
     def get_next_node_label(self, nodetype):
         """Generate the next available label for a node of the given type"""
@@ -970,7 +1152,7 @@ class GraphEditorApp:
         else:
             # For other node types, find the next available number
             used_labels = set()
-            for node in self.nodes:
+            for node in self.graph.nodes.values():
                 if node.get('nodetype') == nodetype:
                     label = node['label']
                     # Extract number from end of label if it exists
@@ -1034,7 +1216,7 @@ class GraphEditorApp:
             "Enter new label for edge:",
             initialvalue=edge['label'])
         if new_label:
-            edge['label'] = new_label
+            self.graph.set_edge_label(edge['id'], new_label)
             self.draw()
             self.update_status_temp(f"Edge renamed to: {new_label}")
 
@@ -1043,13 +1225,13 @@ class GraphEditorApp:
         self.clipboard_nodes = []
         self.clipboard_edges = []
         selected_node_ids = set(self.selected_nodes)
-        for node in self.nodes:
-            if node['id'] in selected_node_ids:
-                self.clipboard_nodes.append(node.copy())
+        for node_id in selected_node_ids:
+            self.clipboard_nodes.append(self.graph.nodes[node_id].copy())
         # Copy edges where both endpoints are in selected nodes
-        for edge in self.edges:
-            if edge['startNodeId'] in selected_node_ids and edge['endNodeId'] in selected_node_ids:
-                self.clipboard_edges.append(edge.copy())
+        for node_id in selected_node_ids:
+            for edge in self.graph.incident(node_id):
+                if edge['startNodeId'] == node_id and edge['endNodeId'] in selected_node_ids:
+                    self.clipboard_edges.append(dict(edge, flow_side=self.graph.flow_side(edge['id']).value))
         self.update_status_temp(f"Copied {len(self.clipboard_nodes)} node(s)/junction(s) and {len(self.clipboard_edges)} edge(s)")
         return 'break'
 
@@ -1062,38 +1244,22 @@ class GraphEditorApp:
         id_map = {}
         for node in self.clipboard_nodes:
             new_node = node.copy()
-            new_node['id'] = self.next_id
+            del new_node['id']
             new_node['x'] += OFFSET
             new_node['y'] += OFFSET
-            id_map[node['id']] = self.next_id
+            new_node = self.graph.add_node(new_node)
+            id_map[node['id']] = new_node['id']
             new_nodes.append(new_node)
-            self.next_id += 1
-        self.nodes.extend(new_nodes)
-        # Find the next available edge label number
-        used_numbers = set()
-        for edge in self.edges:
-            try:
-                num = int(edge['label'])
-                used_numbers.add(num)
-            except Exception:
-                continue
-        next_edge_num = 1
-        while next_edge_num in used_numbers:
-            next_edge_num += 1
         # Paste edges, updating node IDs and incrementing label numbers
         new_edges = []
         for edge in self.clipboard_edges:
             new_edge = edge.copy()
-            new_edge['id'] = self.next_id
+            del new_edge['id']
             new_edge['startNodeId'] = id_map.get(edge['startNodeId'], edge['startNodeId'])
             new_edge['endNodeId'] = id_map.get(edge['endNodeId'], edge['endNodeId'])
-            # Assign incremented label number
-            new_edge['label'] = str(next_edge_num)
-            used_numbers.add(next_edge_num)
-            next_edge_num += 1
-            new_edges.append(new_edge)
-            self.next_id += 1
-        self.edges.extend(new_edges)
+            # Assign the next free label number
+            new_edge['label'] = str(self.graph.next_bond_number())
+            new_edges.append(self.graph.add_edge(new_edge))
         # Select newly pasted nodes and edges
         self.selected_nodes = set(n['id'] for n in new_nodes)
         self.selected_edges = set(e['id'] for e in new_edges)
@@ -1104,4 +1270,6 @@ class GraphEditorApp:
 if __name__ == '__main__':
     root = tk.Tk()
     app = GraphEditorApp(root)
+    # Don't leave a report process behind when the window closes
+    root.protocol("WM_DELETE_WINDOW", lambda: (app.cancel_report(), root.destroy()))
     root.mainloop()
@@ -1,7 +1,12 @@
 import pydot
+import numpy as np
 from enum import Enum
 import sympy as sym
+import functools
 import json
+import mmap
+import re
+import struct
 
 class FLOWSIDE(Enum):
     SRC =  1 
@@ -28,13 +33,112 @@ class NODETYPE(Enum):
 
 
 
+_FLOWSIDE_BY_VALUE = {m.value: m for m in FLOWSIDE}
+
+# uint8 node-type codes of a BondTable, in NODETYPE order
+NODE_TYPE_CODES = {t.value: i for i, t in enumerate(NODETYPE)}
+UNKNOWN_NODE_TYPE = 255
+
+
 class FlyEdge:
-    def __init__(self, label_num=0, src="", dest="", pwr_to_dest=1, flow_side=FLOWSIDE.IDK):
-        self.src = src
-        self.dest = dest
-        self.num = label_num
-        self.pwr_to_dest = pwr_to_dest
-        self.flow_side = flow_side
+    """
+    One bond. A FlyEdge either holds its own fields or is a view onto a row of a
+    BondTable (table[i]), in which case reads and writes go to the table's columns.
+    """
+    __slots__ = ("_table", "_row", "_num", "_src", "_dest", "_pwr", "_flow", "_width")
+
+    def __init__(self, label_num=0, src="", dest="", pwr_to_dest=1, flow_side=FLOWSIDE.IDK, width=1):
+        self._table = None
+        self._row = -1
+        self._num = label_num
+        self._src = src
+        self._dest = dest
+        self._pwr = pwr_to_dest
+        self._flow = flow_side
+        # a vector bond carries length-width arrays of efforts and flows
+        self._width = width
+
+    @classmethod
+    def view(cls, table: "BondTable", row: int) -> "FlyEdge":
+        e = cls.__new__(cls)
+        e._table = table
+        e._row = row
+        return e
+
+    @property
+    def num(self) -> int:
+        return self._num if self._table is None else int(self._table._num[self._row])
+
+    @num.setter
+    def num(self, value: int):
+        if self._table is None:
+            self._num = value
+        else:
+            self._table._num[self._row] = value
+
+    @property
+    def src(self) -> str:
+        return self._src if self._table is None else self._table.nodes[self._table._src[self._row]]
+
+    @src.setter
+    def src(self, value: str):
+        if self._table is None:
+            self._src = value
+        else:
+            self._table._src[self._row] = self._table.node_id(value)
+
+    @property
+    def dest(self) -> str:
+        return self._dest if self._table is None else self._table.nodes[self._table._dest[self._row]]
+
+    @dest.setter
+    def dest(self, value: str):
+        if self._table is None:
+            self._dest = value
+        else:
+            self._table._dest[self._row] = self._table.node_id(value)
+
+    @property
+    def pwr_to_dest(self) -> int:
+        return self._pwr if self._table is None else int(self._table._pwr[self._row])
+
+    @pwr_to_dest.setter
+    def pwr_to_dest(self, value: int):
+        if self._table is None:
+            self._pwr = value
+        else:
+            self._table._pwr[self._row] = value
+
+    @property
+    def flow_side(self) -> FLOWSIDE:
+        return self._flow if self._table is None else _FLOWSIDE_BY_VALUE[int(self._table._flow[self._row])]
+
+    @flow_side.setter
+    def flow_side(self, value: FLOWSIDE):
+        if self._table is None:
+            self._flow = value
+        else:
+            self._table._flow[self._row] = value.value
+
+    @property
+    def width(self) -> int:
+        return self._width if self._table is None else int(self._table._width[self._row])
+
+    @width.setter
+    def width(self, value: int):
+        if self._table is None:
+            self._width = value
+        else:
+            self._table._width[self._row] = value
+
+    def __eq__(self, other):
+        if self._table is not None and isinstance(other, FlyEdge):
+            return self._table is other._table and self._row == other._row
+        return self is other
+
+    def __hash__(self):
+        return id(self) if self._table is None else hash((id(self._table), self._row))
+
     def mk_edge(self):
         a_h = "none"
         a_t = "none"
@@ -46,15 +150,158 @@ class FlyEdge:
             a_t = "tee" + a_t
         elif self.flow_side == FLOWSIDE.DEST:
             a_h = "tee" + a_h
-        e = pydot.Edge(self.src, self.dest, label=self.num, dir="both", arrowhead=a_h, arrowtail=a_t)
+        label = self.num if self.width == 1 else f"{self.num}[{self.width}]"
+        e = pydot.Edge(self.src, self.dest, label=label, dir="both", arrowhead=a_h, arrowtail=a_t)
         return e
     def __str__(self):
         sfstr = self.flow_side.name
         estr = f"{self.num:2d}: {self.src:10s} -> {self.dest:10s} [{self.pwr_to_dest:3d}] [{sfstr}]"
+        if self.width != 1:
+            estr += f" [width {self.width}]"
         return estr
 
 
+class BondTable:
+    """
+    Bonds stored column-wise in NumPy arrays, for graphs with up to millions of bonds.
+
+    Columns: num (int64), src and dest (int32 node ids), pwr_to_dest (int8),
+    flow_side (int8, FLOWSIDE values) and width (int32). Node names live once in the
+    string table nodes, with a uint8 type code per node (NODE_TYPE_CODES).
+
+    Indexing and iteration give FlyEdge views, so a BondTable can be passed wherever a
+    list of FlyEdge is expected; bulk passes use the column properties instead.
+    """
+    def __init__(self, capacity: int = 16):
+        capacity = max(capacity, 1)
+        self.n = 0
+        self._num = np.zeros(capacity, dtype=np.int64)
+        self._src = np.zeros(capacity, dtype=np.int32)
+        self._dest = np.zeros(capacity, dtype=np.int32)
+        self._pwr = np.zeros(capacity, dtype=np.int8)
+        self._flow = np.zeros(capacity, dtype=np.int8)
+        self._width = np.zeros(capacity, dtype=np.int32)
+        self.nodes = []
+        self.node_index = {}
+        self._node_type = np.zeros(16, dtype=np.uint8)
 
+    @classmethod
+    def from_edges(cls, es: list[FlyEdge]) -> "BondTable":
+        table = cls(len(es))
+        for e in es:
+            table.append(e.num, e.src, e.dest, e.pwr_to_dest, e.flow_side, e.width)
+        return table
+
+    @classmethod
+    def from_arrays(cls, nums, src, dest, pwr_to_dest=1, width=1, flow_side=None) -> "BondTable":
+        table = cls(len(nums))
+        table.extend(nums, src, dest, pwr_to_dest, width, flow_side)
+        return table
+
+    # columns of the used rows
+    num = property(lambda self: self._num[:self.n])
+    src = property(lambda self: self._src[:self.n])
+    dest = property(lambda self: self._dest[:self.n])
+    pwr_to_dest = property(lambda self: self._pwr[:self.n])
+    flow_side = property(lambda self: self._flow[:self.n])
+    width = property(lambda self: self._width[:self.n])
+    node_type = property(lambda self: self._node_type[:len(self.nodes)])
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory of the columns and node codes, without the node name strings
+        """
+        return sum(a.nbytes for a in (self._num, self._src, self._dest, self._pwr, self._flow,
+                                      self._width, self._node_type))
+
+    def _reserve(self, n_rows: int) -> None:
+        capacity = len(self._num)
+        if n_rows <= capacity:
+            return
+        capacity = max(n_rows, 2 * capacity)
+        for name in ("_num", "_src", "_dest", "_pwr", "_flow", "_width"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def node_id(self, name: str) -> int:
+        """
+        Id of a node name, adding it to the string table if it is new
+        """
+        i = self.node_index.get(name)
+        if i is None:
+            i = len(self.nodes)
+            self.nodes.append(name)
+            self.node_index[name] = i
+            if i >= len(self._node_type):
+                self._node_type = np.concatenate((self._node_type, np.zeros(len(self._node_type), dtype=np.uint8)))
+            self._node_type[i] = NODE_TYPE_CODES.get(name.split("_")[0], UNKNOWN_NODE_TYPE)
+        return i
+
+    def append(self, num: int, src: str, dest: str, pwr_to_dest: int = 1,
+               flow_side: FLOWSIDE = FLOWSIDE.IDK, width: int = 1) -> FlyEdge:
+        self._reserve(self.n + 1)
+        row = self.n
+        self._num[row] = num
+        self._src[row] = self.node_id(src)
+        self._dest[row] = self.node_id(dest)
+        self._pwr[row] = pwr_to_dest
+        self._flow[row] = flow_side.value
+        self._width[row] = width
+        self.n += 1
+        return FlyEdge.view(self, row)
+
+    def extend(self, nums, src, dest, pwr_to_dest=1, width=1, flow_side=None) -> None:
+        """
+        Append bonds from arrays; node names are interned once per distinct name
+        """
+        nums = np.asarray(nums, dtype=np.int64).reshape(-1)
+        k = len(nums)
+        names, inverse = np.unique(np.concatenate((np.asarray(src, dtype=str).reshape(-1),
+                                                   np.asarray(dest, dtype=str).reshape(-1))), return_inverse=True)
+        ids = np.array([self.node_id(n) for n in names.tolist()], dtype=np.int32)[inverse]
+        self._reserve(self.n + k)
+        rows = slice(self.n, self.n + k)
+        self._num[rows] = nums
+        self._src[rows] = ids[:k]
+        self._dest[rows] = ids[k:]
+        self._pwr[rows] = pwr_to_dest
+        self._width[rows] = width
+        self._flow[rows] = FLOWSIDE.IDK.value if flow_side is None else flow_side
+        self.n += k
+
+    def rows_with_type(self, node_type: str) -> np.ndarray:
+        """
+        Rows of the bonds with a node of the given type (e.g. "I") at either end
+        """
+        code = NODE_TYPE_CODES[node_type]
+        types = self.node_type
+        return np.flatnonzero((types[self.src] == code) | (types[self.dest] == code))
+
+    def degree(self) -> np.ndarray:
+        """
+        Number of bonds at every node, indexed by node id
+        """
+        return np.bincount(np.concatenate((self.src, self.dest)), minlength=len(self.nodes))
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, row: int) -> FlyEdge:
+        if row < 0:
+            row += self.n
+        if not 0 <= row < self.n:
+            raise IndexError(f"Bond row {row} out of range")
+        return FlyEdge.view(self, row)
+
+    def __iter__(self):
+        for row in range(self.n):
+            yield FlyEdge.view(self, row)
+
+    def __str__(self):
+        return f"BondTable: {self.n} bonds, {len(self.nodes)} nodes, {self.nbytes / 1e6:.1f} MB"
 
 
 class SymbolManager:
@@ -77,45 +324,661 @@ class SymbolManager:
             self.symbols[name] = sym.Symbol(name, real=True)
         return self.symbols[name]
 
-def load_json_graph(fname) -> tuple[list[str], list[FlyEdge]]:
+_JSON_WS = re.compile(r"[ \t\n\r]*").match
 
-    with open(fname, 'r') as f:
-        data = json.load(f)
-    nodes = data.get("nodes", [])
-    edges = data.get("edges", [])
 
-    ns = []
-    for node in nodes:
-        label = node.get("label", "")
-        ns.append(label)
-
-    ns = list(set(ns))  # Remove duplicates
+class _JsonStream:
+    """
+    Incremental reader of a JSON object file: yields the elements of its top-level
+    "nodes" and "edges" arrays one at a time while reading the file in chunks.
+    Other top-level values are parsed and dropped.
+    """
+    ARRAYS = ("nodes", "edges")
+
+    def __init__(self, f, chunk_size: int = 1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # drop what has been consumed so memory stays at about one chunk
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        while True:
+            self.pos = _JSON_WS(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON graph file.")
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON graph file, found {self.buf[self.pos]!r}.")
+        self.pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a number cut at the end of the buffer would decode too early
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def _items(self):
+        """
+        Elements of an array up to its closing bracket. The loop stays on the buffer and only
+        falls back to _peek/_value near its end, where a chunk may cut an element.
+        """
+        decode = self.decoder.raw_decode
+        if self._peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            buf, pos = self.buf, self.pos
+            limit = len(buf) - 1
+            try:
+                value, end = decode(buf, _JSON_WS(buf, pos).end())
+            except json.JSONDecodeError:
+                end = limit
+            if end < limit:
+                pos = _JSON_WS(buf, end).end()
+            if end >= limit or pos >= limit:
+                value = self._value()
+                self._peek()
+                buf, pos = self.buf, self.pos
+            yield value
+            char = buf[pos]
+            self.pos = pos + 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON graph file, found {char!r}.")
+
+    def __iter__(self):
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key in self.ARRAYS:
+                self._expect("[")
+                for item in self._items():
+                    yield key, item
+            else:
+                self._value()
+            if self._peek() == ",":
+                self.pos += 1
+                continue
+            self._expect("}")
+            return
 
-    # create edge list
-    es = []
 
-    for edge in edges:
-        num = int(edge.get("label", 0))
-        start_node_id = 0
-        end_node_id = 0
+def _json_node_names(ids: list, labels: list[str]) -> dict:
+    """
+    id -> node name. Labels that are unique stay as they are; nodes sharing a label
+    keep their own identity as <label>_<id>, which keeps the node type prefix intact.
+    """
+    counts = {}
+    for label in labels:
+        counts[label] = counts.get(label, 0) + 1
+    names = {node_id: label if counts[label] == 1 else f"{label}_{node_id:02d}"
+             for node_id, label in zip(ids, labels)}
+    if len(names) != len(ids):
+        raise ValueError("JSON graph has duplicate node ids.")
+    return names
 
-        start_node_id = edge["startNodeId"] if "startNodeId" in edge else 0
-        end_node_id = edge["endNodeId"] if "endNodeId" in edge else 0
 
-        start_node_name = "IDK"
-        for node in nodes:
-            if node.get("id", 0) == start_node_id:
-                start_node_name = node.get("label", "")
+def load_json_graph(fname, strict: bool = False, table: bool = False) -> tuple[list[str], list[FlyEdge]]:
+    """
+    Load an editor JSON file in one streaming pass: the file is read in chunks, only the node
+    labels and the edge ends are kept, and edge ends are resolved through an id -> name index,
+    so the load time is linear in the file size.
 
-        end_node_name = "IDK"
-        for node in nodes:
-            if node.get("id", 0) == end_node_id:
-                end_node_name = node.get("label", "")
+    Edges that refer to a node id that is not in the file keep that id as their node name
+    (#<id>), or raise a ValueError with strict=True. With table=True the bonds are returned
+    as a BondTable. Binary snapshots (save_snapshot) are read as well.
+    """
+    if is_snapshot(fname):
+        with load_snapshot(fname) as snap:
+            return snap.bonds(strict=strict, table=table)
+
+    ids, labels = [], []
+    nums, starts, ends, widths = [], [], [], []
+    with open(fname, "r", encoding="utf-8") as f:
+        for key, item in _JsonStream(f):
+            get = item.get
+            if key == "nodes":
+                ids.append(get("id", 0))
+                labels.append(get("label", ""))
+            else:
+                nums.append(int(get("label", 0)))
+                starts.append(get("startNodeId", 0))
+                ends.append(get("endNodeId", 0))
+                widths.append(get("width", 1))
+    return _json_bonds(ids, labels, nums, starts, ends, widths, strict, table)
 
-        es.append(FlyEdge(label_num=num, src=start_node_name, dest=end_node_name, pwr_to_dest=1, flow_side=FLOWSIDE.IDK))
 
+def _json_bonds(ids: list, labels: list[str], nums: list[int], starts: list, ends: list, widths: list[int],
+                strict: bool, table: bool) -> tuple[list[str], list[FlyEdge]]:
+    """
+    (node names, bonds) from the node and edge columns of an editor graph
+    """
+    names = _json_node_names(ids, labels)
+    ns = list(names.values())
+    missing = (set(starts) | set(ends)) - names.keys()
+    if missing and strict:
+        raise ValueError(f"Edges refer to unknown node ids {', '.join(str(i) for i in sorted(missing, key=str))}.")
+    names.update({node_id: f"#{node_id}" for node_id in missing})
+    src = [names[node_id] for node_id in starts]
+    dest = [names[node_id] for node_id in ends]
+
+    if table:
+        return ns, BondTable.from_arrays(nums, src, dest, 1, widths)
+    es = [FlyEdge(label_num=num, src=s, dest=d, pwr_to_dest=1, flow_side=FLOWSIDE.IDK, width=int(w))
+          for num, s, d, w in zip(nums, src, dest, widths)]
     return ns, es
 
+
+
+SNAPSHOT_MAGIC = b"BGSNAP\x00\x01"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".bgs"
+SNAPSHOT_ALIGN = 8
+# columns of the editor JSON schema: key, Python type of the value, stored dtype.
+# String columns hold indices into the string table.
+SNAPSHOT_COLUMNS = {
+    "nodes": (("id", int, "<i8"), ("x", float, "<f8"), ("y", float, "<f8"),
+              ("label", str, "<u4"), ("type", str, "<u4"), ("nodetype", str, "<u4")),
+    "edges": (("id", int, "<i8"), ("startNodeId", int, "<i8"), ("endNodeId", int, "<i8"),
+              ("label", str, "<u4"), ("flow_side", int, "<i8"), ("width", int, "<i8")),
+}
+_SNAPSHOT_HEADER = struct.Struct("<8sIIQQ")
+_SNAPSHOT_SECTION = struct.Struct("<24sQQ")
+_INT64 = (-(1 << 63), 1 << 63)
+
+
+def _snapshot_sections() -> list[tuple[str, str]]:
+    """
+    (name, dtype) of every array section, in file order
+    """
+    sections = []
+    for table, columns in SNAPSHOT_COLUMNS.items():
+        sections += [(f"{table}.{key}", dtype) for key, _, dtype in columns]
+        # bit k: column k holds the value of the row; float columns also record ints (x: 100)
+        sections += [(f"{table}.present", "<u2"), (f"{table}.is_int", "<u2")]
+    return sections + [("strings", "u1"), ("extras", "u1")]
+
+
+_MISSING = object()
+
+
+def _snapshot_column(values: list, kind: type, dtype: str, strings: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (column, rows held by the column, rows holding an int in a float column) for the values
+    of one key. Strings are stored as indices into strings, which grows as needed.
+    """
+    n = len(values)
+    if set(map(type, values)) <= {kind} and (kind is not str or "\0" not in "".join(values)):
+        try:
+            if kind is str:
+                values = [strings.setdefault(v, len(strings)) for v in values]
+            return np.array(values, dtype=dtype), np.ones(n, dtype=bool), np.zeros(n, dtype=bool)
+        except OverflowError:
+            pass
+    col = np.zeros(n, dtype=dtype)
+    held = np.zeros(n, dtype=bool)
+    held_int = np.zeros(n, dtype=bool)
+    for row, value in enumerate(values):
+        if kind is str and type(value) is str and "\0" not in value:
+            col[row] = strings.setdefault(value, len(strings))
+        elif kind is int and type(value) is int and _INT64[0] <= value < _INT64[1]:
+            col[row] = value
+        elif kind is float and type(value) is float:
+            col[row] = value
+        elif kind is float and type(value) is int and abs(value) <= 1 << 53:
+            col[row] = value
+            held_int[row] = True
+        else:
+            continue
+        held[row] = True
+    return col, held, held_int
+
+
+class GraphSnapshot:
+    """
+    Editor graph stored column-wise: one array per key of the JSON schema (node ids,
+    coordinates, types, edge ends, labels, flow sides), a string table for the labels
+    and a small JSON blob for everything the columns do not hold (other keys, values of
+    an unexpected type), so converting from and back to the JSON schema is lossless
+    (equal dicts; the order of keys inside a node or edge is not kept).
+
+    A loaded snapshot reads its arrays straight from the memory-mapped file.
+    """
+    def __init__(self, columns: dict[str, np.ndarray], n_nodes: int, n_edges: int, strings_blob,
+                 extras: dict, mapped: mmap.mmap | None = None):
+        self.columns = columns
+        self.n_nodes = n_nodes
+        self.n_edges = n_edges
+        self._strings_blob = strings_blob
+        self._strings = None
+        self.extras = extras
+        self._mmap = mapped
+
+    @property
+    def strings(self) -> list[str]:
+        if self._strings is None:
+            self._strings = bytes(self._strings_blob).decode("utf-8").split("\0")
+        return self._strings
+
+    @classmethod
+    def from_json(cls, data: dict) -> "GraphSnapshot":
+        """
+        Snapshot of a graph in the editor JSON schema ({"nodes": [...], "edges": [...], ...})
+        """
+        strings = {"": 0}
+        columns = {}
+        extras = {"keys": list(data), "top": {k: v for k, v in data.items() if k not in SNAPSHOT_COLUMNS}}
+        counts = {}
+        for table, spec in SNAPSHOT_COLUMNS.items():
+            items = data.get(table, [])
+            n = len(items)
+            counts[table] = n
+            present = np.zeros(n, dtype="<u2")
+            is_int = np.zeros(n, dtype="<u2")
+            rest = {}
+            for k, (key, kind, dtype) in enumerate(spec):
+                values = [item.get(key, _MISSING) for item in items]
+                col, held, held_int = _snapshot_column(values, kind, dtype, strings)
+                columns[f"{table}.{key}"] = col
+                present |= held.astype("<u2") << k
+                is_int |= held_int.astype("<u2") << k
+                for row in np.flatnonzero(~held).tolist():
+                    if values[row] is not _MISSING:
+                        rest.setdefault(str(row), {})[key] = values[row]
+            canonical = {key for key, _, _ in spec}
+            if set().union(*map(dict.keys, items)) - canonical:
+                for row, item in enumerate(items):
+                    other = {key: value for key, value in item.items() if key not in canonical}
+                    if other:
+                        rest.setdefault(str(row), {}).update(other)
+            columns[f"{table}.present"] = present
+            columns[f"{table}.is_int"] = is_int
+            extras[table] = rest
+        strings_blob = "\0".join(strings).encode("utf-8")
+        return cls(columns, counts["nodes"], counts["edges"], strings_blob, extras)
+
+    def to_json(self) -> dict:
+        """
+        The graph in the editor JSON schema, equal to the dict the snapshot was made from
+        """
+        strings = np.asarray(self.strings, dtype=object)
+        lists = {}
+        for table, spec in SNAPSHOT_COLUMNS.items():
+            present = self.columns[f"{table}.present"]
+            is_int = self.columns[f"{table}.is_int"]
+            keys = [key for key, _, _ in spec]
+            cols = []
+            for k, (key, kind, _) in enumerate(spec):
+                col = self.columns[f"{table}.{key}"]
+                if kind is str:
+                    col = strings[col]
+                elif kind is float and np.any(is_int >> k & 1):
+                    col = col.astype(object)
+                    rows = (is_int >> k & 1).astype(bool)
+                    col[rows] = [int(v) for v in col[rows]]
+                cols.append(col.tolist())
+            rest = self.extras[table]
+            if np.all(present == (1 << len(spec)) - 1):
+                items = [dict(zip(keys, values)) for values in zip(*cols)]
+            else:
+                bits = present.tolist()
+                items = [{key: values[k] for k, key in enumerate(keys) if row_bits >> k & 1}
+                         for row_bits, values in zip(bits, zip(*cols))]
+            for row, values in rest.items():
+                items[int(row)].update(values)
+            lists[table] = items
+        top = self.extras["top"]
+        return {key: lists[key] if key in lists else top[key] for key in self.extras["keys"]}
+
+    def column(self, table: str, key: str) -> np.ndarray:
+        return self.columns[f"{table}.{key}"]
+
+    def _values(self, table: str, key: str, default) -> list:
+        """
+        Values of one key for every row, with default where the row has none
+        """
+        spec = SNAPSHOT_COLUMNS[table]
+        k = [c[0] for c in spec].index(key)
+        kind = spec[k][1]
+        col = self.column(table, key)
+        present = (self.column(table, "present") >> k & 1).astype(bool)
+        if kind is str:
+            values = np.asarray(self.strings, dtype=object)[col]
+        else:
+            values = col.astype(object)
+        values[~present] = default
+        for row, row_rest in self.extras[table].items():
+            if key in row_rest:
+                values[int(row)] = row_rest[key]
+        return values.tolist()
+
+    def bonds(self, strict: bool = False, table: bool = False) -> tuple[list[str], list[FlyEdge]]:
+        """
+        (node names, bonds) as load_json_graph gives them for the JSON file
+        """
+        nums = [int(label) for label in self._values("edges", "label", 0)]
+        return _json_bonds(self._values("nodes", "id", 0), self._values("nodes", "label", ""), nums,
+                           self._values("edges", "startNodeId", 0), self._values("edges", "endNodeId", 0),
+                           self._values("edges", "width", 1), strict, table)
+
+    def save(self, fname) -> None:
+        sections = _snapshot_sections()
+        extras = json.dumps(self.extras).encode("utf-8")
+        buffers = [np.ascontiguousarray(self.columns[name], dtype=dtype) for name, dtype in sections[:-2]]
+        buffers += [np.frombuffer(bytes(self._strings_blob), dtype="u1"), np.frombuffer(extras, dtype="u1")]
+
+        offset = _SNAPSHOT_HEADER.size + len(sections) * _SNAPSHOT_SECTION.size
+        directory = []
+        for (name, _), buf in zip(sections, buffers):
+            offset = -(-offset // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+            directory.append((name, offset, buf.nbytes))
+            offset += buf.nbytes
+
+        with open(fname, "wb") as f:
+            f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(sections), self.n_nodes, self.n_edges))
+            for name, start, nbytes in directory:
+                f.write(_SNAPSHOT_SECTION.pack(name.encode("ascii"), start, nbytes))
+            for (_, start, _), buf in zip(directory, buffers):
+                f.write(b"\0" * (start - f.tell()))
+                f.write(buf.tobytes())
+
+    @classmethod
+    def load(cls, fname) -> "GraphSnapshot":
+        """
+        Map a snapshot file into memory; the columns are read-only views on the mapping
+        """
+        with open(fname, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < _SNAPSHOT_HEADER.size:
+            mapped.close()
+            raise ValueError(f"{fname} is not a graph snapshot.")
+        magic, version, n_sections, n_nodes, n_edges = _SNAPSHOT_HEADER.unpack_from(mapped, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            mapped.close()
+            raise ValueError(f"{fname} is not a version {SNAPSHOT_VERSION} graph snapshot.")
+        dtypes = dict(_snapshot_sections())
+        directory = {}
+        for k in range(n_sections):
+            name, start, nbytes = _SNAPSHOT_SECTION.unpack_from(mapped, _SNAPSHOT_HEADER.size + k * _SNAPSHOT_SECTION.size)
+            name = name.rstrip(b"\0").decode("ascii")
+            if name not in dtypes or start + nbytes > len(mapped):
+                mapped.close()
+                raise ValueError(f"{fname}: bad snapshot section {name}.")
+            directory[name] = (start, nbytes)
+        view = memoryview(mapped)
+        columns = {}
+        for name, dtype in dtypes.items():
+            start, nbytes = directory[name]
+            columns[name] = np.frombuffer(view[start:start + nbytes], dtype=dtype)
+        start, nbytes = directory["extras"]
+        extras = json.loads(bytes(view[start:start + nbytes]))
+        snap = cls(columns, n_nodes, n_edges, columns.pop("strings"), extras, mapped)
+        columns.pop("extras")
+        return snap
+
+    def close(self) -> None:
+        """
+        Release the file mapping. Arrays taken from the columns must not be used afterwards.
+        """
+        if self._mmap is None:
+            return
+        self.columns = {}
+        self._strings_blob = b""
+        try:
+            self._mmap.close()
+        except BufferError:
+            # views still referenced elsewhere, the mapping is released with them
+            pass
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_snapshot(fname) -> bool:
+    with open(fname, "rb") as f:
+        return f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+
+def save_snapshot(fname, data: dict) -> None:
+    """
+    Write a graph in the editor JSON schema as a binary snapshot
+    """
+    GraphSnapshot.from_json(data).save(fname)
+
+
+def load_snapshot(fname) -> GraphSnapshot:
+    return GraphSnapshot.load(fname)
+
+
+def read_graph_data(fname) -> dict:
+    """
+    Graph in the editor JSON schema from a JSON file or a binary snapshot
+    """
+    if is_snapshot(fname):
+        with load_snapshot(fname) as snap:
+            return snap.to_json()
+    with open(fname, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+NETLIST_HEADER = "# bond_grapher netlist v1\n# num src dest pwr_to_dest [key=value ...]\n"
+# element types whose parameter may be given on a netlist line, I=2.5 on bond 5 -> I_05
+NETLIST_PARAM_TYPES = ("SE", "SF", "I", "C", "R", "TF", "GY")
+
+
+def _netlist_options(tokens: list[str], line_no: int) -> dict[str, str]:
+    options = {}
+    for token in tokens:
+        key, sep, value = token.partition("=")
+        if not sep:
+            raise ValueError(f"Netlist line {line_no}: option {token!r} is not key=value")
+        options[key] = value
+    return options
+
+
+def _netlist_float(key: str, value: str, line_no: int) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Netlist line {line_no}: {key}={value!r} is not a number")
+
+
+def _check_bond_options(options: dict[str, str], line_no: int) -> None:
+    if "width" in options and not (options["width"].isdigit() and int(options["width"]) > 0):
+        raise ValueError(f"Netlist line {line_no}: width={options['width']!r} is not a positive integer")
+    if "flow" in options and options["flow"] not in FLOWSIDE.__members__:
+        raise ValueError(f"Netlist line {line_no}: flow={options['flow']!r}, expected one of "
+                         f"{', '.join(FLOWSIDE.__members__)}")
+    for key, value in options.items():
+        if key in NETLIST_PARAM_TYPES:
+            _netlist_float(key, value, line_no)
+
+
+def iter_netlist(lines, params: dict | None = None):
+    """
+    Parse netlist lines one at a time, yielding (num, src, dest, pwr_to_dest, options) per bond.
+
+    One bond per line: number, source node, destination node, power direction (1 towards dest,
+    0 towards src), then optional key=value pairs. Blank lines and # comments are skipped.
+    ".param name=value ..." lines define model parameters, collected into params.
+    """
+    for line_no, line in enumerate(lines, start=1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        tokens = line.split()
+        if tokens[0] == ".param":
+            values = {k: _netlist_float(k, v, line_no) for k, v in _netlist_options(tokens[1:], line_no).items()}
+            if params is not None:
+                params.update(values)
+            continue
+        if len(tokens) < 4:
+            raise ValueError(f"Netlist line {line_no}: expected 'num src dest pwr_to_dest', got {line!r}")
+        try:
+            num = int(tokens[0])
+            pwr_to_dest = int(tokens[3])
+        except ValueError:
+            raise ValueError(f"Netlist line {line_no}: bond number and power direction must be integers, got {line!r}")
+        if pwr_to_dest not in (0, 1):
+            raise ValueError(f"Netlist line {line_no}: power direction must be 0 or 1")
+        options = _netlist_options(tokens[4:], line_no)
+        _check_bond_options(options, line_no)
+        yield num, tokens[1], tokens[2], pwr_to_dest, options
+
+
+def load_netlist(source, table: bool = False) -> tuple[list[str], list[FlyEdge] | BondTable, dict]:
+    """
+    Read a netlist file (path or open file / iterable of lines) in a single streaming pass.
+
+    Options on a line: width=<n>, flow=SRC|DEST|IDK for a known causality and <type>=<value>
+    for the parameter of the element on that bond (C=7.9e-6 on bond 2 -> C_02).
+    Returns node names in order of appearance, the bonds (a BondTable when table=True)
+    and the parameters, including those of .param lines.
+    """
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            return load_netlist(f, table)
+
+    nodes = {}
+    es = BondTable() if table else []
+    params = {}
+    seen = set()
+    for num, src, dest, pwr_to_dest, options in iter_netlist(source, params):
+        if num in seen:
+            raise ValueError(f"Netlist has bond {num} twice.")
+        seen.add(num)
+        nodes.setdefault(src, None)
+        nodes.setdefault(dest, None)
+
+        width = int(options.pop("width", 1))
+        flow_side = FLOWSIDE[options.pop("flow", "IDK")]
+        for key, value in options.items():
+            if key not in NETLIST_PARAM_TYPES:
+                raise ValueError(f"Netlist bond {num}: unknown option {key}")
+            params[f"{key}_{num:02d}"] = float(value)
+
+        if table:
+            es.append(num, src, dest, pwr_to_dest, flow_side, width)
+        else:
+            es.append(FlyEdge(num, src, dest, pwr_to_dest=pwr_to_dest, flow_side=flow_side, width=width))
+    return list(nodes), es, params
+
+
+def write_netlist(dest, es: list[FlyEdge], params: dict | None = None, causality: bool = False) -> None:
+    """
+    Write bonds to a netlist file (path or open file). Element parameters in params
+    (I_05, C_02, ...) go on the line of their bond, other parameters on a .param line.
+    With causality=True the flow side of every bond is kept.
+    """
+    if isinstance(dest, str):
+        with open(dest, "w", encoding="utf-8") as f:
+            return write_netlist(f, es, params, causality)
+
+    params = dict(params or {})
+    nums = {e.num for e in es}
+    by_bond = {}
+    for name in list(params):
+        prefix, _, num = name.rpartition("_")
+        # only names load_netlist gives back for a bond line (R_08 for bond 8), others stay on .param
+        if prefix in NETLIST_PARAM_TYPES and num.isdigit() and int(num) in nums and name == f"{prefix}_{int(num):02d}":
+            by_bond.setdefault(int(num), []).append(f"{prefix}={float(params.pop(name))!r}")
+
+    dest.write(NETLIST_HEADER)
+    if params:
+        dest.write(".param " + " ".join(f"{k}={float(v)!r}" for k, v in params.items()) + "\n")
+    for e in es:
+        fields = [str(e.num), e.src, e.dest, str(int(e.pwr_to_dest))]
+        if e.width != 1:
+            fields.append(f"width={e.width}")
+        if causality and e.flow_side != FLOWSIDE.IDK:
+            fields.append(f"flow={e.flow_side.name}")
+        fields.extend(by_bond.get(e.num, []))
+        dest.write(" ".join(fields) + "\n")
+
+
+def bond_widths(es: list[FlyEdge]) -> dict[int, int]:
+    """
+    Width of every bond by bond number.
+    0 and 1 junctions act element-wise, so all bonds at a junction must have the same width;
+    TF and GY may connect bonds of different widths through a matrix modulus.
+    """
+    if isinstance(es, BondTable):
+        return _table_bond_widths(es)
+
+    widths = {e.num: e.width for e in es}
+    if any(w < 1 for w in widths.values()):
+        raise ValueError("Bond widths must be positive.")
+
+    junction_widths = {}
+    for e in es:
+        for node in (e.src, e.dest):
+            if node.split("_")[0] in ("0", "1"):
+                w = junction_widths.setdefault(node, e.width)
+                if w != e.width:
+                    raise ValueError(f"Junction {node} connects bonds of width {w} and {e.width}.")
+    return widths
+
+
+def _table_bond_widths(table: BondTable) -> dict[int, int]:
+    """
+    bond_widths on the columns of a BondTable
+    """
+    width = table.width
+    if np.any(width < 1):
+        raise ValueError("Bond widths must be positive.")
+    ends = np.concatenate((table.src, table.dest))
+    end_width = np.concatenate((width, width))
+    junction = np.isin(table.node_type[ends], (NODE_TYPE_CODES["0"], NODE_TYPE_CODES["1"]))
+    lo = np.full(len(table.nodes), np.iinfo(np.int32).max)
+    hi = np.zeros(len(table.nodes), dtype=np.int64)
+    np.minimum.at(lo, ends[junction], end_width[junction])
+    np.maximum.at(hi, ends[junction], end_width[junction])
+    mixed = np.flatnonzero((hi > 0) & (hi != lo))
+    if mixed.size:
+        node = mixed[0]
+        raise ValueError(f"Junction {table.nodes[node]} connects bonds of width {lo[node]} and {hi[node]}.")
+    return dict(zip(table.num.tolist(), width.tolist()))
+
+
+def symbol_width(name: str, widths: dict[int, int]) -> int:
+    """
+    Width of a bond symbol such as e_05, pdot_05 or R_05, from its bond number
+    """
+    return widths[int(name.rsplit("_", 1)[1])]
+
     
 
 
@@ -1126,6 +1989,15 @@ def generate_symbols(es: list[FlyEdge]) -> tuple[list[sym.Eq], SymbolManager]:
     return equations, sm
 
 
+@functools.lru_cache(maxsize=4096)
+def _simplify(expr):
+    """
+    sym.simplify, remembered: a long-running process (lib_pipeline's watch mode) re-reporting
+    an edited graph only simplifies the equations that changed
+    """
+    return sym.simplify(expr)
+
+
 def report_equations(es: list[FlyEdge], report_all: bool, file_name: str | None= None) -> None:
     """
     Report the equations and symbols
@@ -1133,6 +2005,7 @@ def report_equations(es: list[FlyEdge], report_all: bool, file_name: str | None=
     sym.init_printing(use_unicode=True)
 
     equations, sm = generate_symbols(es)
+    simplified = [_simplify(eq) for eq in equations] if report_all else []
     symbols = [s for s in sm.symbols.values() if s.name.startswith(('pdot_', 'qdot_', 'e_', 'f_' ))]
     dot_vars = [s for s in sm.symbols.values() if s.name.startswith(('pdot_', 'qdot_'))]
 
@@ -1146,7 +2019,7 @@ def report_equations(es: list[FlyEdge], report_all: bool, file_name: str | None=
             if k in dot_vars:
                 pq_sol = sol.get(k)
                 if pq_sol is not None:
-                    ans_pretty = sym.pretty(sym.simplify(sym.Eq(k, pq_sol)))
+                    ans_pretty = sym.pretty(_simplify(sym.Eq(k, pq_sol)))
                     ans_str = f"{k} = {pq_sol}"
                     final_answers.append((ans_str, ans_pretty))
     
@@ -1159,16 +2032,16 @@ def report_equations(es: list[FlyEdge], report_all: bool, file_name: str | None=
 
     if report_all:
         print("\nFormal Equations:")
-        for eq in equations:
-            sym.pprint(sym.simplify(eq))
+        for eq in simplified:
+            sym.pprint(eq)
 
         print("\nFormal Symbols:")
         for symb in sm.symbols.values():
             sym.pprint(symb)
 
         print("\nBasic Form Equations:")
-        for eq in equations:
-            print(sym.simplify(eq))
+        for eq in simplified:
+            print(eq)
 
         print("\nBasic Form Symbols:")
         for symb in sm.symbols.values():
@@ -1194,8 +2067,111 @@ def report_equations(es: list[FlyEdge], report_all: bool, file_name: str | None=
                     f.write(f"{sym.simplify(symb)}\n")
 
                 f.write("\nEquations:\n\n")
-                for eq in equations:
-                    f.write(f"{sym.simplify(eq)}\n")
+                for eq in simplified:
+                    f.write(f"{eq}\n")
+
+
+class PortHamiltonian:
+    """
+    Port-Hamiltonian form of a causal bond graph
+
+        xdot = (J - R) dH/dx + G u
+
+    x are the I/C states (p_nn, q_nn), u the sources (SE_nn, SF_nn).
+    J (skew-symmetric) comes from the junction structure, R (symmetric) from the R elements
+    and H is the total energy stored in the I and C elements.
+    J, R and G are sympy matrices of the R, TF and GY parameters.
+    """
+    def __init__(self, states: list[sym.Symbol], inputs: list[sym.Symbol], J: sym.Matrix, R: sym.Matrix,
+                 G: sym.Matrix, energies: list, sm: SymbolManager):
+        self.states = states
+        self.inputs = inputs
+        self.J = J
+        self.R = R
+        self.G = G
+        self.energies = energies
+        self.H = sym.Add(*energies)
+        self.grad_H = [sym.diff(h, x) for h, x in zip(energies, states)]
+        self.sm = sm
+
+    @property
+    def params(self) -> list[sym.Symbol]:
+        """
+        Parameter symbols of J, R, G and H
+        """
+        exprs = list(self.J) + list(self.R) + list(self.G) + list(self.energies)
+        used = set().union(*(sym.sympify(ex).free_symbols for ex in exprs))
+        return [s for s in self.sm.symbols.values() if s in used and s not in self.states and s not in self.inputs]
+
+    def __str__(self):
+        names = ", ".join(s.name for s in self.states)
+        return f"PortHamiltonian(x = [{names}], H = {self.H})"
+
+
+def port_hamiltonian_form(es: list[FlyEdge], energies: dict | None = None) -> PortHamiltonian:
+    """
+    Export the port-Hamiltonian form (J, R, grad H, G) of a causal bond graph
+
+    The storage constitutive equations f_nn = p_nn/I_nn and e_nn = q_nn/C_nn are replaced by
+    the co-energy variables dH/dp_nn and dH/dq_nn, so solving the junction structure gives
+    xdot = K dH/dx + G u with J = (K - K^T)/2 and R = -(K + K^T)/2.
+
+    energies optionally replaces the quadratic energy p_nn**2/(2 I_nn) or q_nn**2/(2 C_nn)
+    of a state by a nonlinear one, keyed by the state name, e.g.
+
+        energies = {"q_02": "Piecewise((k_t*q_02**2/2, q_02 >= 0), (0, True))"}
+    """
+    energies = energies or {}
+    equations, sm = generate_symbols(es)
+
+    states = [s for n, s in sm.symbols.items() if n.startswith(('p_', 'q_'))]
+    inputs = [s for n, s in sm.symbols.items() if n.startswith(('SE_', 'SF_'))]
+
+    # co-energy symbols dH/dx for every state
+    co_energy = {x: sm.add_symbol(f"dH_{x.name}") for x in states}
+
+    new_equations = []
+    for eq in equations:
+        storage = [x for x in states if x in eq.rhs.free_symbols]
+        if storage and isinstance(eq.lhs, sym.Symbol) and not eq.lhs.name.startswith(('pdot_', 'qdot_')):
+            # f_nn = p_nn / I_nn  ->  f_nn = dH_p_nn
+            new_equations.append(sym.Eq(eq.lhs, co_energy[storage[0]]))
+        else:
+            new_equations.append(eq)
+
+    unknowns = [s for n, s in sm.symbols.items() if n.startswith(('pdot_', 'qdot_', 'e_', 'f_'))]
+    solution = sym.solve(new_equations, unknowns, dict=True)
+    if not solution:
+        raise ValueError("Bond equations have no solution, check the causality.")
+    solution = solution[0]
+
+    dots = sym.Matrix([solution[sm.get_symbol(x.name.replace("_", "dot_", 1))] for x in states])
+    z = [co_energy[x] for x in states]
+    K = dots.jacobian(z) if z else sym.zeros(0, 0)
+    G = dots.jacobian(inputs) if inputs else sym.zeros(len(states), 0)
+
+    remainder = sym.simplify(dots - K * sym.Matrix(z) - G * sym.Matrix(inputs))
+    if any(r != 0 for r in remainder) or any((k.free_symbols & set(z)) for k in K):
+        raise ValueError("Junction structure is not linear in the co-energy variables.")
+
+    J = sym.simplify((K - K.T) / 2)
+    R = sym.simplify(-(K + K.T) / 2)
+
+    # stored energy of each state
+    state_energies = []
+    for x in states:
+        num = int(x.name.split("_")[1])
+        if x.name in energies:
+            law = energies[x.name]
+            h = sym.sympify(law, locals=dict(sm.symbols)) if isinstance(law, str) else sym.sympify(law)
+            h = h.xreplace({s: sm.add_symbol(s.name) for s in h.free_symbols})
+        elif x.name.startswith("p_"):
+            h = x**2 / (2 * sm.add_symbol(f"I_{num:02d}"))
+        else:
+            h = x**2 / (2 * sm.add_symbol(f"C_{num:02d}"))
+        state_energies.append(h)
+
+    return PortHamiltonian(states, inputs, J, R, G, state_energies, sm)
 
 
 def plot_graph(edges: list[FlyEdge], node_names: list[str], ofname: str) -> None:
@@ -0,0 +1,176 @@
+import numpy as np
+from lib_bonds import BondTable, NODETYPE, assign_causality_to_all_nodes
+
+NODE_TYPES = np.array([t.value for t in NODETYPE])
+# number of bonds every node type must have, junctions need at least two
+ONE_PORT = ("SE", "SF", "I", "C", "R")
+TWO_PORT = ("TF", "GY")
+JUNCTIONS = ("0", "1")
+
+
+def node_names(types, ids) -> np.ndarray:
+    """
+    Node names "<type>_<id>" for arrays of types and ids, e.g. ("I", 3) -> "I_3"
+    """
+    types = np.asarray(types, dtype=str)
+    ids = np.asarray(ids).astype(str)
+    return np.char.add(np.char.add(types, "_"), ids)
+
+
+def node_types(names) -> np.ndarray:
+    return np.char.partition(np.asarray(names, dtype=str), "_")[..., 0]
+
+
+def _first(values, mask, n: int = 5) -> str:
+    bad = np.asarray(values)[mask][:n]
+    more = ", ..." if np.count_nonzero(mask) > n else ""
+    return ", ".join(str(v) for v in bad) + more
+
+
+def validate_edges(nums, src, dest, pwr_to_dest) -> None:
+    """
+    Check a whole graph given as arrays in one vectorized pass: unique bond numbers,
+    known node types, no self loops, 0/1 power directions and the number of bonds per node
+    (one for SE, SF, I, C, R, two for TF and GY, at least two for 0 and 1 junctions).
+    """
+    nums = np.asarray(nums)
+    src = np.asarray(src, dtype=str)
+    dest = np.asarray(dest, dtype=str)
+    pwr_to_dest = np.asarray(pwr_to_dest)
+    if not (len(nums) == len(src) == len(dest) == len(pwr_to_dest)):
+        raise ValueError("Bond arrays must have the same length.")
+
+    uniq, counts = np.unique(nums, return_counts=True)
+    if np.any(counts > 1):
+        raise ValueError(f"Duplicate bond numbers: {_first(uniq, counts > 1)}")
+    if np.any(nums < 1):
+        raise ValueError(f"Bond numbers must be positive: {_first(nums, nums < 1)}")
+
+    loops = src == dest
+    if np.any(loops):
+        raise ValueError(f"Bonds connect a node to itself: {_first(nums, loops)}")
+
+    bad_pwr = ~np.isin(pwr_to_dest, (0, 1))
+    if np.any(bad_pwr):
+        raise ValueError(f"Power directions must be 0 or 1, bonds {_first(nums, bad_pwr)}")
+
+    nodes, degree = np.unique(np.concatenate((src, dest)), return_counts=True)
+    types = node_types(nodes)
+    unknown = ~np.isin(types, NODE_TYPES)
+    if np.any(unknown):
+        raise ValueError(f"Unknown node types: {_first(nodes, unknown)}")
+
+    bad_degree = ((np.isin(types, ONE_PORT) & (degree != 1))
+                  | (np.isin(types, TWO_PORT) & (degree != 2))
+                  | (np.isin(types, JUNCTIONS) & (degree < 2)))
+    if np.any(bad_degree):
+        raise ValueError(f"Nodes with the wrong number of bonds: {_first(nodes, bad_degree)}")
+
+
+class GraphBuilder:
+    """
+    Build large bond graphs from arrays instead of one FlyEdge at a time.
+
+        gb = GraphBuilder()
+        gb.add(["SE_f"], ["1_m0"])
+        gb.chain(1000, tag="m")
+        es = gb.build(causality=True)
+
+    Bonds are numbered in the order they are added. Validation runs once, in build().
+    """
+    def __init__(self):
+        self._src = []
+        self._dest = []
+        self._pwr = []
+        self._width = []
+        self.n_bonds = 0
+
+    def add(self, src, dest, pwr_to_dest=1, width=1) -> np.ndarray:
+        """
+        Add bonds from arrays of source and destination node names; pwr_to_dest and width
+        broadcast. Returns the bond numbers.
+        """
+        src = np.asarray(src, dtype=str).reshape(-1)
+        dest = np.asarray(dest, dtype=str).reshape(-1)
+        if len(src) != len(dest):
+            raise ValueError(f"{len(src)} source nodes for {len(dest)} destination nodes.")
+        n = len(src)
+        self._src.append(src)
+        self._dest.append(dest)
+        self._pwr.append(np.broadcast_to(np.asarray(pwr_to_dest, dtype=np.int64), (n,)))
+        self._width.append(np.broadcast_to(np.asarray(width, dtype=np.int64), (n,)))
+        nums = np.arange(self.n_bonds + 1, self.n_bonds + n + 1)
+        self.n_bonds += n
+        return nums
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (nums, src, dest, pwr_to_dest, width) of all bonds added so far
+        """
+        if not self._src:
+            empty = np.array([], dtype=np.int64)
+            return empty, np.array([], dtype=str), np.array([], dtype=str), empty, empty
+        return (np.arange(1, self.n_bonds + 1), np.concatenate(self._src), np.concatenate(self._dest),
+                np.concatenate(self._pwr), np.concatenate(self._width))
+
+    def build(self, causality: bool = False) -> BondTable:
+        """
+        Validate and store the bonds in a BondTable, whose rows read as FlyEdge views
+        """
+        nums, src, dest, pwr, width = self.arrays()
+        validate_edges(nums, src, dest, pwr)
+        es = BondTable.from_arrays(nums, src, dest, pwr, width)
+        if causality:
+            assign_causality_to_all_nodes(es, report=False)
+        return es
+
+    def _elements(self, nodes: np.ndarray, elements, suffix: str = "") -> None:
+        ids = np.char.partition(nodes, "_")[:, 2]
+        for el in elements:
+            self.add(nodes, node_names(el, np.char.add(ids, suffix)))
+
+    def chain(self, n: int, tag: str = "n", node: str = "1", elements=("I", "R"),
+              link: str = "0", link_elements=("C",)) -> np.ndarray:
+        """
+        n junctions of type node (named <node>_<tag><k>), each with one bond to every
+        element type in elements, consecutive junctions joined through a link junction
+        carrying link_elements. The defaults give a mass-spring-damper chain:
+        1 junctions with I and R, springs C on the 0 junctions between them.
+        Returns the names of the n main junctions.
+        """
+        k = np.arange(n)
+        nodes = node_names(node, np.char.add(tag, k.astype(str)))
+        self._elements(nodes, elements)
+        links = node_names(link, np.char.add(tag, k[:-1].astype(str)))
+        self.add(nodes[:-1], links)
+        self._elements(links, link_elements, "l")
+        self.add(links, nodes[1:])
+        return nodes
+
+    def ladder(self, n: int, tag: str = "n", node: str = "0", elements=("C",),
+               link: str = "1", link_elements=("R", "I")) -> np.ndarray:
+        """
+        Lumped transmission line: shunt C on 0 junctions, series R and I on the 1 junctions between them
+        """
+        return self.chain(n, tag, node, elements, link, link_elements)
+
+    def grid(self, nx: int, ny: int, tag: str = "g", node: str = "1", elements=("I", "R"),
+             link: str = "0", link_elements=("C",)) -> np.ndarray:
+        """
+        nx by ny junctions joined to their right and upper neighbours like chain().
+        Returns the (nx, ny) array of main junction names <node>_<tag><i>.<j>.
+        """
+        i, j = np.meshgrid(np.arange(nx), np.arange(ny), indexing="ij")
+        ids = np.char.add(np.char.add(np.char.add(tag, i.astype(str)), "."), j.astype(str))
+        nodes = node_names(node, ids)
+        self._elements(nodes.reshape(-1), elements)
+        for axis, (a, b) in (("x", (nodes[:-1, :], nodes[1:, :])), ("y", (nodes[:, :-1], nodes[:, 1:]))):
+            a = a.reshape(-1)
+            b = b.reshape(-1)
+            if not len(a):
+                continue
+            links = np.char.add(node_names(link, np.char.partition(a, "_")[:, 2]), axis)
+            self.add(a, links)
+            self._elements(links, link_elements, "l")
+            self.add(links, b)
+        return nodes
@@ -0,0 +1,159 @@
+import numpy as np
+import sympy as sym
+from lib_bonds import FlyEdge
+from lib_model import CompiledModel
+
+
+def _cumulative_trapezoid(y: np.ndarray, t: np.ndarray) -> np.ndarray:
+    out = np.zeros(len(t))
+    if len(t) > 1:
+        out[1:] = np.cumsum(0.5 * (y[1:] + y[:-1]) * np.diff(t))
+    return out
+
+
+def _element_ports(es: list[FlyEdge], types: tuple[str, ...]) -> list[tuple[int, str, float]]:
+    """
+    (bond number, element node name, sign) for every bond attached to an element of the given types.
+    sign is +1 when the half arrow points into the element, so sign * e * f is the power into it.
+    """
+    ports = []
+    for e in es:
+        if e.dest.split("_")[0] in types:
+            ports.append((e.num, e.dest, 1.0 if e.pwr_to_dest else -1.0))
+        if e.src.split("_")[0] in types:
+            ports.append((e.num, e.src, -1.0 if e.pwr_to_dest else 1.0))
+    return ports
+
+
+class EnergyReport:
+    """
+    Energy bookkeeping of one trajectory
+
+    stored       (n_t, n_storage) energy in every I and C element
+    dissipated   (n_t, n_R) power into every R element
+    supplied     (n_t, n_sources) power delivered by every SE and SF
+    residual     E(t) - E(0) - integral(supplied - dissipated), zero for an exact solution
+    """
+    def __init__(self, t, stored, storage_names, dissipated, r_names, supplied, source_names):
+        self.t = t
+        self.stored = stored
+        self.storage_names = storage_names
+        self.dissipated = dissipated
+        self.r_names = r_names
+        self.supplied = supplied
+        self.source_names = source_names
+
+        self.total_stored = stored.sum(axis=1)
+        self.energy_supplied = _cumulative_trapezoid(supplied.sum(axis=1), t)
+        self.energy_dissipated = _cumulative_trapezoid(dissipated.sum(axis=1), t)
+        self.residual = self.total_stored - self.total_stored[0] - self.energy_supplied + self.energy_dissipated
+
+    @property
+    def scale(self) -> float:
+        """
+        Energy scale used to make the residual relative
+        """
+        return float(max(np.abs(self.total_stored).max(), np.abs(self.energy_supplied).max(),
+                         np.abs(self.energy_dissipated).max(), np.finfo(float).tiny))
+
+    @property
+    def relative_residual(self) -> np.ndarray:
+        return self.residual / self.scale
+
+    def ok(self, rtol: float = 1e-3) -> bool:
+        """
+        True when the balance residual stays within rtol of the energy scale
+        """
+        return bool(np.all(np.abs(self.relative_residual) <= rtol))
+
+    def worst(self) -> tuple[float, float]:
+        """
+        Time and relative value of the largest balance residual
+        """
+        k = int(np.argmax(np.abs(self.residual)))
+        return float(self.t[k]), float(self.relative_residual[k])
+
+    def __str__(self):
+        t_w, r_w = self.worst()
+        return (f"EnergyReport: stored {self.total_stored[-1]:.6g}, supplied {self.energy_supplied[-1]:.6g}, "
+                f"dissipated {self.energy_dissipated[-1]:.6g}, worst residual {r_w:.3e} at t = {t_w:.6g}")
+
+
+class EnergyBalance:
+    """
+    Stored energy, dissipated power and supplied power of a compiled model, evaluated
+    vectorized over whole trajectories.
+
+    Storage energies are the integrals of the element laws, E = int f dp for I and
+    E = int e dq for C, so nonlinear laws of compile_model are handled as well.
+    """
+    def __init__(self, model: CompiledModel, es: list[FlyEdge], params: dict):
+        self.model = model
+        self.p = model.param_vector(params)
+        syms = model.symbols
+        param_syms = [syms[n] for n in model.params]
+        other_vars = {syms[n] for n in model.states + model.inputs}
+
+        # storage energies per state
+        self.storage_names = []
+        self._energy_funs = []
+        for state in model.states:
+            x = syms[state]
+            num = state.split("_")[1]
+            co_name = f"f_{num}" if state.startswith("p_") else f"e_{num}"
+            co = model.output_exprs[model.output_index[co_name]]
+            if co.free_symbols & (other_vars - {x}):
+                raise ValueError(f"Energy of {state} is not separable, {co_name} = {co}")
+            s = sym.Dummy("s", real=True)
+            energy = sym.integrate(co.xreplace({x: s}), (s, 0, x))
+            self._energy_funs.append(sym.lambdify([x, param_syms], energy, "numpy"))
+            self.storage_names.append(state)
+
+        ports = {num: name for num, name, _ in _element_ports(es, ("I", "C"))}
+        self.storage_elements = [ports.get(int(n.split("_")[1]), "") for n in self.storage_names]
+
+        self.r_ports = _element_ports(es, ("R",))
+        # a source supplies the power flowing out of it, so flip the sign of "into the element"
+        self.source_ports = [(num, name, -sign) for num, name, sign in _element_ports(es, ("SE", "SF"))]
+
+    def stored_energy(self, X: np.ndarray) -> np.ndarray:
+        """
+        Energy in every I and C element, X has shape (n_t, n_states)
+        """
+        X = np.atleast_2d(X)
+        out = np.empty((X.shape[0], len(self._energy_funs)))
+        for i, fun in enumerate(self._energy_funs):
+            out[:, i] = fun(X[:, i], self.p)
+        return out
+
+    def _port_power(self, Y: np.ndarray, ports) -> np.ndarray:
+        idx = self.model.output_index
+        out = np.empty((Y.shape[1], len(ports)))
+        for i, (num, _, sign) in enumerate(ports):
+            out[:, i] = sign * Y[idx[f"e_{num:02d}"]] * Y[idx[f"f_{num:02d}"]]
+        return out
+
+    def analyze(self, t, X, U) -> EnergyReport:
+        """
+        Energy report of a trajectory. X has shape (n_t, n_states); U is an input table
+        of shape (n_t, n_inputs), a constant input vector or a callable u_fun(t).
+        """
+        t = np.asarray(t, dtype=float)
+        X = np.asarray(X, dtype=float)
+        n_t = len(t)
+        m = len(self.model.inputs)
+
+        if callable(U):
+            U = np.array([np.asarray(U(tk), dtype=float) for tk in t]).reshape(n_t, m)
+        else:
+            U = np.broadcast_to(np.asarray(U, dtype=float), (n_t, m))
+
+        Y = self.model.output(X.T, U.T, self.p[:, None] if self.p.size else self.p)
+
+        stored = self.stored_energy(X)
+        dissipated = self._port_power(Y, self.r_ports)
+        supplied = self._port_power(Y, self.source_ports)
+
+        return EnergyReport(t, stored, [f"{n} ({s})" for n, s in zip(self.storage_elements, self.storage_names)],
+                            dissipated, [f"{name} ({num:02d})" for num, name, _ in self.r_ports],
+                            supplied, [f"{name} ({num:02d})" for num, name, _ in self.source_ports])
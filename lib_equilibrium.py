@@ -0,0 +1,136 @@
+import numpy as np
+from lib_model import CompiledModel
+
+
+class EquilibriumResult:
+    """
+    Static equilibrium of a compiled model, all pdot_nn = qdot_nn = 0
+
+    x has shape (n_states,) for a single case or (n_states, n_cases) for a batch of parameter sets.
+    residual is F(x), the state derivatives left at x, with the same shape.
+    """
+    def __init__(self, states: list[str], x: np.ndarray, converged: np.ndarray, iterations: int, residual: np.ndarray):
+        self.states = states
+        self.x = x
+        self.converged = converged
+        self.iterations = iterations
+        self.residual = residual
+
+    @property
+    def success(self) -> bool:
+        return bool(np.all(self.converged))
+
+    @property
+    def residual_norm(self) -> np.ndarray:
+        """
+        ||F(x)|| per case
+        """
+        return np.linalg.norm(self.residual, axis=0)
+
+    def as_dict(self) -> dict:
+        """
+        Equilibrium states by name, e.g. {"q_09": ..., "p_12": ...}
+        """
+        return {name: self.x[i] for i, name in enumerate(self.states)}
+
+    def __str__(self):
+        n_ok = int(np.sum(self.converged))
+        return (f"EquilibriumResult({n_ok}/{np.size(self.converged)} converged in {self.iterations} iterations, "
+                f"max residual {np.max(self.residual_norm):.3g})")
+
+
+def _newton_step(J: np.ndarray, F: np.ndarray) -> np.ndarray:
+    """
+    Solve J dx = -F for a batch, J has shape (k, n, n) and F (k, n).
+    Falls back to the pseudo-inverse when some Jacobian is singular.
+    """
+    try:
+        return -np.linalg.solve(J, F[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        return -(np.linalg.pinv(J) @ F[..., None])[..., 0]
+
+
+def solve_equilibrium(model: CompiledModel, params: dict, inputs: dict | None = None, x0=None,
+                      tol: float = 1e-10, max_iter: int = 50, max_halvings: int = 20,
+                      ftol: float | None = None) -> EquilibriumResult:
+    """
+    Find the static equilibrium of a compiled bond-graph model under constant sources
+    with a damped Newton iteration on the generated state Jacobian.
+
+    A case stops when its Newton step falls below tol; it has converged only if ||F(x)|| is
+    then below ftol as well, which defaults to tol times (1 + ||F(x0)||). A case that stalls
+    where there is no equilibrium (e.g. a wheel lifted off its tyre law) is not converged.
+
+    Parameter and source values may be arrays of equal length, in which case every
+    parameter set is solved at once and x has a trailing case axis.
+    """
+    inputs = inputs or {}
+    unknown = [n for n in inputs if n not in model.input_index]
+    if unknown:
+        raise ValueError(f"Unknown sources: {', '.join(unknown)}")
+
+    p = model.param_vector(params)
+    u = np.array(np.broadcast_arrays(*[np.asarray(inputs.get(n, 0.0), dtype=float) for n in model.inputs])) \
+        if model.inputs else np.zeros(0)
+
+    n = model.n_states
+    batch = np.broadcast_shapes(p.shape[1:], u.shape[1:], np.shape(x0)[1:] if x0 is not None else ())
+    single = batch == ()
+    k = int(np.prod(batch)) if batch else 1
+
+    # work on a flat (n, k) batch
+    p = np.broadcast_to(p.reshape(p.shape[:1] + (-1,)) if p.ndim > 1 else p[:, None], (len(p), k))
+    u = np.broadcast_to(u.reshape(u.shape[:1] + (-1,)) if u.ndim > 1 else u[:, None], (len(u), k))
+    if x0 is None:
+        x = np.zeros((n, k))
+    else:
+        x0 = np.asarray(x0, dtype=float)
+        x = np.array(np.broadcast_to(x0.reshape(n, -1) if x0.ndim > 1 else x0[:, None], (n, k)))
+
+    def residual(x, cols):
+        return model.derivatives(x, u[:, cols], p[:, cols])
+
+    active = np.ones(k, dtype=bool)
+    F = residual(x, slice(None))
+    norm = np.linalg.norm(F, axis=0)
+    ftol = tol * (1.0 + norm) if ftol is None else np.full(k, ftol)
+
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        cols = np.flatnonzero(active)
+        if cols.size == 0:
+            iterations -= 1
+            break
+
+        J = model.jacobian(x[:, cols], u[:, cols], p[:, cols])        # (n, n, k)
+        dx = _newton_step(np.moveaxis(J, -1, 0), F[:, cols].T).T       # (n, k)
+
+        # backtracking line search on the residual norm, per case: a step is taken only if it
+        # does not raise the residual, a case that finds none keeps its iterate (step 0) and stops
+        step = np.ones(cols.size)
+        accepted = np.zeros(cols.size, dtype=bool)
+        for halving in range(max_halvings + 1):
+            if halving:
+                step[~accepted] *= 0.5
+            trying = np.flatnonzero(~accepted)
+            x_try = x[:, cols[trying]] + step[trying] * dx[:, trying]
+            F_try = residual(x_try, cols[trying])
+            norm_try = np.linalg.norm(F_try, axis=0)
+            ok = (norm_try <= norm[cols[trying]]) | (norm[cols[trying]] == 0)
+            taken = cols[trying[ok]]
+            x[:, taken] = x_try[:, ok]
+            F[:, taken] = F_try[:, ok]
+            norm[taken] = norm_try[ok]
+            accepted[trying[ok]] = True
+            if accepted.all():
+                break
+        step[~accepted] = 0.0
+
+        small_step = np.linalg.norm(step * dx, axis=0) <= tol * (1.0 + np.linalg.norm(x[:, cols], axis=0))
+        active[cols[small_step | (norm[cols] == 0)]] = False
+
+    converged = ~active & (norm <= ftol)
+    if single:
+        return EquilibriumResult(model.states, x[:, 0], converged[0], iterations, F[:, 0])
+    return EquilibriumResult(model.states, x.reshape((n,) + batch), converged.reshape(batch),
+                             iterations, F.reshape((n,) + batch))
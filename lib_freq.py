@@ -0,0 +1,131 @@
+import numpy as np
+from lib_linear import StateSpace
+from lib_model import CompiledModel
+
+
+class FrequencyResponse:
+    """
+    Transfer functions H(j w) from the selected sources to the selected bond efforts/flows
+
+    H has shape (n_freqs, n_outputs, n_inputs), freqs are in Hz.
+    """
+    def __init__(self, freqs: np.ndarray, H: np.ndarray, inputs: list[str], outputs: list[str]):
+        self.freqs = freqs
+        self.H = H
+        self.inputs = inputs
+        self.outputs = outputs
+
+    def tf(self, output: str, input: str) -> np.ndarray:
+        """
+        Complex response of one output to one source over all frequencies
+        """
+        return self.H[:, self.outputs.index(output), self.inputs.index(input)]
+
+    def bode(self, output: str, input: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Magnitude in dB and unwrapped phase in degrees of one transfer function
+        """
+        h = self.tf(output, input)
+        with np.errstate(divide="ignore"):
+            mag_db = 20.0 * np.log10(np.abs(h))
+        phase_deg = np.degrees(np.unwrap(np.angle(h)))
+        return mag_db, phase_deg
+
+    def peak(self, output: str, input: str) -> tuple[float, float]:
+        """
+        Frequency (Hz) and magnitude of the largest response of one transfer function
+        """
+        mag = np.abs(self.tf(output, input))
+        k = int(np.argmax(mag))
+        return float(self.freqs[k]), float(mag[k])
+
+
+def _select(ss: StateSpace, inputs, outputs):
+    inputs = list(ss.inputs) if inputs is None else list(inputs)
+    outputs = list(ss.outputs) if outputs is None else list(outputs)
+    unknown = [n for n in inputs if n not in ss.input_index] + [n for n in outputs if n not in ss.output_index]
+    if unknown:
+        raise ValueError(f"Unknown inputs/outputs: {', '.join(unknown)}")
+    cols = [ss.input_index[n] for n in inputs]
+    rows = [ss.output_index[n] for n in outputs]
+    A = ss.A.toarray()
+    B = ss.B.toarray()[:, cols]
+    C = ss.C.toarray()[rows]
+    D = ss.D.toarray()[np.ix_(rows, cols)]
+    return A, B, C, D, inputs, outputs
+
+
+def _response_eig(A, B, C, D, s, eig=None):
+    """
+    H(s) = C V (s I - L)^-1 V^-1 B + D for all s at once, using A = V L V^-1;
+    eig is the (L, V) of np.linalg.eig(A) when the caller already has it
+    """
+    lam, V = np.linalg.eig(A) if eig is None else eig
+    Bt = np.linalg.solve(V, B)
+    Ct = C @ V
+    inv = 1.0 / (s[:, None] - lam[None, :])
+    return np.einsum('on,kn,ni->koi', Ct, inv, Bt, optimize=True) + D[None, :, :]
+
+
+def _response_solve(A, B, C, D, s, chunk):
+    """
+    H(s) = C (s I - A)^-1 B + D with one batched complex solve per chunk of frequencies
+    """
+    n = A.shape[0]
+    H = np.empty((len(s), C.shape[0], B.shape[1]), dtype=complex)
+    eye = np.eye(n)
+    for start in range(0, len(s), chunk):
+        sk = s[start:start + chunk]
+        lhs = sk[:, None, None] * eye[None, :, :] - A[None, :, :]
+        X = np.linalg.solve(lhs, np.broadcast_to(B, (len(sk),) + B.shape))
+        H[start:start + chunk] = C[None, :, :] @ X + D[None, :, :]
+    return H
+
+
+def frequency_response(system: StateSpace | CompiledModel, freqs, inputs: list[str] | None = None,
+                       outputs: list[str] | None = None, method: str = "auto",
+                       x0=None, u0=None, params: dict | None = None, chunk: int = 512) -> FrequencyResponse:
+    """
+    Evaluate the transfer functions from sources (SE_nn, SF_nn) to bond efforts/flows (e_nn, f_nn)
+    over all frequencies (Hz) in one vectorized pass.
+
+    A CompiledModel is linearized about the operating point (x0, u0) first.
+    method "eig" diagonalizes A once, "solve" does batched complex linear solves and
+    "auto" uses the eigendecomposition unless the eigenvectors are ill-conditioned.
+    """
+    if isinstance(system, CompiledModel):
+        if params is None:
+            raise ValueError("params are required to linearize a CompiledModel.")
+        x0 = np.zeros(system.n_states) if x0 is None else x0
+        u0 = np.zeros(len(system.inputs)) if u0 is None else u0
+        system = system.linearize(x0, u0, params)
+
+    A, B, C, D, inputs, outputs = _select(system, inputs, outputs)
+    freqs = np.atleast_1d(np.asarray(freqs, dtype=float))
+    s = 2j * np.pi * freqs
+
+    eig = None
+    if method == "auto":
+        method = "solve"
+        if A.shape[0]:
+            eig = np.linalg.eig(A)
+            if np.linalg.cond(eig[1]) < 1e8:
+                method = "eig"
+
+    if method == "eig":
+        H = _response_eig(A, B, C, D, s, eig)
+    elif method == "solve":
+        H = _response_solve(A, B, C, D, s, chunk)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    return FrequencyResponse(freqs, H, inputs, outputs)
+
+
+def bode(system: StateSpace | CompiledModel, output: str, input: str, freqs, **kwargs) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bode data (freqs in Hz, magnitude in dB, phase in degrees) of one transfer function
+    """
+    fr = frequency_response(system, freqs, inputs=[input], outputs=[output], **kwargs)
+    mag_db, phase_deg = fr.bode(output, input)
+    return fr.freqs, mag_db, phase_deg
@@ -0,0 +1,211 @@
+from lib_bonds import FLOWSIDE, FlyEdge, NODETYPE, read_graph_data
+
+JUNCTION_TYPES = (NODETYPE.ZERO.value, NODETYPE.ONE.value)
+
+
+def node_type_of(node: dict) -> str:
+    """
+    Node type of an editor node: its nodetype, or for files without one (the HTML editor)
+    the longest node type its label starts with ("C_s" -> "C", "SE2" -> "SE"); failing that
+    "0" for junctions and "SE" for other nodes, as the Tk editor loads such files.
+    """
+    if "nodetype" in node:
+        return node["nodetype"]
+    label = str(node.get("label", ""))
+    is_junction = node.get("type") == "junction"
+    kinds = JUNCTION_TYPES if is_junction else tuple(t.value for t in NODETYPE if t.value not in JUNCTION_TYPES)
+    matches = [kind for kind in kinds if label.startswith(kind)]
+    if matches:
+        return max(matches, key=len)
+    return NODETYPE.ZERO.value if is_junction else NODETYPE.SE.value
+
+
+def _bond_num(label) -> int:
+    try:
+        return int(label)
+    except (TypeError, ValueError):
+        return 0
+
+
+class GraphModel:
+    """
+    Editor graph held once, with the indices the editor and the analysis both need:
+    id -> node, id -> edge, bond label -> edges and node id -> incident edges.
+
+    Nodes and edges are dicts in the editor JSON schema. Every edge owns a FlyEdge
+    (src and dest are the node names <nodetype>_<id>), so lib_bonds works on bonds()
+    directly and the causality it assigns is the one the editor draws; the flow side
+    of an edge lives only in its FlyEdge.
+    """
+    def __init__(self):
+        self.nodes = {}
+        self.edges = {}
+        self.next_id = 1
+        # top-level keys of a loaded file that the model does not use, written back by to_json
+        self.meta = {}
+        self._bonds = {}
+        self._by_label = {}
+        self._incident = {}
+        self._bond_list = None
+
+    @classmethod
+    def from_json(cls, data: dict) -> "GraphModel":
+        graph = cls()
+        for node in data.get("nodes", []):
+            graph.add_node(node)
+        for edge in data.get("edges", []):
+            graph.add_edge(edge)
+        graph.next_id = max(data.get("next_id", 1), graph.next_id)
+        graph.meta = {k: v for k, v in data.items() if k not in ("nodes", "edges", "next_id")}
+        return graph
+
+    @classmethod
+    def load(cls, fname) -> "GraphModel":
+        """
+        Model of an editor JSON file or binary snapshot
+        """
+        return cls.from_json(read_graph_data(fname))
+
+    def to_json(self) -> dict:
+        edges = [dict(edge, flow_side=self._bonds[edge_id].flow_side.value) for edge_id, edge in self.edges.items()]
+        return {"nodes": list(self.nodes.values()), "edges": edges, "next_id": self.next_id, **self.meta}
+
+    def _take_id(self, item: dict, items: dict) -> int:
+        if "id" not in item:
+            item["id"] = self.next_id
+        if item["id"] in items:
+            raise ValueError(f"Id {item['id']} is already in the graph.")
+        if isinstance(item["id"], int):
+            self.next_id = max(self.next_id, item["id"] + 1)
+        return item["id"]
+
+    def add_node(self, node: dict) -> dict:
+        """
+        Add a node dict ({x, y, label, nodetype, ...}); it gets the next free id if it has none.
+        type defaults to "junction" for 0 and 1 nodes and "node" otherwise.
+        """
+        node = dict(node)
+        node_id = self._take_id(node, self.nodes)
+        node.setdefault("type", "junction" if node.get("nodetype") in JUNCTION_TYPES else "node")
+        self.nodes[node_id] = node
+        self._incident[node_id] = {}
+        return node
+
+    def add_edge(self, edge: dict) -> dict:
+        """
+        Add an edge dict ({startNodeId, endNodeId, label, ...}) between two nodes of the graph.
+        A flow_side entry sets the causality of its bond.
+        """
+        edge = dict(edge)
+        flow_side = FLOWSIDE(edge.pop("flow_side", FLOWSIDE.IDK.value))
+        for end in ("startNodeId", "endNodeId"):
+            if edge.get(end) not in self.nodes:
+                raise ValueError(f"Edge {edge.get('label')} refers to unknown node id {edge.get(end)}.")
+        edge_id = self._take_id(edge, self.edges)
+        edge.setdefault("label", "")
+        self.edges[edge_id] = edge
+        self._bonds[edge_id] = FlyEdge(label_num=_bond_num(edge["label"]), src=self.node_name(edge["startNodeId"]),
+                                       dest=self.node_name(edge["endNodeId"]), pwr_to_dest=1,
+                                       flow_side=flow_side, width=edge.get("width", 1))
+        self._by_label.setdefault(str(edge["label"]), {})[edge_id] = None
+        self._incident[edge["startNodeId"]][edge_id] = None
+        self._incident[edge["endNodeId"]][edge_id] = None
+        self._bond_list = None
+        return edge
+
+    def remove_edge(self, edge_id: int) -> dict:
+        edge = self.edges.pop(edge_id)
+        del self._bonds[edge_id]
+        labels = self._by_label[str(edge["label"])]
+        del labels[edge_id]
+        if not labels:
+            del self._by_label[str(edge["label"])]
+        self._incident[edge["startNodeId"]].pop(edge_id, None)
+        self._incident[edge["endNodeId"]].pop(edge_id, None)
+        self._bond_list = None
+        return edge
+
+    def remove_node(self, node_id: int) -> list[dict]:
+        """
+        Remove a node and its edges; returns the removed edges
+        """
+        removed = [self.remove_edge(edge_id) for edge_id in list(self._incident[node_id])]
+        del self.nodes[node_id]
+        del self._incident[node_id]
+        return removed
+
+    def set_edge_label(self, edge_id: int, label: str) -> None:
+        edge = self.edges[edge_id]
+        labels = self._by_label[str(edge["label"])]
+        del labels[edge_id]
+        if not labels:
+            del self._by_label[str(edge["label"])]
+        edge["label"] = label
+        self._by_label.setdefault(str(label), {})[edge_id] = None
+        self._bonds[edge_id].num = _bond_num(label)
+        self._bond_list = None
+
+    def node_name(self, node_id: int) -> str:
+        """
+        Unique node name used by the bonds, <nodetype>_<id>
+        """
+        return f"{node_type_of(self.nodes[node_id])}_{node_id:02d}"
+
+    def node_names(self) -> list[str]:
+        return [self.node_name(node_id) for node_id in self.nodes]
+
+    def ends(self, edge_id: int) -> tuple[dict, dict]:
+        """
+        (start node, end node) of an edge
+        """
+        edge = self.edges[edge_id]
+        return self.nodes[edge["startNodeId"]], self.nodes[edge["endNodeId"]]
+
+    def incident(self, node_id: int) -> list[dict]:
+        return [self.edges[edge_id] for edge_id in self._incident[node_id]]
+
+    def edge_by_label(self, label) -> dict | None:
+        """
+        The edge with this label, None if there is none; ValueError if several edges share it
+        """
+        edge_ids = self._by_label.get(str(label), {})
+        if len(edge_ids) > 1:
+            raise ValueError(f"Edges {', '.join(str(i) for i in edge_ids)} share the label {label}.")
+        return self.edges[next(iter(edge_ids))] if edge_ids else None
+
+    def bond(self, edge_id: int) -> FlyEdge:
+        return self._bonds[edge_id]
+
+    def flow_side(self, edge_id: int) -> FLOWSIDE:
+        return self._bonds[edge_id].flow_side
+
+    def next_bond_number(self) -> int:
+        """
+        Smallest positive integer not used as an edge label
+        """
+        num = 1
+        while str(num) in self._by_label:
+            num += 1
+        return num
+
+    def bonds(self) -> list[FlyEdge]:
+        """
+        The FlyEdges of all edges, in edge order. They are the model's own objects:
+        causality assigned to them shows in the editor without copying back.
+        """
+        if self._bond_list is None:
+            bad = [str(edge["label"]) for edge in self.edges.values() if _bond_num(edge["label"]) < 1]
+            if bad:
+                raise ValueError(f"Edge labels must be positive bond numbers: {', '.join(bad)}")
+            self._bond_list = list(self._bonds.values())
+        return self._bond_list
+
+    def clear_causality(self) -> None:
+        for e in self._bonds.values():
+            e.flow_side = FLOWSIDE.IDK
+
+    def __len__(self):
+        return len(self.edges)
+
+    def __str__(self):
+        return f"GraphModel: {len(self.nodes)} nodes, {len(self.edges)} edges"
@@ -0,0 +1,408 @@
+import time
+import numpy as np
+import sympy as sym
+from lib_linear import StateSpace
+from lib_model import CompiledModel
+
+METHODS = ("rk4", "semi_implicit_euler", "trapezoidal")
+
+
+class TimingStats:
+    """
+    Wall-clock statistics of the individual integration steps, in microseconds
+    """
+    def __init__(self, step_ns: np.ndarray, deadline_s: float):
+        self.step_ns = step_ns
+        self.deadline_s = deadline_s
+        us = step_ns / 1e3
+        self.n_steps = len(step_ns)
+        self.mean_us = float(np.mean(us)) if self.n_steps else 0.0
+        self.p99_us = float(np.percentile(us, 99)) if self.n_steps else 0.0
+        self.max_us = float(np.max(us)) if self.n_steps else 0.0
+        self.overruns = int(np.count_nonzero(step_ns > deadline_s * 1e9))
+
+    def fits_budget(self) -> bool:
+        """
+        True when the 99th percentile step time is within the deadline
+        """
+        return self.p99_us <= self.deadline_s * 1e6
+
+    def __str__(self):
+        return (f"{self.n_steps} steps: mean {self.mean_us:.2f} us, p99 {self.p99_us:.2f} us, "
+                f"max {self.max_us:.2f} us, {self.overruns} overruns of {self.deadline_s * 1e6:.0f} us")
+
+
+class FixedStepResult:
+    """
+    Recorded trajectory of a fixed-step run, t has shape (n_records,) and x (n_records, n_states)
+    """
+    def __init__(self, t: np.ndarray, x: np.ndarray, states: list[str], timing: TimingStats):
+        self.t = t
+        self.x = x
+        self.states = states
+        self.timing = timing
+
+    def state(self, name: str) -> np.ndarray:
+        return self.x[:, self.states.index(name)]
+
+
+class FixedStepIntegrator:
+    """
+    Fixed-step integrators for compiled bond-graph models, stepping preallocated buffers in place.
+
+        rk4                  classic explicit 4th order Runge-Kutta
+        semi_implicit_euler  symplectic Euler, momenta (p_nn) first, then displacements (q_nn)
+        trapezoidal          implicit trapezoidal rule, simplified Newton with a frozen Jacobian
+
+    Inputs are held constant over a step (zero-order hold), as they would be in a sampled loop.
+    After construction, step() and run() do not allocate NumPy arrays.
+    """
+    def __init__(self, system: StateSpace | CompiledModel, dt: float, method: str = "rk4",
+                 params: dict | None = None, newton_iters: int = 2):
+        if method not in METHODS:
+            raise ValueError(f"Unknown method {method}, expected one of {', '.join(METHODS)}")
+
+        self.system = system
+        self.dt = float(dt)
+        self.method = method
+        self.newton_iters = newton_iters
+        self.states = list(system.states)
+        self.inputs = list(system.inputs)
+
+        n = len(self.states)
+        m = len(self.inputs)
+
+        if isinstance(system, CompiledModel):
+            if params is None:
+                raise ValueError("params are required to integrate a CompiledModel.")
+            self.p = system.param_vector(params)
+            self._fun = system.kernel()
+            self._jac = lambda x, u: system.jacobian(x, u, self.p)
+        else:
+            self.p = np.zeros(0)
+            A = system.A.toarray()
+            B = system.B.toarray()
+            Bu = np.empty(n)
+            def fun(x, u, p, out):
+                np.dot(A, x, out=out)
+                np.dot(B, u, out=Bu)
+                np.add(out, Bu, out=out)
+                return out
+            self._fun = fun
+            self._jac = lambda x, u: A
+
+        # preallocated state, input and stage buffers
+        self.t = 0.0
+        self.x = np.zeros(n)
+        self.u = np.zeros(m)
+        self._k1 = np.empty(n)
+        self._k2 = np.empty(n)
+        self._k3 = np.empty(n)
+        self._k4 = np.empty(n)
+        self._xs = np.empty(n)
+        self._tmp = np.empty(n)
+
+        # semi-implicit Euler masks, dt on the momentum / displacement entries
+        is_p = np.array([s.startswith("p_") for s in self.states])
+        self._h_p = np.where(is_p, self.dt, 0.0)
+        self._h_q = np.where(is_p, 0.0, self.dt)
+
+        # trapezoidal rule iteration matrix, (I - dt/2 J)^-1
+        self._M_inv = np.eye(n)
+
+        self._step = {
+            "rk4": self._step_rk4,
+            "semi_implicit_euler": self._step_semi_implicit_euler,
+            "trapezoidal": self._step_trapezoidal,
+        }[method]
+
+    def reset(self, x0, t0: float = 0.0) -> None:
+        """
+        Set the state and time, and refresh the trapezoidal Jacobian at the new state
+        """
+        self.x[:] = x0
+        self.t = float(t0)
+        if self.method == "trapezoidal":
+            self.refresh_jacobian()
+
+    def refresh_jacobian(self) -> None:
+        """
+        Re-evaluate the Jacobian used by the trapezoidal rule at the current state and input
+        """
+        n = len(self.states)
+        J = np.asarray(self._jac(self.x, self.u), dtype=float).reshape(n, n)
+        self._M_inv[:] = np.linalg.inv(np.eye(n) - 0.5 * self.dt * J)
+
+    def step(self, u=None) -> np.ndarray:
+        """
+        Advance one step in place, optionally copying a new input vector in first
+        """
+        if u is not None:
+            self.u[:] = u
+        self._step()
+        self.t += self.dt
+        return self.x
+
+    def _step_rk4(self):
+        f, x, u, p, h = self._fun, self.x, self.u, self.p, self.dt
+        k1, k2, k3, k4, xs = self._k1, self._k2, self._k3, self._k4, self._xs
+
+        f(x, u, p, k1)
+        np.multiply(k1, 0.5 * h, out=xs)
+        np.add(x, xs, out=xs)
+        f(xs, u, p, k2)
+        np.multiply(k2, 0.5 * h, out=xs)
+        np.add(x, xs, out=xs)
+        f(xs, u, p, k3)
+        np.multiply(k3, h, out=xs)
+        np.add(x, xs, out=xs)
+        f(xs, u, p, k4)
+
+        # x += h/6 (k1 + 2 k2 + 2 k3 + k4)
+        np.add(k2, k3, out=xs)
+        np.multiply(xs, 2.0, out=xs)
+        np.add(xs, k1, out=xs)
+        np.add(xs, k4, out=xs)
+        np.multiply(xs, h / 6.0, out=xs)
+        np.add(x, xs, out=x)
+
+    def _step_semi_implicit_euler(self):
+        f, x, u, p = self._fun, self.x, self.u, self.p
+        k1, tmp = self._k1, self._tmp
+
+        # momenta with the old displacements
+        f(x, u, p, k1)
+        np.multiply(k1, self._h_p, out=tmp)
+        np.add(x, tmp, out=x)
+
+        # displacements with the new momenta
+        f(x, u, p, k1)
+        np.multiply(k1, self._h_q, out=tmp)
+        np.add(x, tmp, out=x)
+
+    def _step_trapezoidal(self):
+        f, x, u, p, h = self._fun, self.x, self.u, self.p, self.dt
+        k1, k2, xs, r, dx = self._k1, self._k2, self._xs, self._tmp, self._k3
+
+        # explicit Euler predictor
+        f(x, u, p, k1)
+        np.multiply(k1, h, out=xs)
+        np.add(x, xs, out=xs)
+
+        # r = xs - x - h/2 (k1 + k2), xs -= (I - h/2 J)^-1 r
+        for _ in range(self.newton_iters):
+            f(xs, u, p, k2)
+            np.add(k1, k2, out=r)
+            np.multiply(r, -0.5 * h, out=r)
+            np.add(r, xs, out=r)
+            np.subtract(r, x, out=r)
+            np.dot(self._M_inv, r, out=dx)
+            np.subtract(xs, dx, out=xs)
+
+        x[:] = xs
+
+    def run(self, x0, n_steps: int, inputs=None, deadline: float | None = None,
+            record_every: int = 1, t0: float = 0.0) -> FixedStepResult:
+        """
+        Integrate n_steps steps from x0 and time every step.
+
+        inputs is a constant input vector, a table of shape (n_steps, n_inputs) with one row
+        per step, or a callable u_fun(t, u) that fills the input buffer u in place.
+        deadline defaults to dt, i.e. a real-time budget of one step per step of simulated time.
+        """
+        n = len(self.states)
+        deadline = self.dt if deadline is None else deadline
+        # the last step is always recorded, also when record_every does not divide n_steps
+        n_records = -(-n_steps // record_every) + 1
+
+        t_rec = np.empty(n_records)
+        x_rec = np.empty((n_records, n))
+        step_ns = np.empty(n_steps, dtype=np.int64)
+
+        u_fun = None
+        u_table = None
+        if callable(inputs):
+            u_fun = inputs
+        elif inputs is not None:
+            inputs = np.asarray(inputs, dtype=float)
+            if inputs.ndim == 2:
+                if inputs.shape[0] < n_steps:
+                    raise ValueError(f"Input table has {inputs.shape[0]} rows for {n_steps} steps.")
+                u_table = inputs
+            else:
+                self.u[:] = inputs
+
+        if u_fun is not None:
+            u_fun(t0, self.u)
+        elif u_table is not None:
+            self.u[:] = u_table[0]
+        self.reset(x0, t0)
+
+        t_rec[0] = self.t
+        x_rec[0] = self.x
+        rec = 1
+
+        step = self._step
+        clock = time.perf_counter_ns
+        for i in range(n_steps):
+            start = clock()
+            if u_fun is not None:
+                u_fun(self.t, self.u)
+            elif u_table is not None:
+                self.u[:] = u_table[i]
+            step()
+            self.t = t0 + (i + 1) * self.dt
+            step_ns[i] = clock() - start
+
+            if (i + 1) % record_every == 0 or i + 1 == n_steps:
+                t_rec[rec] = self.t
+                x_rec[rec] = self.x
+                rec += 1
+
+        return FixedStepResult(t_rec[:rec], x_rec[:rec], self.states, TimingStats(step_ns, deadline))
+
+
+PH_METHODS = ("discrete_gradient", "implicit_midpoint")
+
+
+class PortHamiltonianResult:
+    """
+    Trajectory and energy bookkeeping of a structure-preserving run
+
+    H is the stored energy, supplied the cumulative energy delivered by the sources and
+    dissipated the cumulative energy lost in the R elements, all at the recorded times.
+    """
+    def __init__(self, t, x, states, H, supplied, dissipated):
+        self.t = t
+        self.x = x
+        self.states = states
+        self.H = H
+        self.supplied = supplied
+        self.dissipated = dissipated
+
+    @property
+    def balance_residual(self) -> np.ndarray:
+        """
+        H(t) - H(0) - supplied(t) + dissipated(t), zero up to the Newton tolerance
+        """
+        return self.H - self.H[0] - self.supplied + self.dissipated
+
+    def state(self, name: str) -> np.ndarray:
+        return self.x[:, self.states.index(name)]
+
+
+class PortHamiltonianIntegrator:
+    """
+    Energy-consistent integrators for the port-Hamiltonian form xdot = (J - R) dH/dx + G u
+
+        discrete_gradient  Itoh-Abe discrete gradient of the separable storage energies,
+                           the discrete energy balance holds exactly for any H
+        implicit_midpoint  implicit midpoint rule, exact energy balance for quadratic H
+
+    Both are implicit, the step is solved by Newton iteration. Inputs are held constant over a step.
+    """
+    def __init__(self, ph, params: dict, dt: float, method: str = "discrete_gradient",
+                 tol: float = 1e-12, max_iter: int = 20):
+        if method not in PH_METHODS:
+            raise ValueError(f"Unknown method {method}, expected one of {', '.join(PH_METHODS)}")
+
+        self.dt = float(dt)
+        self.method = method
+        self.tol = tol
+        self.max_iter = max_iter
+        self.states = [s.name for s in ph.states]
+        self.inputs = [s.name for s in ph.inputs]
+
+        missing = [s.name for s in ph.params if s.name not in params]
+        if missing:
+            raise ValueError(f"Missing parameter values: {', '.join(missing)}")
+        subs = {s: float(params[s.name]) for s in ph.params}
+
+        n = len(ph.states)
+        self.J = np.array(ph.J.xreplace(subs), dtype=float).reshape(n, n)
+        self.R = np.array(ph.R.xreplace(subs), dtype=float).reshape(n, n)
+        self.G = np.array(ph.G.xreplace(subs), dtype=float).reshape(n, len(ph.inputs))
+        self.K = self.J - self.R
+
+        # separable energies H_i(x_i) with first and second derivatives
+        energies = [h.xreplace(subs) for h in ph.energies]
+        self._H = [sym.lambdify(x, h, "numpy") for x, h in zip(ph.states, energies)]
+        self._dH = [sym.lambdify(x, sym.diff(h, x), "numpy") for x, h in zip(ph.states, energies)]
+        self._d2H = [sym.lambdify(x, sym.diff(h, x, 2), "numpy") for x, h in zip(ph.states, energies)]
+
+    def energy(self, x) -> float:
+        return float(sum(h(xi) for h, xi in zip(self._H, x)))
+
+    def _apply(self, funs, x) -> np.ndarray:
+        return np.array([float(f(xi)) for f, xi in zip(funs, x)])
+
+    def _gradient(self, x, y) -> np.ndarray:
+        mid = 0.5 * (x + y)
+        if self.method == "implicit_midpoint":
+            return self._apply(self._dH, mid)
+        g = self._apply(self._dH, mid)
+        dx = y - x
+        big = np.abs(dx) > 1e-9 * (1.0 + np.abs(x))
+        if np.any(big):
+            Hy = self._apply(self._H, y)
+            Hx = self._apply(self._H, x)
+            g[big] = (Hy[big] - Hx[big]) / dx[big]
+        return g
+
+    def step(self, x, u) -> tuple[np.ndarray, np.ndarray]:
+        """
+        One implicit step, returns the new state and the discrete gradient used
+        """
+        h = self.dt
+        n = len(x)
+        forced = h * (self.G @ u)
+        y = x + h * (self.K @ self._apply(self._dH, x)) + forced
+        eye = np.eye(n)
+        for _ in range(self.max_iter):
+            g = self._gradient(x, y)
+            r = y - x - h * (self.K @ g) - forced
+            c = 0.5 * self._apply(self._d2H, 0.5 * (x + y))
+            dy = np.linalg.solve(eye - h * self.K * c[None, :], r)
+            y = y - dy
+            if np.linalg.norm(dy) <= self.tol * (1.0 + np.linalg.norm(y)):
+                break
+        return y, self._gradient(x, y)
+
+    def run(self, x0, n_steps: int, inputs=None, record_every: int = 1, t0: float = 0.0) -> PortHamiltonianResult:
+        """
+        Integrate n_steps steps from x0, tracking stored, supplied and dissipated energy.
+        inputs is a constant vector, a table with one row per step or a callable u_fun(t).
+        """
+        m = len(self.inputs)
+        x = np.array(x0, dtype=float)
+        n_records = -(-n_steps // record_every) + 1
+        t_rec = np.empty(n_records)
+        x_rec = np.empty((n_records, len(x)))
+        H_rec = np.empty(n_records)
+        sup_rec = np.empty(n_records)
+        dis_rec = np.empty(n_records)
+
+        def u_at(i, t):
+            if inputs is None:
+                return np.zeros(m)
+            if callable(inputs):
+                return np.asarray(inputs(t), dtype=float)
+            arr = np.asarray(inputs, dtype=float)
+            return arr[i] if arr.ndim == 2 else arr
+
+        supplied = 0.0
+        dissipated = 0.0
+        t_rec[0], x_rec[0], H_rec[0], sup_rec[0], dis_rec[0] = t0, x, self.energy(x), 0.0, 0.0
+        rec = 1
+        for i in range(n_steps):
+            t = t0 + i * self.dt
+            u = u_at(i, t)
+            x, g = self.step(x, u)
+            supplied += self.dt * float(g @ (self.G @ u))
+            dissipated += self.dt * float(g @ (self.R @ g))
+            if (i + 1) % record_every == 0 or i + 1 == n_steps:
+                t_rec[rec], x_rec[rec] = t + self.dt, x
+                H_rec[rec], sup_rec[rec], dis_rec[rec] = self.energy(x), supplied, dissipated
+                rec += 1
+
+        return PortHamiltonianResult(t_rec[:rec], x_rec[:rec], self.states, H_rec[:rec], sup_rec[:rec], dis_rec[:rec])
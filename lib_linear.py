@@ -0,0 +1,343 @@
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+import sympy as sym
+import re
+from collections import OrderedDict
+from lib_bonds import FlyEdge, symbol_width
+from lib_submodel import symbols_of, widths_of
+
+# symbol name prefixes used by generate_symbols
+UNKNOWN_PREFIXES = ('pdot_', 'qdot_', 'e_', 'f_')
+STATE_PREFIXES = ('p_', 'q_')
+INPUT_PREFIXES = ('SE_', 'SF_')
+# expanded symbol name: prefix, bond number and the element index of a vector bond
+_EXPANDED_NAME = re.compile(r"^([A-Za-z]+)_(\d+)(?:\[(\d+)\])?$")
+
+
+def expand_names(name: str, width: int) -> list[str]:
+    """
+    Scalar names of a vector bond symbol, q_02 of width 3 -> q_02[0], q_02[1], q_02[2]
+    """
+    return [name] if width == 1 else [f"{name}[{i}]" for i in range(width)]
+
+
+def bond_of(name: str) -> int:
+    """
+    Bond number of a scalar or expanded symbol name, q_02 -> 2 and q_02[1] -> 2
+    """
+    match = _EXPANDED_NAME.match(name)
+    if match is None:
+        raise ValueError(f"{name} is not a bond symbol name.")
+    return int(match.group(2))
+
+
+def _value_key(value):
+    if np.ndim(value) == 0:
+        return float(value)
+    value = np.asarray(value, dtype=float)
+    return value.shape, value.tobytes()
+
+
+class StateSpace:
+    """
+    Linear state-space model
+
+        xdot = A x + B u
+        y    = C x + D u
+
+    with x the I/C states (p_nn, q_nn), u the sources (SE_nn, SF_nn)
+    and y the effort and flow of every bond (e_nn, f_nn).
+    All four matrices are scipy.sparse CSR matrices.
+    """
+    def __init__(self, A, B, C, D, states: list[str], inputs: list[str], outputs: list[str]):
+        self.A = A
+        self.B = B
+        self.C = C
+        self.D = D
+        self.states = states
+        self.inputs = inputs
+        self.outputs = outputs
+        self.state_index = {name: i for i, name in enumerate(states)}
+        self.input_index = {name: i for i, name in enumerate(inputs)}
+        self.output_index = {name: i for i, name in enumerate(outputs)}
+
+    @property
+    def n_states(self) -> int:
+        return len(self.states)
+
+    def derivatives(self, x, u) -> np.ndarray:
+        """
+        State derivatives xdot = A x + B u
+        """
+        return self.A @ x + self.B @ u
+
+    def output(self, x, u) -> np.ndarray:
+        """
+        Bond efforts and flows y = C x + D u
+        """
+        return self.C @ x + self.D @ u
+
+    def rhs(self, u_fun):
+        """
+        Right hand side f(t, x) for scipy's solve_ivp, with u_fun(t) giving the input vector
+        """
+        A = self.A
+        B = self.B
+        def f(t, x):
+            return A @ x + B @ u_fun(t)
+        return f
+
+    def __str__(self):
+        return (f"StateSpace({self.n_states} states, {len(self.inputs)} inputs, {len(self.outputs)} outputs, "
+                f"nnz(A)={self.A.nnz})")
+
+
+class SparseJunctionStructure:
+    """
+    The bond equations of generate_symbols assembled as sparse coefficient matrices
+
+        M w + X x + U u = 0
+
+    w holds the unknowns (pdot_nn, qdot_nn, e_nn, f_nn), x the states (p_nn, q_nn)
+    and u the sources (SE_nn, SF_nn). The coefficients are sympy expressions of the
+    element parameters (I_nn, C_nn, R_nn, TF_nn, GY_nn) and are evaluated per parameter set.
+
+    Vector bonds (FlyEdge.width > 1) keep the equations the size of the schematic; every
+    coefficient becomes a block when the matrices are evaluated. A parameter value may be a
+    scalar (times identity), a length-width array (element-wise, diagonal block) or a matrix,
+    e.g. a mass matrix for I or a (width_2, width_1) modulus for TF and GY, which then map
+    f_2 = TF f_1, e_1 = TF^T e_2 and e_2 = GY f_1, e_1 = GY^T f_2.
+    Vector states, inputs and outputs are expanded as q_02[0], q_02[1], ...
+    """
+    def __init__(self, es: list[FlyEdge], cache_size: int = 32):
+
+        equations, sm = symbols_of(es)
+
+        names = list(sm.symbols.keys())
+        widths = widths_of(es)
+        self.widths = {n: symbol_width(n, widths) for n in names}
+        self.is_vector = any(w != 1 for w in self.widths.values())
+        self.unknowns = [n for n in names if n.startswith(UNKNOWN_PREFIXES)]
+        self.states = [n for n in names if n.startswith(STATE_PREFIXES)]
+        self.inputs = [n for n in names if n.startswith(INPUT_PREFIXES)]
+
+        variable_names = set(self.unknowns) | set(self.states) | set(self.inputs)
+        self.params = [n for n in names if n not in variable_names]
+
+        if len(equations) != len(self.unknowns):
+            raise ValueError(f"Bond equations are not square: {len(equations)} equations for {len(self.unknowns)} unknowns.")
+        self._expanded = {block: [x for n in block_names for x in expand_names(n, self.widths[n])]
+                          for block, block_names in (("M", self.unknowns), ("X", self.states), ("U", self.inputs))}
+
+        # state derivative names paired with the states, pdot_05 <-> p_05
+        self.dot_names = [n.replace("_", "dot_", 1) for n in self.states]
+
+        columns = {}
+        for block, block_names in (("M", self.unknowns), ("X", self.states), ("U", self.inputs)):
+            for i, n in enumerate(block_names):
+                columns[sm.symbols[n]] = (block, i)
+
+        # collect (row, col, coefficient) triplets for each block
+        triplets = {"M": [], "X": [], "U": []}
+
+        for row, eq in enumerate(equations):
+            expr = sym.expand(eq.lhs - eq.rhs)
+            variables = [s for s in expr.free_symbols if s in columns]
+
+            remainder = expr
+            for s in variables:
+                coeff = sym.diff(expr, s)
+                if coeff.free_symbols & columns.keys():
+                    raise ValueError(f"Equation {eq} is not linear in {s}.")
+                block, col = columns[s]
+                triplets[block].append((row, col, coeff))
+                remainder = remainder - coeff * s
+
+            if sym.simplify(remainder) != 0:
+                raise ValueError(f"Equation {eq} has a constant term {remainder}.")
+
+        param_syms = [sm.symbols[n] for n in self.params]
+        self._shapes = {
+            "M": (len(equations), len(self.unknowns)),
+            "X": (len(equations), len(self.states)),
+            "U": (len(equations), len(self.inputs)),
+        }
+        self._index = {}
+        self._coeff_funs = {}
+        for block, trips in triplets.items():
+            rows = np.array([t[0] for t in trips], dtype=np.int64)
+            cols = np.array([t[1] for t in trips], dtype=np.int64)
+            self._index[block] = (rows, cols)
+            self._coeff_funs[block] = sym.lambdify(param_syms, [t[2] for t in trips], "numpy")
+
+        if self.is_vector:
+            self._setup_blocks(equations, triplets, param_syms, columns)
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def _setup_blocks(self, equations, triplets, param_syms, columns) -> None:
+        """
+        Row and column offsets of the expanded system and the per-coefficient evaluators of the vector path
+        """
+        col_names = {"M": self.unknowns, "X": self.states, "U": self.inputs}
+        self._col_offsets = {}
+        for block, block_names in col_names.items():
+            offsets = np.concatenate(([0], np.cumsum([self.widths[n] for n in block_names]))).astype(np.int64)
+            self._col_offsets[block] = offsets
+
+        # an equation has the width of its left hand side, or of its terms for junction sums
+        row_widths = []
+        self._row_bonds = []
+        for eq in equations:
+            lhs = eq.lhs if eq.lhs in columns else sorted(eq.free_symbols & columns.keys(), key=str)[0]
+            row_widths.append(self.widths[lhs.name])
+            self._row_bonds.append(int(lhs.name.rsplit("_", 1)[1]))
+        self._row_offsets = np.concatenate(([0], np.cumsum(row_widths))).astype(np.int64)
+        if self._row_offsets[-1] != self._col_offsets["M"][-1]:
+            raise ValueError(f"Vector bond equations are not square: {self._row_offsets[-1]} rows "
+                             f"for {self._col_offsets['M'][-1]} unknowns.")
+
+        self._blocks = {}
+        for block, trips in triplets.items():
+            entries = []
+            for row, col, coeff in trips:
+                # coeff = rest * P**(+-1) for every parameter P it may hold as a matrix
+                monomials = {}
+                for s in coeff.free_symbols:
+                    a = coeff.as_powers_dict().get(s, 0)
+                    rest = sym.simplify(coeff / s**a)
+                    if a in (1, -1) and s not in rest.free_symbols:
+                        monomials[s.name] = (int(a), sym.lambdify(param_syms, rest, "numpy"))
+                entries.append((row, col, coeff, sym.lambdify(param_syms, coeff, "numpy"), monomials))
+            self._blocks[block] = entries
+
+    def _coefficient_block(self, row: int, coeff, fun, monomials, values: dict, args: list, cw: int):
+        rw = int(self._row_offsets[row + 1] - self._row_offsets[row])
+        matrix_params = [s.name for s in coeff.free_symbols if np.ndim(values[s.name]) == 2]
+        if not matrix_params:
+            val = np.asarray(fun(*args), dtype=float)
+            if rw != cw:
+                raise ValueError(f"Coefficient {coeff} couples widths {rw} and {cw}, it needs a matrix parameter.")
+            if val.ndim == 0:
+                return sp.identity(rw, format="coo") * float(val)
+            if val.shape != (rw,):
+                raise ValueError(f"Coefficient {coeff} has shape {val.shape}, expected ({rw},).")
+            return sp.diags(val, format="coo")
+
+        if len(matrix_params) > 1 or matrix_params[0] not in monomials:
+            raise ValueError(f"Coefficient {coeff} must be linear in one matrix parameter or its inverse.")
+        name = matrix_params[0]
+        a, rest_fun = monomials[name]
+        rest = np.asarray(rest_fun(*args), dtype=float)
+        if rest.ndim != 0:
+            raise ValueError(f"Coefficient {coeff} mixes the matrix {name} with array parameters.")
+        P = np.asarray(values[name], dtype=float)
+        if a == -1:
+            P = np.linalg.inv(P)
+        if name.startswith(("TF_", "GY_")) and int(name.rsplit("_", 1)[1]) == self._row_bonds[row]:
+            # equations of the power-in bond use the transposed modulus
+            P = P.T
+        if P.shape != (rw, cw):
+            raise ValueError(f"Parameter {name} gives a {P.shape} block, expected {(rw, cw)}.")
+        return sp.coo_matrix(float(rest) * P)
+
+    def _vector_matrices(self, params: dict):
+        values = {n: params[n] for n in self.params}
+        args = [values[n] for n in self.params]
+        n_rows = int(self._row_offsets[-1])
+        mats = []
+        for block in ("M", "X", "U"):
+            col_offsets = self._col_offsets[block]
+            rows, cols, data = [], [], []
+            for row, col, coeff, fun, monomials in self._blocks[block]:
+                cw = int(col_offsets[col + 1] - col_offsets[col])
+                blk = self._coefficient_block(row, coeff, fun, monomials, values, args, cw)
+                rows.append(blk.row + self._row_offsets[row])
+                cols.append(blk.col + col_offsets[col])
+                data.append(blk.data)
+            if data:
+                rows, cols, data = np.concatenate(rows), np.concatenate(cols), np.concatenate(data)
+            mats.append(sp.csc_matrix((data, (rows, cols)), shape=(n_rows, int(col_offsets[-1]))))
+        return tuple(mats)
+
+    def _param_key(self, params: dict) -> tuple:
+        missing = [n for n in self.params if n not in params]
+        if missing:
+            raise ValueError(f"Missing parameter values: {', '.join(missing)}")
+        if self.is_vector:
+            return tuple(_value_key(params[n]) for n in self.params)
+        return tuple(float(params[n]) for n in self.params)
+
+    def matrices(self, params: dict) -> tuple[sp.csc_matrix, sp.csc_matrix, sp.csc_matrix]:
+        """
+        Evaluate the coefficient matrices M, X, U for the given parameter values
+        """
+        key = self._param_key(params)
+        return self._matrices(key, params)
+
+    def _matrices(self, key: tuple, params: dict):
+        if self.is_vector:
+            return self._vector_matrices(params)
+        mats = []
+        for block in ("M", "X", "U"):
+            rows, cols = self._index[block]
+            data = np.array(self._coeff_funs[block](*key), dtype=float).reshape(-1)
+            mats.append(sp.csc_matrix((data, (rows, cols)), shape=self._shapes[block]))
+        return tuple(mats)
+
+    def state_space(self, params: dict, block_size: int = 256) -> StateSpace:
+        """
+        Reduce the bond equations to the state-space form for the given parameter values.
+        Results are cached per parameter set.
+        """
+        key = self._param_key(params)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        M, X, U = self._matrices(key, params)
+        try:
+            lu = spla.splu(M)
+        except RuntimeError as err:
+            raise ValueError(f"Bond equations are singular for the given parameters: {err}")
+
+        # w = -M^-1 (X x + U u), solved in column blocks to keep the dense work small
+        W_x = self._solve_columns(lu, X, block_size)
+        W_u = self._solve_columns(lu, U, block_size)
+
+        unknowns = self._expanded["M"]
+        unknown_index = {n: i for i, n in enumerate(unknowns)}
+        dot_names = [x for n in self.dot_names for x in expand_names(n, self.widths[n])]
+        dot_rows = [unknown_index[n] for n in dot_names]
+        outputs = [n for n in unknowns if n.startswith(('e_', 'f_'))]
+        out_rows = [unknown_index[n] for n in outputs]
+
+        ss = StateSpace(W_x[dot_rows], W_u[dot_rows], W_x[out_rows], W_u[out_rows],
+                        list(self._expanded["X"]), list(self._expanded["U"]), outputs)
+
+        self._cache[key] = ss
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return ss
+
+    @staticmethod
+    def _solve_columns(lu, rhs: sp.csc_matrix, block_size: int) -> sp.csr_matrix:
+        n_rows, n_cols = rhs.shape
+        blocks = []
+        for start in range(0, n_cols, block_size):
+            stop = min(start + block_size, n_cols)
+            sol = -lu.solve(rhs[:, start:stop].toarray())
+            sol[np.abs(sol) < 1e-14 * max(1.0, np.abs(sol).max(initial=0.0))] = 0.0
+            blocks.append(sp.csc_matrix(sol))
+        if not blocks:
+            return sp.csr_matrix((n_rows, 0))
+        return sp.hstack(blocks, format="csr")
+
+
+def linear_state_space(es: list[FlyEdge], params: dict) -> StateSpace:
+    """
+    Convenience wrapper, build the sparse junction structure and reduce it for one parameter set
+    """
+    return SparseJunctionStructure(es).state_space(params)
@@ -0,0 +1,172 @@
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from lib_bonds import FlyEdge
+from lib_linear import StateSpace, bond_of
+from lib_model import CompiledModel
+
+
+def state_elements(es: list[FlyEdge]) -> dict[int, str]:
+    """
+    Map bond numbers of I and C bonds to the name of their storage element node
+    """
+    elements = {}
+    for e in es:
+        for name in (e.src, e.dest):
+            if name.split("_")[0] in ("I", "C"):
+                elements[e.num] = name
+    return elements
+
+
+class Mode:
+    """
+    One eigenmode of the linearized state equations
+
+    eigenvalue   complex eigenvalue lambda of A
+    wn           undamped natural frequency |lambda| (rad/s)
+    freq         natural frequency in Hz
+    damped_freq  damped frequency |Im(lambda)| / 2 pi in Hz
+    zeta         damping ratio -Re(lambda) / |lambda|, nan for a zero eigenvalue (rigid body mode)
+    shape        complex mode shape over the states, normalized to a largest entry of 1
+    """
+    def __init__(self, eigenvalue: complex, shape: np.ndarray, states: list[str], elements: dict[int, str]):
+        self.eigenvalue = complex(eigenvalue)
+        self.wn = abs(self.eigenvalue)
+        self.freq = self.wn / (2 * np.pi)
+        self.damped_freq = abs(self.eigenvalue.imag) / (2 * np.pi)
+        self.zeta = -self.eigenvalue.real / self.wn if self.wn > 0 else np.nan
+        self.is_oscillatory = abs(self.eigenvalue.imag) > 0
+
+        k = int(np.argmax(np.abs(shape)))
+        self.shape = shape / shape[k] if shape[k] != 0 else shape
+        self.states = states
+        self.bonds = [bond_of(s) for s in states]
+        self.elements = [elements.get(b, "") for b in self.bonds]
+
+    def participation(self) -> dict[str, float]:
+        """
+        Magnitude of every state in the mode shape, keyed by state name
+        """
+        return {s: float(abs(v)) for s, v in zip(self.states, self.shape)}
+
+    def dominant(self) -> tuple[str, int, str]:
+        """
+        State, bond number and element node name with the largest mode-shape entry
+        """
+        k = int(np.argmax(np.abs(self.shape)))
+        return self.states[k], self.bonds[k], self.elements[k]
+
+    def __str__(self):
+        state, bond, element = self.dominant()
+        return (f"f = {self.freq:10.4g} Hz  zeta = {self.zeta:8.4f}  "
+                f"dominant: {state} (bond {bond:2d}, {element})")
+
+
+class ModalResult:
+    """
+    Modes of a model, sorted by natural frequency. Complex conjugate pairs are reported once.
+    """
+    def __init__(self, modes: list[Mode], states: list[str]):
+        self.modes = modes
+        self.states = states
+
+    @property
+    def frequencies(self) -> np.ndarray:
+        return np.array([m.freq for m in self.modes])
+
+    @property
+    def damping_ratios(self) -> np.ndarray:
+        return np.array([m.zeta for m in self.modes])
+
+    def shapes(self) -> np.ndarray:
+        """
+        Mode shapes as columns, shape (n_states, n_modes)
+        """
+        return np.column_stack([m.shape for m in self.modes]) if self.modes else np.zeros((len(self.states), 0))
+
+    def report(self) -> str:
+        lines = [f"{i:3d}: {m}" for i, m in enumerate(self.modes)]
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.report()
+
+
+def _dense_modes(A: np.ndarray):
+    return np.linalg.eig(A)
+
+
+def _sparse_modes(A: sp.spmatrix, n_modes: int, sigma: complex):
+    """
+    Eigenpairs closest to sigma by shift-invert Arnoldi, nudging sigma off an exact eigenvalue.
+    Asks for 2 n_modes eigenvalues, since every oscillatory mode is a conjugate pair.
+    """
+    k = min(2 * n_modes, A.shape[0] - 2)
+    try:
+        return spla.eigs(A.tocsc(), k=k, sigma=sigma, which="LM")
+    except RuntimeError:
+        scale = max(1.0, abs(sigma))
+        return spla.eigs(A.tocsc(), k=k, sigma=sigma + 1e-6 * scale, which="LM")
+
+
+def _pair_conjugates(lam: np.ndarray, V: np.ndarray) -> list[tuple[complex, np.ndarray]]:
+    """
+    One (eigenvalue, shape) per mode with Im(lambda) >= 0. A conjugate pair counts once; an
+    eigenvalue whose partner was not returned (sparse solver) stands for the pair by its conjugate.
+    """
+    pairs = []
+    used = np.zeros(len(lam), dtype=bool)
+    order = np.argsort(-lam.imag, kind="stable")
+    for i in order:
+        if used[i]:
+            continue
+        used[i] = True
+        if lam[i].imag == 0:
+            pairs.append((lam[i], V[:, i]))
+            continue
+        tol = 1e-8 * max(1.0, abs(lam[i]))
+        distance = np.abs(lam - np.conj(lam[i]))
+        distance[used] = np.inf
+        j = int(np.argmin(distance))
+        if distance[j] <= tol:
+            used[j] = True
+        if lam[i].imag > 0:
+            pairs.append((lam[i], V[:, i]))
+        else:
+            pairs.append((np.conj(lam[i]), np.conj(V[:, i])))
+    return pairs
+
+
+def modal_analysis(system: StateSpace | CompiledModel, es: list[FlyEdge] | None = None,
+                   n_modes: int | None = None, sigma: complex = 0.0, dense_limit: int = 400,
+                   x0=None, u0=None, params: dict | None = None) -> ModalResult:
+    """
+    Natural frequencies, damping ratios and mode shapes of the linearized state equations.
+
+    Models with up to dense_limit states use a dense eigensolver; larger ones use the
+    sparse shift-invert eigensolver to find the n_modes eigenvalues closest to sigma (rad/s).
+    A CompiledModel is linearized about (x0, u0) first. With es the modes are mapped back
+    to the I/C element node names.
+    """
+    if isinstance(system, CompiledModel):
+        if params is None:
+            raise ValueError("params are required to linearize a CompiledModel.")
+        x0 = np.zeros(system.n_states) if x0 is None else x0
+        u0 = np.zeros(len(system.inputs)) if u0 is None else u0
+        system = system.linearize(x0, u0, params)
+
+    n = system.n_states
+    elements = state_elements(es) if es is not None else {}
+
+    if n <= dense_limit or (n_modes is not None and n_modes >= n - 1):
+        lam, V = _dense_modes(system.A.toarray())
+    else:
+        lam, V = _sparse_modes(system.A, n_modes or min(20, n - 2), sigma)
+
+    modes = [Mode(value, shape, list(system.states), elements) for value, shape in _pair_conjugates(lam, V)]
+
+    modes.sort(key=lambda m: (m.wn, m.eigenvalue.real))
+    if n_modes is not None:
+        modes = modes[:n_modes]
+
+    return ModalResult(modes, list(system.states))
@@ -0,0 +1,258 @@
+import math
+import numpy as np
+import scipy.sparse as sp
+import sympy as sym
+from sympy.printing.pycode import pycode
+from lib_bonds import FlyEdge
+from lib_submodel import symbols_of, widths_of
+from lib_linear import StateSpace, STATE_PREFIXES, INPUT_PREFIXES
+
+# element parameter prefixes of the constitutive equations that a law may replace
+LAW_PREFIXES = ('I_', 'C_', 'R_')
+
+
+def _constitutive_index(equations: list[sym.Eq], name: str) -> int:
+    """
+    Find the constitutive equation of an I, C or R element that defines symbol `name`
+    e.g. e_08 = R_08*f_08 for name "e_08"
+    """
+    num = name.split("_")[-1]
+    for i, eq in enumerate(equations):
+        if not isinstance(eq.lhs, sym.Symbol) or eq.lhs.name != name:
+            continue
+        if any(s.name in (f"{p}{num}" for p in LAW_PREFIXES) for s in eq.rhs.free_symbols):
+            return i
+    raise ValueError(f"No constitutive I/C/R equation defines {name}, check the causality of bond {num}.")
+
+
+def _broadcast_rows(values: list, shape: tuple) -> np.ndarray:
+    """
+    Stack lambdified results (a mix of scalars and arrays) into one array of shape (len(values),) + shape
+    """
+    out = np.empty((len(values),) + shape)
+    for i, v in enumerate(values):
+        out[i] = v
+    return out
+
+
+class CompiledModel:
+    """
+    Explicit state equations of a causal bond graph, compiled to NumPy functions
+
+        xdot = F(x, u, p)
+        y    = G(x, u, p)
+
+    x are the states (p_nn, q_nn), u the sources (SE_nn, SF_nn), p the parameters and
+    y the effort and flow of every bond (e_nn, f_nn). All functions accept a trailing
+    batch axis on x, u and p, so parameter sets and operating points can be evaluated at once.
+    """
+    def __init__(self, states, inputs, params, dot_exprs, outputs, output_exprs, symbols):
+        self.states = states
+        self.inputs = inputs
+        self.params = params
+        self.outputs = outputs
+        self.dot_exprs = dot_exprs
+        self.output_exprs = output_exprs
+        self.symbols = symbols
+        self.state_index = {name: i for i, name in enumerate(states)}
+        self.input_index = {name: i for i, name in enumerate(inputs)}
+        self.output_index = {name: i for i, name in enumerate(outputs)}
+
+        xs = [symbols[n] for n in states]
+        us = [symbols[n] for n in inputs]
+        ps = [symbols[n] for n in params]
+        args = [xs, us, ps]
+
+        F = sym.Matrix(dot_exprs)
+        G = sym.Matrix(output_exprs)
+
+        self._F = sym.lambdify(args, list(F), "numpy")
+        self._G = sym.lambdify(args, list(G), "numpy")
+        self._F_x = sym.lambdify(args, list(F.jacobian(xs)) if xs else [], "numpy")
+        self._F_u = sym.lambdify(args, list(F.jacobian(us)) if us else [], "numpy")
+        self._G_x = sym.lambdify(args, list(G.jacobian(xs)) if xs else [], "numpy")
+        self._G_u = sym.lambdify(args, list(G.jacobian(us)) if us else [], "numpy")
+        self._kernel = None
+
+    @property
+    def n_states(self) -> int:
+        return len(self.states)
+
+    def param_vector(self, params: dict) -> np.ndarray:
+        """
+        Order a parameter dict as the parameter vector p, values may be arrays for batched evaluation
+        """
+        missing = [n for n in self.params if n not in params]
+        if missing:
+            raise ValueError(f"Missing parameter values: {', '.join(missing)}")
+        return np.array(np.broadcast_arrays(*[np.asarray(params[n], dtype=float) for n in self.params])) \
+            if self.params else np.zeros(0)
+
+    def input_vector(self, inputs: dict) -> np.ndarray:
+        """
+        Order a source dict {"SE_04": ..., "SF_01": ...} as the input vector u, missing sources are zero
+        """
+        unknown = [n for n in inputs if n not in self.input_index]
+        if unknown:
+            raise ValueError(f"Unknown sources: {', '.join(unknown)}")
+        return np.array([float(inputs.get(n, 0.0)) for n in self.inputs])
+
+    @staticmethod
+    def _batch_shape(x, u, p) -> tuple:
+        return np.broadcast_shapes(np.shape(x)[1:], np.shape(u)[1:], np.shape(p)[1:])
+
+    def derivatives(self, x, u, p) -> np.ndarray:
+        """
+        State derivatives F(x, u, p)
+        """
+        return _broadcast_rows(self._F(x, u, p), self._batch_shape(x, u, p))
+
+    def output(self, x, u, p) -> np.ndarray:
+        """
+        Bond efforts and flows G(x, u, p)
+        """
+        return _broadcast_rows(self._G(x, u, p), self._batch_shape(x, u, p))
+
+    def jacobian(self, x, u, p) -> np.ndarray:
+        """
+        State Jacobian dF/dx, shape (n, n) + batch shape
+        """
+        n = self.n_states
+        shape = self._batch_shape(x, u, p)
+        return _broadcast_rows(self._F_x(x, u, p), shape).reshape((n, n) + shape)
+
+    def kernel(self):
+        """
+        In-place right hand side kernel(x, u, p, out) that writes F(x, u, p) into the
+        preallocated array out, generated as straight-line Python with common subexpressions
+        pulled out. Meant for fixed-step loops where lambdify's list results would allocate.
+        """
+        if self._kernel is not None:
+            return self._kernel
+
+        # the arguments, the _cse temporaries and math must not be shadowed by a model symbol
+        names = self.states + self.inputs + self.params
+        reserved = [n for n in names if n.startswith("_") or n == "math"]
+        if reserved:
+            raise ValueError(f"Symbol names {', '.join(reserved)} are reserved in the generated kernel.")
+        replacements, reduced = sym.cse(self.dot_exprs, symbols=sym.numbered_symbols("_cse"))
+        lines = ["def kernel(_x, _u, _p, _out):"]
+        for names, vec in ((self.states, "_x"), (self.inputs, "_u"), (self.params, "_p")):
+            for i, n in enumerate(names):
+                lines.append(f"    {n} = {vec}[{i}]")
+        for s, expr in replacements:
+            lines.append(f"    {s} = {pycode(expr)}")
+        for i, expr in enumerate(reduced):
+            lines.append(f"    _out[{i}] = {pycode(expr)}")
+        lines.append("    return _out")
+
+        namespace = {"math": math}
+        exec("\n".join(lines), namespace)
+        self._kernel = namespace["kernel"]
+        return self._kernel
+
+    def rhs(self, u_fun, params: dict):
+        """
+        Right hand side f(t, x) for scipy's solve_ivp, with u_fun(t) giving the input vector
+        """
+        p = self.param_vector(params)
+        F = self._F
+        def f(t, x):
+            return np.array(F(x, u_fun(t), p), dtype=float)
+        return f
+
+    def linearize(self, x0, u0, params: dict) -> StateSpace:
+        """
+        Linearize the state equations about the operating point (x0, u0)
+        """
+        p = self.param_vector(params)
+        x0 = np.asarray(x0, dtype=float)
+        u0 = np.asarray(u0, dtype=float)
+        n, m, k = len(self.states), len(self.inputs), len(self.outputs)
+
+        def mat(fun, rows, cols):
+            if rows == 0 or cols == 0:
+                return sp.csr_matrix((rows, cols))
+            vals = np.array(fun(x0, u0, p), dtype=float).reshape(rows, cols)
+            return sp.csr_matrix(vals)
+
+        return StateSpace(mat(self._F_x, n, n), mat(self._F_u, n, m),
+                          mat(self._G_x, k, n), mat(self._G_u, k, m),
+                          list(self.states), list(self.inputs), list(self.outputs))
+
+
+def compile_model(es: list[FlyEdge], laws: dict | None = None) -> CompiledModel:
+    """
+    Derive the explicit state equations of a causal bond graph and compile them.
+
+    laws optionally replaces the linear constitutive equation of an I, C or R element by
+    a nonlinear one, keyed by the symbol it defines in the assigned causality, e.g.
+
+        laws = {"e_08": "B*f_08**3", "e_02": "Piecewise((k_t*q_02, q_02 >= 0), (0, True))"}
+
+    New symbols in a law (B, k_t) become model parameters.
+    """
+    laws = laws or {}
+    if any(w != 1 for w in widths_of(es).values()):
+        raise ValueError("compile_model works on scalar bonds, use lib_linear for vector bonds.")
+    equations, sm = symbols_of(es)
+    equations = list(equations)
+
+    # replace the constitutive equations by the user laws
+    law_exprs = {}
+    for name, law in laws.items():
+        idx = _constitutive_index(equations, name)
+        equations.pop(idx)
+        if isinstance(law, str):
+            expr = sym.sympify(law, locals=dict(sm.symbols))
+        else:
+            expr = sym.sympify(law)
+            expr = expr.xreplace({s: sm.symbols[s.name] for s in expr.free_symbols if s.name in sm.symbols})
+        for s in expr.free_symbols:
+            sm.add_symbol(s.name)
+        expr = expr.xreplace({s: sm.symbols[s.name] for s in expr.free_symbols})
+        law_exprs[sm.symbols[name]] = expr
+
+    names = list(sm.symbols.keys())
+    states = [n for n in names if n.startswith(STATE_PREFIXES)]
+    inputs = [n for n in names if n.startswith(INPUT_PREFIXES)]
+    unknowns = [sm.symbols[n] for n in names if n.startswith(('pdot_', 'qdot_', 'e_', 'f_'))
+                and sm.symbols[n] not in law_exprs]
+    variables = set(states) | set(inputs) | {n for n in names if n.startswith(('pdot_', 'qdot_', 'e_', 'f_'))}
+
+    # the junction structure is linear, solve it with the law outputs held as knowns
+    solution = sym.solve(equations, unknowns, dict=True)
+    if not solution:
+        raise ValueError("Bond equations have no solution, check the causality.")
+    solution = solution[0]
+    missing = [u for u in unknowns if u not in solution]
+    if missing:
+        raise ValueError(f"Bond equations do not determine {', '.join(str(m) for m in missing)}.")
+
+    # close the laws: express each law input through the states and sources
+    law_values = {}
+    pending = dict(law_exprs)
+    while pending:
+        progress = False
+        for var, expr in list(pending.items()):
+            value = expr.xreplace(solution).xreplace(law_values)
+            if value.free_symbols & pending.keys():
+                continue
+            law_values[var] = value
+            del pending[var]
+            progress = True
+        if not progress:
+            raise ValueError(f"Algebraic loop through the laws for {', '.join(str(v) for v in pending)}.")
+
+    full = {k: v.xreplace(law_values) for k, v in solution.items()}
+    full.update(law_values)
+
+    dot_exprs = [full[sm.symbols[n.replace("_", "dot_", 1)]] for n in states]
+    outputs = [n for n in names if n.startswith(('e_', 'f_'))]
+    output_exprs = [full[sm.symbols[n]] for n in outputs]
+
+    # parameters replaced by a law (R_08 for e_08 = B*f_08**3) drop out of the model
+    used = set().union(*(ex.free_symbols for ex in dot_exprs + output_exprs))
+    params = [n for n in names if n not in variables and sm.symbols[n] in used]
+
+    return CompiledModel(states, inputs, params, dot_exprs, outputs, output_exprs, dict(sm.symbols))
@@ -0,0 +1,349 @@
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from lib_bonds import (FLOWSIDE, FlyEdge, assign_causality_to_all_nodes, load_json_graph, load_netlist, plot_graph,
+                       report_equations)
+
+# files a directory argument expands to
+GRAPH_SUFFIXES = (".json", ".bgs", ".net")
+
+
+class Stage:
+    """
+    One step of the pipeline. run(inputs, path, out_name) gets the artifacts of the stages in
+    deps and returns this stage's artifact; stages with an output write that file instead
+    (output is a name pattern such as "{stem}.png") and return None.
+    Bump version when the stage's code changes so cached artifacts are recomputed.
+    """
+    def __init__(self, name: str, deps: tuple[str, ...], run, output: str | None = None, version: int = 1):
+        self.name = name
+        self.deps = deps
+        self.run = run
+        self.output = output
+        self.version = version
+
+
+def _bond_rows(es) -> list[tuple]:
+    return [(e.num, e.src, e.dest, e.pwr_to_dest, e.flow_side.value, e.width) for e in es]
+
+
+def _bonds(rows: list[tuple]) -> list[FlyEdge]:
+    return [FlyEdge(num, src, dest, pwr, FLOWSIDE(flow), width) for num, src, dest, pwr, flow, width in rows]
+
+
+def _load_stage(inputs: dict, path: str, out_name) -> tuple[list[str], list[tuple]]:
+    if path.endswith(".net"):
+        ns, es, _ = load_netlist(path)
+    else:
+        ns, es = load_json_graph(path)
+    return ns, _bond_rows(es)
+
+
+def _causality_stage(inputs: dict, path: str, out_name) -> tuple[list[str], list[tuple]]:
+    ns, rows = inputs["load"]
+    es = _bonds(rows)
+    assign_causality_to_all_nodes(es, report=False)
+    return ns, _bond_rows(es)
+
+
+def _plot_stage(inputs: dict, path: str, out_name) -> None:
+    ns, rows = inputs["causality"]
+    plot_graph(_bonds(rows), ns, out_name)
+
+
+def _equations_stage(inputs: dict, path: str, out_name) -> None:
+    _, rows = inputs["causality"]
+    # the file is the report; keep the console quiet when many files run at once
+    with contextlib.redirect_stdout(io.StringIO()):
+        report_equations(_bonds(rows), report_all=True, file_name=out_name)
+
+
+STAGES = {stage.name: stage for stage in (
+    Stage("load", (), _load_stage),
+    Stage("causality", ("load",), _causality_stage),
+    Stage("plot", ("causality",), _plot_stage, output="{stem}.png"),
+    Stage("equations", ("causality",), _equations_stage, output="{stem}_equations.txt"),
+)}
+
+
+def _digest(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def stage_order(names, stages: dict[str, Stage] = STAGES) -> list[str]:
+    """
+    The named stages and everything they depend on, dependencies first
+    """
+    order = []
+
+    def visit(name: str, path: tuple[str, ...]) -> None:
+        if name in order:
+            return
+        if name in path:
+            raise ValueError(f"Stage dependency cycle: {' -> '.join(path + (name,))}")
+        if name not in stages:
+            raise ValueError(f"Unknown stage {name}, expected one of {', '.join(stages)}")
+        for dep in stages[name].deps:
+            visit(dep, path + (name,))
+        order.append(name)
+
+    for name in names:
+        visit(name, ())
+    return order
+
+
+def expand_inputs(patterns) -> list[str]:
+    """
+    Graph files named by files, glob patterns and directories, without duplicates
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, f) for f in sorted(os.listdir(pattern)) if f.endswith(GRAPH_SUFFIXES)]
+        else:
+            matches = sorted(glob.glob(pattern)) or [pattern]
+        paths += [p for p in matches if p not in paths]
+    return paths
+
+
+def check_stems(paths) -> None:
+    """
+    Outputs are named after the file stem, so graphs/a/x.json and graphs/b/x.json would write
+    the same x.png; ValueError if two inputs share a stem
+    """
+    by_stem = {}
+    for path in paths:
+        by_stem.setdefault(os.path.splitext(os.path.basename(path))[0], []).append(path)
+    clashes = [paths for paths in by_stem.values() if len(paths) > 1]
+    if clashes:
+        raise ValueError("Inputs would write the same outputs: " + "; ".join(", ".join(c) for c in clashes))
+
+
+class Pipeline:
+    """
+    load -> causality -> plot / equations for many graph files, with every stage's result
+    kept in cache_dir. A stage runs again only when its key changes: the hash of the input
+    file for load, the hashes of the dependencies' artifacts otherwise. Moving nodes in the
+    editor changes the file but not the loaded bonds, so nothing after load reruns.
+    """
+    def __init__(self, out_dir: str = ".", cache_dir: str | None = None, stages=None, force: bool = False):
+        self.out_dir = out_dir
+        self.cache_dir = cache_dir if cache_dir is not None else os.path.join(out_dir, ".bond_cache")
+        self.stages = stage_order(stages if stages is not None else list(STAGES))
+        self.force = force
+        # artifacts kept in memory across runs, cache name -> {stage: (digest, value)}; see Watcher
+        self.memory = {}
+
+    def _cache_name(self, path: str) -> str:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.cache_dir, f"{stem}-{_digest(os.path.abspath(path))[:10]}")
+
+    def _read_manifest(self, cache_name: str) -> dict:
+        try:
+            with open(cache_name + ".json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, cache_name: str, manifest: dict) -> None:
+        tmp = cache_name + ".json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp, cache_name + ".json")
+
+    def run_file(self, path: str) -> dict[str, str]:
+        """
+        Bring the outputs of one graph file up to date; returns "ran", "cached" or
+        "error: <message>" per stage. Stages after a failed one are "skipped".
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        os.makedirs(self.out_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        cache_name = self._cache_name(path)
+        manifest = self._read_manifest(cache_name)
+        try:
+            with open(path, "rb") as f:
+                source_digest = _digest(f.read())
+        except OSError as err:
+            return {name: f"error: {err}" if i == 0 else "skipped" for i, name in enumerate(self.stages)}
+
+        digests = {}
+        values = {}
+        status = {}
+
+        memory = self.memory.setdefault(cache_name, {})
+
+        def value(name: str):
+            if name not in values:
+                digest, kept = memory.get(name, (None, None))
+                if digest != digests[name]:
+                    with open(f"{cache_name}.{name}.pkl", "rb") as f:
+                        kept = pickle.load(f)
+                    memory[name] = (digests[name], kept)
+                values[name] = kept
+            return values[name]
+
+        for name in self.stages:
+            stage = STAGES[name]
+            if any(not status[dep].startswith(("ran", "cached")) for dep in stage.deps):
+                status[name] = "skipped"
+                continue
+            key = _digest(name, stage.version, source_digest if not stage.deps else "",
+                          *(digests[dep] for dep in stage.deps))
+            out_name = os.path.join(self.out_dir, stage.output.format(stem=stem)) if stage.output else None
+            entry = manifest.get(name, {})
+            done = os.path.exists(f"{cache_name}.{name}.pkl" if out_name is None else out_name)
+            if not self.force and entry.get("key") == key and done:
+                digests[name] = entry["digest"]
+                status[name] = "cached"
+                continue
+            try:
+                result = stage.run({dep: value(dep) for dep in stage.deps}, path, out_name)
+            except Exception as err:
+                status[name] = f"error: {err}"
+                manifest.pop(name, None)
+                continue
+            if out_name is None:
+                data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+                with open(f"{cache_name}.{name}.pkl", "wb") as f:
+                    f.write(data)
+                values[name] = result
+                digests[name] = _digest(data)
+                memory[name] = (digests[name], result)
+            else:
+                digests[name] = key
+            manifest[name] = {"key": key, "digest": digests[name]}
+            status[name] = "ran"
+        self._write_manifest(cache_name, manifest)
+        return status
+
+    def run(self, paths, jobs: int = 1) -> dict[str, dict[str, str]]:
+        """
+        run_file for every path; with jobs > 1 the files are spread over worker processes
+        """
+        paths = list(paths)
+        check_stems(paths)
+        if jobs <= 1 or len(paths) <= 1:
+            return {path: self.run_file(path) for path in paths}
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            return dict(zip(paths, pool.map(self.run_file, paths)))
+
+
+class Watcher:
+    """
+    Long-running counterpart of Pipeline.run: polls the inputs every interval seconds and
+    runs the pipeline on the files whose content changed, in this process, so SymPy and the
+    artifacts of earlier runs stay loaded. A save that only touches the file (same bytes)
+    runs nothing; a layout-only change reruns load alone.
+    """
+    def __init__(self, pipeline: Pipeline, patterns, interval: float = 0.25, report=print):
+        self.pipeline = pipeline
+        self.patterns = list(patterns)
+        self.interval = interval
+        self.report = report
+        # path -> (mtime_ns, size, content digest) at the last run
+        self.seen = {}
+
+    def changed(self) -> list[str]:
+        """
+        Files that are new or whose content differs from the last run
+        """
+        paths = expand_inputs(self.patterns)
+        check_stems(paths)
+        for path in set(self.seen) - set(paths):
+            del self.seen[path]
+        changed = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            last = self.seen.get(path)
+            if last is not None and last[:2] == (st.st_mtime_ns, st.st_size):
+                continue
+            with open(path, "rb") as f:
+                digest = _digest(f.read())
+            self.seen[path] = (st.st_mtime_ns, st.st_size, digest)
+            if last is None or last[2] != digest:
+                changed.append(path)
+        return changed
+
+    def poll(self) -> dict[str, dict[str, str]]:
+        results = {}
+        try:
+            changed = self.changed()
+        except ValueError as err:
+            # e.g. a second file with the same stem appeared; wait until it is renamed
+            if self.report is not None:
+                self.report(str(err))
+            return results
+        for path in changed:
+            start = time.perf_counter()
+            results[path] = self.pipeline.run_file(path)
+            if self.report is not None:
+                states = ", ".join(f"{name} {state}" for name, state in results[path].items())
+                self.report(f"{path}: {states} ({time.perf_counter() - start:.2f} s)")
+        return results
+
+    def run(self, max_polls: int | None = None) -> None:
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            self.poll()
+            polls += 1
+            if max_polls is None or polls < max_polls:
+                time.sleep(self.interval)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Analyze bond graph files: causality, plots and equation reports.")
+    parser.add_argument("inputs", nargs="+", help="graph files (.json, .bgs, .net), glob patterns or directories")
+    parser.add_argument("-o", "--out-dir", default=".", help="where the PNGs and equation reports go")
+    parser.add_argument("--cache-dir", default=None, help="stage artifacts (default OUT_DIR/.bond_cache)")
+    parser.add_argument("-s", "--stages", nargs="+", default=None, choices=list(STAGES),
+                        help="stages to bring up to date, with their dependencies (default all)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("-f", "--force", action="store_true", help="rerun every stage")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="keep running and re-analyze files when their content changes")
+    parser.add_argument("--interval", type=float, default=0.25, help="seconds between polls in watch mode")
+    args = parser.parse_args(argv)
+
+    pipeline = Pipeline(args.out_dir, args.cache_dir, args.stages, args.force)
+    if args.watch:
+        # --force applies to the first pass only
+        watcher = Watcher(pipeline, args.inputs, args.interval)
+        watcher.poll()
+        pipeline.force = False
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    paths = expand_inputs(args.inputs)
+    try:
+        results = pipeline.run(paths, jobs=args.jobs)
+    except ValueError as err:
+        print(err)
+        return 2
+    failed = False
+    for path, status in results.items():
+        print(f"{path}: " + ", ".join(f"{name} {state}" for name, state in status.items()))
+        failed |= any(not state.startswith(("ran", "cached")) for state in status.values())
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
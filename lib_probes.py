@@ -0,0 +1,238 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+
+class Reducer(ABC):
+    """
+    Streaming reduction of one probed signal, updated with batches of (t, y) samples in time order
+    """
+    name = "reducer"
+
+    @abstractmethod
+    def update(self, t: np.ndarray, y: np.ndarray) -> None:
+        ...
+
+    @abstractmethod
+    def result(self):
+        ...
+
+
+class Min(Reducer):
+    name = "min"
+
+    def __init__(self):
+        self.value = np.inf
+        self.t = np.nan
+
+    def update(self, t, y):
+        k = int(np.argmin(y))
+        if y[k] < self.value:
+            self.value = float(y[k])
+            self.t = float(t[k])
+
+    def result(self):
+        return self.value
+
+
+class Max(Reducer):
+    name = "max"
+
+    def __init__(self):
+        self.value = -np.inf
+        self.t = np.nan
+
+    def update(self, t, y):
+        k = int(np.argmax(y))
+        if y[k] > self.value:
+            self.value = float(y[k])
+            self.t = float(t[k])
+
+    def result(self):
+        return self.value
+
+
+class RMS(Reducer):
+    """
+    Time-weighted root mean square, trapezoidal integration of y**2 between samples
+    """
+    name = "rms"
+
+    def __init__(self):
+        self.integral = 0.0
+        self.duration = 0.0
+        self.t_last = None
+        self.y2_last = None
+
+    def update(self, t, y):
+        y2 = np.asarray(y, dtype=float)**2
+        if self.t_last is not None:
+            t = np.concatenate(([self.t_last], t))
+            y2 = np.concatenate(([self.y2_last], y2))
+        if len(t) > 1:
+            dt = np.diff(t)
+            self.integral += float(np.sum(0.5 * (y2[1:] + y2[:-1]) * dt))
+            self.duration += float(np.sum(dt))
+        self.t_last = float(t[-1])
+        self.y2_last = float(y2[-1])
+
+    def result(self):
+        if self.duration == 0.0:
+            return float(np.sqrt(self.y2_last)) if self.y2_last is not None else np.nan
+        return float(np.sqrt(self.integral / self.duration))
+
+
+class Histogram(Reducer):
+    """
+    Sample counts over fixed bin edges, values outside the edges go to the under/overflow counters
+    """
+    name = "histogram"
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def update(self, t, y):
+        counts, _ = np.histogram(y, bins=self.edges)
+        self.counts += counts
+        self.underflow += int(np.count_nonzero(y < self.edges[0]))
+        self.overflow += int(np.count_nonzero(y > self.edges[-1]))
+
+    def result(self):
+        return self.counts
+
+
+class Crossings(Reducer):
+    """
+    Number of crossings of a threshold level, direction "up", "down" or "both".
+    Crossing times are linearly interpolated; only the first and last are kept.
+    """
+    name = "crossings"
+
+    def __init__(self, level: float, direction: str = "both"):
+        if direction not in ("up", "down", "both"):
+            raise ValueError(f"Unknown direction {direction}")
+        self.level = float(level)
+        self.direction = direction
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.t_last = None
+        self.y_last = None
+
+    def update(self, t, y):
+        t = np.asarray(t, dtype=float)
+        y = np.asarray(y, dtype=float) - self.level
+        if self.t_last is not None:
+            t = np.concatenate(([self.t_last], t))
+            y = np.concatenate(([self.y_last], y))
+        if len(t) > 1:
+            up = (y[:-1] < 0) & (y[1:] >= 0)
+            down = (y[:-1] >= 0) & (y[1:] < 0)
+            mask = {"up": up, "down": down, "both": up | down}[self.direction]
+            idx = np.flatnonzero(mask)
+            if idx.size:
+                frac = y[idx] / (y[idx] - y[idx + 1])
+                times = t[idx] + frac * (t[idx + 1] - t[idx])
+                self.count += int(idx.size)
+                if self.first is None:
+                    self.first = float(times[0])
+                self.last = float(times[-1])
+        self.t_last = float(t[-1])
+        self.y_last = float(y[-1])
+
+    def result(self):
+        return self.count
+
+
+class Probes:
+    """
+    Bond variables of interest with streaming reducers, updated as the solver advances.
+
+    Variables are states (p_nn, q_nn), bond efforts and flows (e_nn, f_nn) and state
+    derivatives (pdot_nn, qdot_nn) of a CompiledModel. Without a model only states can be
+    probed, by the names given to the simulation.
+
+        probes = Probes(model, params, u_fun)
+        probes.add("e_02", Max())
+        probes.add("f_12", RMS(), Crossings(0.0))
+    """
+    def __init__(self, model=None, params: dict | None = None, u_fun=None,
+                 names: list[str] | None = None, samples_per_step: int = 4):
+        self.model = model
+        self.u_fun = u_fun
+        self.samples_per_step = samples_per_step
+        self.probes = {}
+        if model is not None:
+            self.p = model.param_vector(params or {})
+            self.names = list(model.states)
+        else:
+            self.p = None
+            self.names = list(names) if names is not None else None
+
+    def add(self, name: str, *reducers: Reducer) -> "Probes":
+        if not reducers:
+            raise ValueError(f"Probe {name} needs at least one reducer.")
+        self._check(name)
+        self.probes.setdefault(name, []).extend(reducers)
+        return self
+
+    def _check(self, name: str) -> None:
+        if self.names is not None and name in self.names:
+            return
+        if self.model is None:
+            raise ValueError(f"Unknown probe variable {name}, only states can be probed without a model.")
+        if name in self.model.output_index:
+            return
+        if name.startswith(("pdot_", "qdot_")) and name.replace("dot_", "_", 1) in self.model.state_index:
+            return
+        raise ValueError(f"Unknown probe variable {name}")
+
+    def _inputs(self, t: np.ndarray) -> np.ndarray:
+        m = len(self.model.inputs)
+        if self.u_fun is None:
+            return np.zeros((m, len(t)))
+        return np.array([np.asarray(self.u_fun(tk), dtype=float) for tk in t]).reshape(len(t), m).T
+
+    def update(self, t: np.ndarray, x: np.ndarray) -> None:
+        """
+        Feed samples at times t (k,) with states x (n_states, k)
+        """
+        if not self.probes:
+            return
+        values = {}
+        Y = None
+        Xdot = None
+        for name in self.probes:
+            if self.names is not None and name in self.names:
+                values[name] = x[self.names.index(name)]
+            elif name.startswith(("pdot_", "qdot_")):
+                if Xdot is None:
+                    Xdot = self.model.derivatives(x, self._inputs(t), self.p[:, None] if self.p.size else self.p)
+                values[name] = Xdot[self.model.state_index[name.replace("dot_", "_", 1)]]
+            else:
+                if Y is None:
+                    Y = self.model.output(x, self._inputs(t), self.p[:, None] if self.p.size else self.p)
+                values[name] = Y[self.model.output_index[name]]
+        for name, reducers in self.probes.items():
+            for r in reducers:
+                r.update(t, values[name])
+
+    def sample_step(self, interpolant, t_old: float, t_new: float) -> None:
+        """
+        Sample one solver step through its dense-output interpolant, excluding t_old
+        """
+        if not self.probes:
+            return
+        t = np.linspace(t_old, t_new, self.samples_per_step + 1)[1:]
+        self.update(t, interpolant(t))
+
+    def results(self) -> dict:
+        """
+        {variable: {reducer name: result}}
+        """
+        return {name: {r.name: r.result() for r in reducers} for name, reducers in self.probes.items()}
+
+    def __getitem__(self, name: str) -> list[Reducer]:
+        return self.probes[name]
@@ -0,0 +1,98 @@
+import multiprocessing
+import queue
+import time
+import lib_bonds as lb
+from lib_bonds import FLOWSIDE, FlyEdge
+
+
+def report_worker(es: list[FlyEdge], node_names: list[str], png_name: str | None, equations_name: str | None,
+                  messages) -> None:
+    """
+    The editor's Report: causality, the Graphviz plot and the equation report, run in a child
+    process. Puts ("progress", text) before each step, ("causality", flow sides) once the
+    causality is known and finally ("done", flow sides) or ("error", text) on messages;
+    flow sides are FLOWSIDE values in bond order.
+    """
+    try:
+        messages.put(("progress", "Assigning causality"))
+        for e in es:
+            e.flow_side = FLOWSIDE.IDK
+        lb.assign_causality_to_all_nodes(es)
+        flow_sides = [e.flow_side.value for e in es]
+        # causality is what the canvas shows, send it before the slow steps
+        messages.put(("causality", flow_sides))
+        if png_name is not None:
+            messages.put(("progress", "Plotting graph"))
+            lb.plot_graph(es, node_names, png_name)
+        if equations_name is not None:
+            messages.put(("progress", "Solving equations"))
+            lb.report_equations(es, report_all=True, file_name=equations_name)
+        messages.put(("done", flow_sides))
+    except Exception as err:
+        messages.put(("error", f"{type(err).__name__}: {err}"))
+
+
+class ReportJob:
+    """
+    report_worker in a separate process, so a long symbolic solve neither blocks the caller
+    nor has to finish: cancel() terminates it. The caller polls for messages, the Tk editor
+    from root.after.
+    """
+    def __init__(self, es: list[FlyEdge], node_names: list[str], png_name: str | None = "graph.png",
+                 equations_name: str | None = "bond_equations.txt"):
+        # spawn: a forked child would share the parent's Tk / X connection
+        context = multiprocessing.get_context("spawn")
+        self.bonds = es
+        self.messages = context.Queue()
+        self.process = context.Process(target=report_worker, daemon=True,
+                                       args=(es, node_names, png_name, equations_name, self.messages))
+        self.start_time = None
+        self.stage = "Starting"
+        self.result = None
+        self.error = None
+
+    def start(self) -> "ReportJob":
+        self.start_time = time.perf_counter()
+        self.process.start()
+        return self
+
+    @property
+    def elapsed(self) -> float:
+        return 0.0 if self.start_time is None else time.perf_counter() - self.start_time
+
+    @property
+    def finished(self) -> bool:
+        return self.result is not None or self.error is not None
+
+    def poll(self) -> list[tuple]:
+        """
+        Messages received since the last poll, without waiting. A worker that died without
+        reporting (killed, out of memory) ends the job with an error.
+        """
+        received = []
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            received.append(message)
+            kind, value = message
+            if kind == "progress":
+                self.stage = value
+            elif kind == "done":
+                self.result = value
+            elif kind == "error":
+                self.error = value
+        if not self.finished and self.start_time is not None and not self.process.is_alive() \
+                and self.messages.empty():
+            self.error = f"Report process exited with code {self.process.exitcode}"
+            received.append(("error", self.error))
+        if self.finished:
+            self.process.join()
+        return received
+
+    def cancel(self) -> None:
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.error = self.error or "cancelled"
@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import hashlib
+import ipaddress
+import json
+import socket
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+import numpy as np
+from lib_bonds import assign_causality_to_all_nodes
+from lib_graph import GraphModel, node_type_of
+from lib_model import compile_model
+from lib_sim import simulate
+
+DEFAULT_PORT = 8765
+MAX_BODY = 16 << 20
+# a simulation answer is resampled to at most this many points
+MAX_POINTS = 10_000
+LOOPBACK_NAMES = ("localhost", "127.0.0.1", "::1")
+STATUS_TEXT = {200: "OK", 204: "No Content", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def graph_fingerprint(request: dict) -> str:
+    """
+    Hash of what the analysis depends on: node types, edge ends and labels and the
+    simulation settings. Node positions and labels do not change the result.
+    """
+    graph = request.get("graph", {})
+    nodes = sorted((node.get("id"), node_type_of(node)) for node in graph.get("nodes", []))
+    edges = sorted((edge.get("id"), edge.get("startNodeId"), edge.get("endNodeId"), str(edge.get("label")),
+                    edge.get("width", 1)) for edge in graph.get("edges", []))
+    key = json.dumps({"nodes": nodes, "edges": edges, "simulate": request.get("simulate")}, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def analyze_graph(request: dict) -> dict:
+    """
+    Causality, explicit state equations and optionally a simulation of the editor graph
+    request["graph"]. request["simulate"] = {"t_end", "params", "inputs", "x0", "n_points", "method"}
+    with inputs the constant source values and x0 the initial states (both default to zero).
+    Runs in the server's worker processes.
+    """
+    graph = GraphModel.from_json(request["graph"])
+    es = graph.bonds()
+    # the editor posts back the flow sides of its last analysis; start from scratch as Report does
+    graph.clear_causality()
+    assign_causality_to_all_nodes(es, report=False)
+    result = {"causality": [{"id": edge_id, "label": edge["label"], "flow_side": graph.flow_side(edge_id).value}
+                            for edge_id, edge in graph.edges.items()]}
+
+    model = compile_model(es)
+    result["states"] = model.states
+    result["inputs"] = model.inputs
+    result["params"] = model.params
+    result["equations"] = [f"{state[0]}dot_{state.split('_', 1)[1]} = {expr}"
+                           for state, expr in zip(model.states, model.dot_exprs)]
+
+    settings = request.get("simulate")
+    if settings:
+        if not model.states:
+            raise ValueError("The graph has no storage elements to simulate.")
+        p = model.param_vector(settings.get("params", {}))
+        u = model.input_vector(settings.get("inputs", {}))
+        x0_values = settings.get("x0", {})
+        unknown = [n for n in x0_values if n not in model.state_index]
+        if unknown:
+            raise ValueError(f"Unknown states: {', '.join(unknown)}")
+        x0 = np.array([float(x0_values.get(n, 0.0)) for n in model.states])
+        t_end = float(settings.get("t_end", 1.0))
+        n_points = min(int(settings.get("n_points", 200)), MAX_POINTS)
+        sim = simulate(lambda t, x: model.derivatives(x, u, p), (0.0, t_end), x0,
+                       method=settings.get("method", "RK45"), names=model.states)
+        t, x = sim.resample(n=n_points)
+        result["simulation"] = {"t": t.tolist(), "states": {n: x[i].tolist() for i, n in enumerate(model.states)},
+                                "success": sim.success, "message": sim.message}
+    return result
+
+
+def _warm_worker() -> None:
+    # import SymPy and compile once so the first real request does not pay for it
+    graph = {"nodes": [{"id": 1, "nodetype": "SE"}, {"id": 2, "nodetype": "1"}, {"id": 3, "nodetype": "I"}],
+             "edges": [{"id": 4, "startNodeId": 1, "endNodeId": 2, "label": "1"},
+                       {"id": 5, "startNodeId": 2, "endNodeId": 3, "label": "2"}]}
+    analyze_graph({"graph": graph})
+
+
+def _ping() -> bool:
+    return True
+
+
+def _check_local(host: str) -> None:
+    try:
+        address = ipaddress.ip_address(socket.gethostbyname(host))
+    except (OSError, ValueError):
+        raise ValueError(f"Cannot resolve host {host}.")
+    if not address.is_loopback:
+        raise ValueError(f"The analysis server only listens on localhost, not {host}.")
+
+
+def _allowed_origin(origin: str | None, allow_null_origin: bool = False) -> bool:
+    """
+    Requests without an Origin (not from a browser) and pages served from this machine may
+    call the server. Pages opened from a file send Origin: null, but so does any sandboxed
+    iframe on any web site, so null is only accepted when explicitly allowed.
+    """
+    if origin is None:
+        return True
+    if origin == "null":
+        return allow_null_origin
+    return urlsplit(origin).hostname in LOOPBACK_NAMES
+
+
+def _allowed_host(host: str | None) -> bool:
+    """
+    The Host header must name this machine; anything else is a DNS rebinding attempt
+    """
+    if not host:
+        return False
+    return urlsplit(f"//{host}").hostname in LOOPBACK_NAMES
+
+
+class AnalysisServer:
+    """
+    Localhost HTTP/JSON front end to lib_bonds for the HTML editor.
+
+        POST /analyze  {"graph": <editor JSON>, "simulate": {...}}  -> analyze_graph result
+        GET  /health
+
+    Requests are handled by asyncio; the analysis runs in a pool of worker processes that
+    are started and warmed (SymPy imported) with the server. Results are cached by
+    graph_fingerprint, and identical requests arriving together share one computation.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, workers: int = 2, cache_size: int = 128,
+                 allow_null_origin: bool = False):
+        _check_local(host)
+        self.host = host
+        self.allow_null_origin = allow_null_origin
+        self.port = port
+        self.workers = workers
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.n_computed = 0
+        self._pool = None
+        self._server = None
+
+    async def start(self) -> tuple[str, int]:
+        """
+        Start the worker pool and the listener; returns the bound (host, port)
+        """
+        loop = asyncio.get_running_loop()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _ping) for _ in range(self.workers)))
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.host, self.port
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        print(f"Bond graph analysis server on http://{self.host}:{self.port}")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def analyze(self, request: dict) -> tuple[dict, bool]:
+        """
+        (result, cached) for one analysis request
+        """
+        if not isinstance(request, dict) or not isinstance(request.get("graph"), dict):
+            raise ValueError("Request must be a JSON object with a graph.")
+        key = graph_fingerprint(request)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            future = self.cache[key]
+            cached = future.done()
+            return await asyncio.shield(future), cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, analyze_graph, request)
+        self.cache[key] = future
+        self.n_computed += 1
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        try:
+            return await asyncio.shield(future), False
+        except Exception:
+            # do not keep failures, the next request tries again
+            if self.cache.get(key) is future:
+                del self.cache[key]
+            raise
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> tuple[int, dict | None]:
+        if path == "/health":
+            return (200, {"status": "ok", "cached": len(self.cache)}) if method == "GET" else (405, None)
+        if path != "/analyze":
+            return 404, {"error": f"Unknown path {path}"}
+        if method == "OPTIONS":
+            return 204, None
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+        try:
+            result, cached = await self.analyze(json.loads(body))
+        except (ValueError, KeyError, TypeError) as err:
+            return 400, {"error": str(err)}
+        return 200, dict(result, cached=cached)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        origin = None
+        try:
+            try:
+                method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                origin = headers.get("origin")
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                status, payload = 400, {"error": "Malformed request"}
+            else:
+                if not _allowed_host(headers.get("host")):
+                    status, payload = 403, {"error": "Host not allowed"}
+                elif not _allowed_origin(origin, self.allow_null_origin):
+                    status, payload = 403, {"error": "Origin not allowed"}
+                elif length > MAX_BODY:
+                    status, payload = 413, {"error": "Request too large"}
+                else:
+                    body = await reader.readexactly(length)
+                    try:
+                        status, payload = await self._dispatch(method, urlsplit(target).path, body)
+                    except Exception as err:
+                        status, payload = 500, {"error": f"{type(err).__name__}: {err}"}
+            data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+            head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(data)}",
+                    "Connection: close"]
+            if origin is not None and _allowed_origin(origin, self.allow_null_origin):
+                head += [f"Access-Control-Allow-Origin: {origin}",
+                         "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+                         "Access-Control-Allow-Headers: Content-Type"]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Local analysis server for graph_editor.html")
+    parser.add_argument("--host", default="127.0.0.1", help="loopback address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-j", "--workers", type=int, default=2, help="analysis worker processes")
+    parser.add_argument("--allow-file-origin", action="store_true",
+                        help="accept Origin: null, needed when graph_editor.html is opened as a file; "
+                             "sandboxed frames of any web site send it too")
+    args = parser.parse_args(argv)
+    server = AnalysisServer(args.host, args.port, args.workers, allow_null_origin=args.allow_file_origin)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,377 @@
+import os
+import copy
+import pickle
+import numpy as np
+import scipy.sparse as sp
+from scipy.integrate import RK23, RK45, DOP853, Radau, BDF, LSODA, DenseOutput, OdeSolution
+
+SOLVERS = {"RK23": RK23, "RK45": RK45, "DOP853": DOP853, "Radau": Radau, "BDF": BDF, "LSODA": LSODA}
+CHECKPOINT_VERSION = 1
+
+
+def decimate_minmax(t: np.ndarray, y: np.ndarray, n_buckets: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Keep the minimum and maximum of y in each of n_buckets equal-count buckets, in time order.
+    Peaks survive decimation, so a plot of the result looks like a plot of all samples.
+    """
+    n = len(t)
+    if n <= 2 * n_buckets:
+        return t, y
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    t_out = np.empty(2 * n_buckets)
+    y_out = np.empty(2 * n_buckets)
+    for b in range(n_buckets):
+        lo, hi = edges[b], edges[b + 1]
+        seg = y[lo:hi]
+        i_min = lo + int(np.argmin(seg))
+        i_max = lo + int(np.argmax(seg))
+        first, second = (i_min, i_max) if i_min <= i_max else (i_max, i_min)
+        t_out[2 * b], y_out[2 * b] = t[first], y[first]
+        t_out[2 * b + 1], y_out[2 * b + 1] = t[second], y[second]
+    return t_out, y_out
+
+
+def lttb(t: np.ndarray, y: np.ndarray, n_out: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets downsampling to n_out points, keeping the first and last sample
+    """
+    n = len(t)
+    if n_out >= n or n_out < 3:
+        return t, y
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # average of the next bucket, or the last point for the final bucket
+        if b + 2 < len(edges):
+            n_lo, n_hi = edges[b + 1], edges[b + 2]
+            t_avg = t[n_lo:n_hi].mean()
+            y_avg = y[n_lo:n_hi].mean()
+        else:
+            t_avg, y_avg = t[-1], y[-1]
+        area = np.abs((t[a] - t_avg) * (y[lo:hi] - y[a]) - (t[a] - t[lo:hi]) * (y_avg - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return t[keep], y[keep]
+
+
+class TableInput:
+    """
+    Input u(t) interpolated linearly from a table of rows (t_k, u_k), e.g. a measured road profile.
+
+    Lookups walk a cursor through the table, so a simulation advancing in time costs O(1) per call.
+    The cursor is the source position saved by Simulation checkpoints.
+    """
+    def __init__(self, t, values):
+        self.t = np.asarray(t, dtype=float)
+        self.values = np.asarray(values, dtype=float).reshape(len(self.t), -1)
+        if len(self.t) < 2 or np.any(np.diff(self.t) <= 0):
+            raise ValueError("TableInput needs at least two strictly increasing times.")
+        self.cursor = 0
+
+    def __call__(self, t: float) -> np.ndarray:
+        ts = self.t
+        k = self.cursor
+        if t < ts[k]:
+            k = max(int(np.searchsorted(ts, t, side="right")) - 1, 0)
+        while k < len(ts) - 2 and t >= ts[k + 1]:
+            k += 1
+        self.cursor = k
+        w = np.clip((t - ts[k]) / (ts[k + 1] - ts[k]), 0.0, 1.0)
+        return (1.0 - w) * self.values[k] + w * self.values[k + 1]
+
+    def state(self) -> int:
+        return self.cursor
+
+    def restore(self, state: int) -> None:
+        self.cursor = int(state)
+
+
+def _solver_state(solver) -> dict:
+    """
+    Numeric attributes of an OdeSolver, everything that defines how it continues except the
+    right-hand side and the Jacobian/LU callables, which are rebuilt on resume
+    """
+    if isinstance(solver, LSODA):
+        raise ValueError("LSODA keeps its state inside the Fortran solver and cannot be checkpointed.")
+    state = {}
+    for key, value in solver.__dict__.items():
+        if isinstance(value, (np.ndarray, np.generic, float, int, bool, str, DenseOutput)) or sp.issparse(value):
+            state[key] = value
+        elif isinstance(value, tuple) and all(isinstance(v, np.ndarray) for v in value):
+            state[key] = value
+    return state
+
+
+class SimulationResult:
+    """
+    Result of an adaptive simulation that keeps the solver's dense output.
+
+    Memory is proportional to the number of solver steps, any output grid is produced on demand.
+    """
+    def __init__(self, sol: OdeSolution, t_steps: np.ndarray, names: list[str] | None = None,
+                 status: int = 0, message: str = "", nfev: int = 0):
+        self.sol = sol
+        self.t_steps = t_steps
+        self.names = names
+        self.status = status
+        self.message = message
+        self.nfev = nfev
+
+    @property
+    def success(self) -> bool:
+        return self.status >= 0
+
+    @property
+    def t_span(self) -> tuple[float, float]:
+        return float(self.t_steps[0]), float(self.t_steps[-1])
+
+    def __call__(self, t) -> np.ndarray:
+        """
+        States at arbitrary times, shape (n_states,) or (n_states, len(t))
+        """
+        if self.sol is None:
+            raise ValueError("Simulation did not keep its dense output (keep_dense=False).")
+        return self.sol(t)
+
+    def _index(self, name) -> int:
+        if isinstance(name, str):
+            if self.names is None:
+                raise ValueError("Simulation has no state names, use an integer index.")
+            return self.names.index(name)
+        return int(name)
+
+    def state(self, name, t) -> np.ndarray:
+        return self(t)[self._index(name)]
+
+    def resample(self, n: int | None = None, dt: float | None = None,
+                 t_range: tuple[float, float] | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        States on a uniform grid of n points or step dt over t_range (default the whole run)
+        """
+        t0, t1 = t_range or self.t_span
+        if dt is not None:
+            t = np.arange(t0, t1, dt)
+        else:
+            t = np.linspace(t0, t1, n or len(self.t_steps))
+        return t, self(t)
+
+    def plot_data(self, name, n_points: int = 2000, t_range: tuple[float, float] | None = None,
+                  method: str = "minmax", oversample: int = 8, chunk: int = 200_000) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Plot-ready samples of one state: the dense output is evaluated on a grid of
+        n_points * oversample points (in chunks) and reduced to about n_points points
+        with min/max-preserving ("minmax") or LTTB ("lttb") decimation.
+        """
+        i = self._index(name)
+        t0, t1 = t_range or self.t_span
+        n_fine = max(n_points * oversample, 2)
+        t_fine = np.linspace(t0, t1, n_fine)
+
+        if method == "lttb":
+            y_fine = np.concatenate([self(t_fine[k:k + chunk])[i] for k in range(0, n_fine, chunk)])
+            return lttb(t_fine, y_fine, n_points)
+        if method != "minmax":
+            raise ValueError(f"Unknown decimation method: {method}")
+
+        # reduce chunk by chunk so the fine grid is never held for all states at once
+        n_buckets = max(n_points // 2, 1)
+        per_bucket = n_fine / n_buckets
+        t_parts, y_parts = [], []
+        bucket_chunk = max(int(chunk // per_bucket), 1)
+        for b0 in range(0, n_buckets, bucket_chunk):
+            b1 = min(b0 + bucket_chunk, n_buckets)
+            lo, hi = int(round(b0 * per_bucket)), int(round(b1 * per_bucket))
+            t_c = t_fine[lo:hi]
+            tt, yy = decimate_minmax(t_c, self(t_c)[i], b1 - b0)
+            t_parts.append(tt)
+            y_parts.append(yy)
+        return np.concatenate(t_parts), np.concatenate(y_parts)
+
+
+class Simulation:
+    """
+    Adaptive simulation driven step by step through scipy's OdeSolver classes,
+    collecting one dense-output interpolant per accepted step.
+
+    probes (lib_probes.Probes) are sampled through each step's interpolant as the solver
+    advances. With keep_dense=False the interpolants are dropped after sampling, so a run
+    that only needs probe reductions uses O(1) memory.
+
+    sources are stateful inputs used by fun (e.g. TableInput) whose positions are saved
+    with checkpoints. With checkpoint_path set, a checkpoint is written every
+    checkpoint_every seconds of simulated time; see checkpoint() and from_checkpoint().
+    """
+    def __init__(self, fun, t_span: tuple[float, float], y0, method: str = "RK45",
+                 names: list[str] | None = None, probes=None, keep_dense: bool = True,
+                 sources: list | None = None, checkpoint_path: str | None = None,
+                 checkpoint_every: float | None = None, **options):
+        if method not in SOLVERS:
+            raise ValueError(f"Unknown method {method}, expected one of {', '.join(SOLVERS)}")
+        if checkpoint_every is not None and checkpoint_path is None:
+            raise ValueError("checkpoint_every needs a checkpoint_path.")
+        self.fun = fun
+        self.t_span = (float(t_span[0]), float(t_span[1]))
+        self.method = method
+        self.names = names
+        self.options = options
+        self.solver = SOLVERS[method](fun, self.t_span[0], np.asarray(y0, dtype=float), self.t_span[1], **options)
+        self.probes = probes
+        self.keep_dense = keep_dense
+        self.sources = list(sources or [])
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self._next_checkpoint = self.t_span[0] + checkpoint_every if checkpoint_every else None
+        self.ts = [self.t_span[0]]
+        self.interpolants = []
+        self.status = None
+        self.message = ""
+
+        if probes is not None:
+            probes.update(np.array([self.solver.t]), self.solver.y[:, None])
+
+    def step(self) -> bool:
+        """
+        Take one solver step, returns False once the run has finished or failed
+        """
+        solver = self.solver
+        t_old = solver.t
+        message = solver.step()
+        if solver.status == "failed":
+            self.status = -1
+            self.message = message
+            return False
+
+        interpolant = solver.dense_output()
+        if self.probes is not None:
+            self.probes.sample_step(interpolant, t_old, solver.t)
+        if self.keep_dense:
+            self.ts.append(solver.t)
+            self.interpolants.append(interpolant)
+        else:
+            self.ts = [self.ts[0], solver.t]
+        if self._next_checkpoint is not None and solver.t >= self._next_checkpoint:
+            self.save_checkpoint(self.checkpoint_path)
+            while self._next_checkpoint <= solver.t:
+                self._next_checkpoint += self.checkpoint_every
+        if solver.status == "finished":
+            self.status = 0
+            self.message = "The solver successfully reached the end of the integration interval."
+            return False
+        return True
+
+    def run(self) -> SimulationResult:
+        while self.step():
+            pass
+        return self.result()
+
+    def checkpoint(self) -> dict:
+        """
+        Picklable snapshot of the run: solver state, time, source positions and reducer state.
+        The dense output collected so far is not part of it.
+        """
+        return {
+            "version": CHECKPOINT_VERSION,
+            "method": self.method,
+            "t_span": self.t_span,
+            "names": self.names,
+            "options": self.options,
+            "keep_dense": self.keep_dense,
+            "checkpoint_every": self.checkpoint_every,
+            "solver": _solver_state(self.solver),
+            "sources": [s.state() for s in self.sources],
+            "probes": copy.deepcopy(self.probes.probes) if self.probes is not None else None,
+        }
+
+    def save_checkpoint(self, path: str) -> None:
+        """
+        Write checkpoint() to path, replacing any earlier checkpoint atomically
+        """
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump(self.checkpoint(), fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, fun, probes=None, sources: list | None = None,
+                        t_end: float | None = None, fork: bool = False,
+                        checkpoint_path: str | None = None, **options) -> "Simulation":
+        """
+        Resume a run from checkpoint (a checkpoint() dict or a file written by save_checkpoint).
+
+        fun, probes and sources are the live objects of the run being resumed; the saved
+        reducer state and source positions are restored into them. Resuming with the same fun
+        continues exactly as the uninterrupted run would. With fork=True the mid-run state
+        starts a what-if branch: fun may differ (other parameters or inputs), and only time,
+        state and step size are carried over. options override the saved solver options.
+
+        Checkpoint files are pickles, and loading a pickle can run arbitrary code: only resume
+        from files this program wrote or that come from a source you trust.
+        """
+        if isinstance(checkpoint, (str, os.PathLike)):
+            with open(checkpoint, "rb") as fh:
+                checkpoint = pickle.load(fh)
+        if checkpoint.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {checkpoint.get('version')}")
+        saved = checkpoint["solver"]
+        t0, t1 = float(saved["t"]), float(checkpoint["t_span"][1] if t_end is None else t_end)
+        opts = dict(checkpoint["options"], **options)
+        if fork:
+            opts.setdefault("first_step", min(float(saved["h_abs"]), abs(t1 - t0)) or None)
+
+        if probes is not None and checkpoint["probes"] is not None:
+            probes.probes = copy.deepcopy(checkpoint["probes"])
+        sources = list(sources or [])
+        if len(sources) != len(checkpoint["sources"]):
+            raise ValueError(f"Checkpoint has {len(checkpoint['sources'])} sources, got {len(sources)}.")
+        for source, state in zip(sources, checkpoint["sources"]):
+            source.restore(state)
+
+        sim = cls.__new__(cls)
+        sim.fun = fun
+        sim.t_span = (t0, t1)
+        sim.method = checkpoint["method"]
+        sim.names = checkpoint["names"]
+        sim.options = opts
+        sim.solver = SOLVERS[sim.method](fun, t0, np.array(saved["y"]), t1, **opts)
+        if not fork:
+            for key, value in saved.items():
+                if key in ("t_bound", "direction", "status"):
+                    continue
+                current = sim.solver.__dict__.get(key)
+                # copy into existing arrays, some solvers keep views between them (DOP853's K)
+                if (isinstance(current, np.ndarray) and isinstance(value, np.ndarray)
+                        and current.shape == value.shape and current.dtype == value.dtype):
+                    current[...] = value
+                else:
+                    setattr(sim.solver, key, copy.deepcopy(value))
+        sim.probes = probes
+        sim.keep_dense = checkpoint["keep_dense"]
+        sim.sources = sources
+        sim.checkpoint_path = checkpoint_path
+        sim.checkpoint_every = checkpoint["checkpoint_every"] if checkpoint_path else None
+        sim._next_checkpoint = t0 + sim.checkpoint_every if sim.checkpoint_every else None
+        sim.ts = [t0]
+        sim.interpolants = []
+        sim.status = None
+        sim.message = ""
+        return sim
+
+    def result(self) -> SimulationResult:
+        ts = np.array(self.ts)
+        sol = OdeSolution(ts, self.interpolants) if self.interpolants else None
+        status = self.status if self.status is not None else 1
+        return SimulationResult(sol, ts, self.names, status, self.message, self.solver.nfev)
+
+
+def simulate(fun, t_span: tuple[float, float], y0, method: str = "RK45",
+             names: list[str] | None = None, probes=None, keep_dense: bool = True, **options) -> SimulationResult:
+    """
+    Integrate y' = fun(t, y) over t_span keeping the dense output instead of a t_eval grid.
+    options (rtol, atol, max_step, first_step, ...) are passed to the scipy solver.
+    """
+    return Simulation(fun, t_span, y0, method=method, names=names, probes=probes,
+                      keep_dense=keep_dense, **options).run()
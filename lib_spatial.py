@@ -0,0 +1,124 @@
+import math
+import numpy as np
+
+
+class SpatialGrid:
+    """
+    Uniform grid over axis-aligned boxes (points are boxes of size zero) for hit testing and
+    rectangle queries. Every key is listed in each cell its box overlaps, so a query only
+    visits the cells it covers and costs time in proportion to the local density, not the
+    number of keys. Moving a key within its cells only replaces its box.
+    """
+    def __init__(self, cell_size: float = 100.0):
+        if cell_size <= 0:
+            raise ValueError(f"Cell size must be positive, not {cell_size}.")
+        self.cell_size = cell_size
+        self.cells = {}  # (i, j) -> set of keys
+        self.boxes = {}  # key -> (x1, y1, x2, y2)
+        self._ranges = {}  # key -> (i1, j1, i2, j2) cells covered
+
+    def _range(self, x1: float, y1: float, x2: float, y2: float) -> tuple[int, int, int, int]:
+        size = self.cell_size
+        return math.floor(x1 / size), math.floor(y1 / size), math.floor(x2 / size), math.floor(y2 / size)
+
+    def insert(self, key, x1: float, y1: float, x2: float | None = None, y2: float | None = None) -> None:
+        """
+        Add key with the box (x1, y1)-(x2, y2), or the point (x1, y1); an existing key is moved
+        """
+        if x2 is None:
+            x2, y2 = x1, y1
+        box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        cells = self._range(*box)
+        if self._ranges.get(key) != cells:
+            if key in self.boxes:
+                self.remove(key)
+            i1, j1, i2, j2 = cells
+            for i in range(i1, i2 + 1):
+                for j in range(j1, j2 + 1):
+                    self.cells.setdefault((i, j), set()).add(key)
+            self._ranges[key] = cells
+        self.boxes[key] = box
+
+    def remove(self, key) -> None:
+        i1, j1, i2, j2 = self._ranges.pop(key)
+        del self.boxes[key]
+        for i in range(i1, i2 + 1):
+            for j in range(j1, j2 + 1):
+                cell = self.cells[(i, j)]
+                cell.discard(key)
+                if not cell:
+                    del self.cells[(i, j)]
+
+    def discard(self, key) -> None:
+        if key in self.boxes:
+            self.remove(key)
+
+    def clear(self) -> None:
+        self.cells.clear()
+        self.boxes.clear()
+        self._ranges.clear()
+
+    def query(self, x1: float, y1: float, x2: float, y2: float) -> set:
+        """
+        Keys whose box overlaps the rectangle (x1, y1)-(x2, y2), edges included
+        """
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+        i1, j1, i2, j2 = self._range(x1, y1, x2, y2)
+        if (i2 - i1 + 1) * (j2 - j1 + 1) > len(self.cells):
+            # a rectangle larger than the occupied area: visit occupied cells only
+            cells = [keys for (i, j), keys in self.cells.items() if i1 <= i <= i2 and j1 <= j <= j2]
+        else:
+            cells = [self.cells[(i, j)] for i in range(i1, i2 + 1) for j in range(j1, j2 + 1) if (i, j) in self.cells]
+        found = set()
+        boxes = self.boxes
+        for keys in cells:
+            for key in keys:
+                if key not in found:
+                    bx1, by1, bx2, by2 = boxes[key]
+                    if bx1 <= x2 and x1 <= bx2 and by1 <= y2 and y1 <= by2:
+                        found.add(key)
+        return found
+
+    def near(self, x: float, y: float, radius: float) -> set:
+        """
+        Keys whose box comes within radius (per axis) of the point (x, y)
+        """
+        return self.query(x - radius, y - radius, x + radius, y + radius)
+
+    def __contains__(self, key) -> bool:
+        return key in self.boxes
+
+    def __len__(self):
+        return len(self.boxes)
+
+
+def fit_bounds(xs, ys, width: int, height: int, pad: float = 0.05) -> tuple[float, float, float]:
+    """
+    (x0, y0, scale) mapping the points' bounding box, padded and centered, onto a width x height
+    image with one scale for both axes: pixel = (world - origin) * scale
+    """
+    if len(xs) == 0:
+        return 0.0, 0.0, 1.0
+    x1, x2, y1, y2 = float(np.min(xs)), float(np.max(xs)), float(np.min(ys)), float(np.max(ys))
+    span_x = max(x2 - x1, 1.0) * (1 + 2 * pad)
+    span_y = max(y2 - y1, 1.0) * (1 + 2 * pad)
+    scale = min(width / span_x, height / span_y)
+    return (x1 + x2) / 2 - width / scale / 2, (y1 + y2) / 2 - height / scale / 2, scale
+
+
+def density_raster(xs, ys, width: int, height: int, bounds: tuple[float, float, float]) -> np.ndarray:
+    """
+    Points binned into a height x width uint8 image, 0 where there are none and brighter where
+    there are more (log scale), for overviews of diagrams too large to draw item by item
+    """
+    x0, y0, scale = bounds
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    counts, _, _ = np.histogram2d(ys, xs, bins=(height, width),
+                                  range=((y0, y0 + height / scale), (x0, x0 + width / scale)))
+    if not counts.any():
+        return np.zeros((height, width), dtype=np.uint8)
+    # one point already shows clearly, denser regions saturate towards 255
+    levels = np.log1p(counts) / np.log1p(counts.max())
+    return np.where(counts > 0, 96 + 159 * levels, 0).astype(np.uint8)
@@ -0,0 +1,287 @@
+import sympy as sym
+from lib_bonds import FlyEdge, FLOWSIDE, SymbolManager, assign_causality_to_all_nodes, bond_widths, generate_symbols
+
+# node type of the external ports of a submodel definition, P_<port name>
+PORT_PREFIX = "P"
+
+# what the parent imposes on a port: "flow" closes it like an SF, "effort" like an SE
+PORT_CAUSALITY = {"flow": "SF", "effort": "SE"}
+
+
+def _copy_edge(e: FlyEdge, src: str | None = None, dest: str | None = None, num: int | None = None,
+               flow_side: FLOWSIDE | None = None) -> FlyEdge:
+    return FlyEdge(e.num if num is None else num, e.src if src is None else src,
+                   e.dest if dest is None else dest, e.pwr_to_dest, e.flow_side if flow_side is None else flow_side,
+                   e.width)
+
+
+def _port_name(node_name: str) -> str | None:
+    kind, _, rest = node_name.partition("_")
+    return rest if kind == PORT_PREFIX else None
+
+
+class Submodel:
+    """
+    Reusable bond graph with external ports, e.g. one corner of a full-vehicle model.
+
+    Ports are nodes named P_<port> with exactly one bond each. ports maps every port name
+    to the causality the parent imposes on it ("flow" or "effort"). The causality and the
+    equations of the definition are derived once, on first use, and shared by all instances.
+    Causality already set on the given edges is kept.
+    """
+    def __init__(self, name: str, edges: list[FlyEdge], ports: dict[str, str]):
+        self.name = name
+        self.edges = [_copy_edge(e) for e in edges]
+        self.ports = dict(ports)
+        self.n_derivations = 0
+        self._derived = None
+
+        nums = [e.num for e in self.edges]
+        if len(set(nums)) != len(nums):
+            raise ValueError(f"Submodel {name} has duplicate bond numbers.")
+        self.n_bonds = max(nums, default=0)
+
+        self.port_bonds = {}
+        for e in self.edges:
+            for node in (e.src, e.dest):
+                port = _port_name(node)
+                if port is None:
+                    continue
+                if port not in self.ports:
+                    raise ValueError(f"Submodel {name}: node {node} is not a declared port.")
+                if port in self.port_bonds:
+                    raise ValueError(f"Submodel {name}: port {port} must have exactly one bond.")
+                self.port_bonds[port] = e.num
+        for port, causality in self.ports.items():
+            if causality not in PORT_CAUSALITY:
+                raise ValueError(f"Port {port} causality must be one of {', '.join(PORT_CAUSALITY)}, got {causality}")
+            if port not in self.port_bonds:
+                raise ValueError(f"Submodel {name}: port {port} has no bond.")
+
+    def derive(self) -> tuple[list[FlyEdge], list[sym.Eq], list[str]]:
+        """
+        (edges with causality, equations, symbol names) of the definition, cached.
+
+        Ports are closed by sources of the causality the parent imposes; the source equations
+        of the port bonds are dropped, the parent's junctions supply them when instanced.
+        """
+        if self._derived is None:
+            closed = []
+            for e in self.edges:
+                src, dest = e.src, e.dest
+                if _port_name(src) is not None:
+                    src = f"{PORT_CAUSALITY[self.ports[_port_name(src)]]}_port.{_port_name(src)}"
+                if _port_name(dest) is not None:
+                    dest = f"{PORT_CAUSALITY[self.ports[_port_name(dest)]]}_port.{_port_name(dest)}"
+                closed.append(_copy_edge(e, src=src, dest=dest))
+            assign_causality_to_all_nodes(closed, report=False)
+            equations, sm = generate_symbols(closed)
+
+            port_sources = {f"{PORT_CAUSALITY[self.ports[port]]}_{num:02d}" for port, num in self.port_bonds.items()}
+            equations = [eq for eq in equations if not {s.name for s in eq.free_symbols} & port_sources]
+            names = [n for n in sm.symbols if n not in port_sources]
+
+            edges = [_copy_edge(e, flow_side=c.flow_side) for e, c in zip(self.edges, closed)]
+            self._derived = (edges, equations, names)
+            self.n_derivations += 1
+        return self._derived
+
+    def __str__(self):
+        return f"Submodel {self.name}: {len(self.edges)} bonds, ports {', '.join(self.ports)}"
+
+
+class Instance:
+    """
+    A submodel placed in a parent graph. Node names get the instance name after their type
+    (I_a -> I_fl.a) and bond numbers are shifted by offset, so symbols stay unique (e_05 -> e_15 for offset 10).
+    """
+    def __init__(self, name: str, submodel: Submodel, connect: dict[str, str], offset: int):
+        self.name = name
+        self.submodel = submodel
+        self.connect = dict(connect)
+        self.offset = offset
+
+    def rename_node(self, node_name: str) -> str:
+        port = _port_name(node_name)
+        if port is not None:
+            return self.connect[port]
+        kind, _, rest = node_name.partition("_")
+        return f"{kind}_{self.name}.{rest}" if rest else f"{kind}_{self.name}"
+
+    def rename_symbol(self, name: str) -> str:
+        prefix, num = name.rsplit("_", 1)
+        return f"{prefix}_{int(num) + self.offset:02d}"
+
+    def params(self, params: dict) -> dict:
+        """
+        Parameter values of the definition (keyed I_05, C_02, ...) renamed for this instance
+        """
+        return {self.rename_symbol(k): v for k, v in params.items()}
+
+    def port_bond(self, port: str) -> int:
+        return self.submodel.port_bonds[port] + self.offset
+
+
+class Composite:
+    """
+    Parent bond graph made of its own bonds and submodel instances.
+
+    The flat FlyEdge list is only built when it is asked for (iteration, edges()).
+    generate_symbols() needs only the parent bonds and the port bonds: the equations of
+    every instance are the cached equations of its definition with renamed symbols.
+    lib_linear and lib_model accept a Composite wherever they accept a FlyEdge list.
+    """
+    def __init__(self, edges: list[FlyEdge] | None = None):
+        self.parent_edges = []
+        self.instances = {}
+        self._next_offset = 0
+        self._cache = {}
+        for e in edges or []:
+            self.add_edge(e)
+
+    def add_edge(self, edge: FlyEdge) -> FlyEdge:
+        for inst in self.instances.values():
+            if inst.offset < edge.num <= inst.offset + inst.submodel.n_bonds:
+                raise ValueError(f"Bond {edge.num} collides with the bonds of instance {inst.name}.")
+        self.parent_edges.append(edge)
+        self._next_offset = max(self._next_offset, edge.num)
+        self._cache.clear()
+        return edge
+
+    def add_instance(self, name: str, submodel: Submodel, connect: dict[str, str],
+                     offset: int | None = None) -> Instance:
+        if not name or "_" in name or name in self.instances:
+            raise ValueError(f"Instance name {name!r} must be unique and must not contain '_'.")
+        if set(connect) != set(submodel.ports):
+            raise ValueError(f"Instance {name} must connect ports {', '.join(submodel.ports)}.")
+        if offset is None:
+            # round up to the next multiple of ten so instance bond numbers are easy to read
+            offset = -(-self._next_offset // 10) * 10
+        inst = Instance(name, submodel, connect, offset)
+        self.instances[name] = inst
+        self._next_offset = max(self._next_offset, offset + submodel.n_bonds)
+        self._cache.clear()
+        return inst
+
+    def as_submodel(self, name: str, ports: dict[str, str]) -> Submodel:
+        """
+        Use this composite as the definition of a larger one. Unconnected P_<port> nodes of
+        the parent bonds become the ports of the new submodel.
+        """
+        return Submodel(name, self._flatten(), ports)
+
+    def _flatten(self) -> list[FlyEdge]:
+        """
+        Flat edges: parent bonds without causality, instance bonds with their cached causality
+        """
+        edges = [_copy_edge(e, flow_side=FLOWSIDE.IDK) for e in self.parent_edges]
+        for inst in self.instances.values():
+            derived_edges, _, _ = inst.submodel.derive()
+            for e in derived_edges:
+                edges.append(_copy_edge(e, src=inst.rename_node(e.src), dest=inst.rename_node(e.dest),
+                                        num=e.num + inst.offset))
+        return edges
+
+    def _parent_level(self) -> tuple[list[FlyEdge], list[sym.Eq], SymbolManager]:
+        """
+        Causality and equations of the parent bonds plus the port bonds, whose inner ends are
+        replaced by placeholder nodes that generate no equations
+        """
+        if "parent" not in self._cache:
+            graph = [_copy_edge(e, flow_side=FLOWSIDE.IDK) for e in self.parent_edges]
+            fixed = {}
+            for inst in self.instances.values():
+                derived_edges, _, _ = inst.submodel.derive()
+                port_nums = {num: port for port, num in inst.submodel.port_bonds.items()}
+                for e in derived_edges:
+                    if e.num not in port_nums:
+                        continue
+                    port = port_nums[e.num]
+                    inner = f"PORT_{inst.name}.{port}"
+                    src = inst.connect[port] if _port_name(e.src) == port else inner
+                    dest = inst.connect[port] if _port_name(e.dest) == port else inner
+                    graph.append(_copy_edge(e, src=src, dest=dest, num=e.num + inst.offset))
+                    fixed[e.num + inst.offset] = (e.flow_side, f"{inst.name}.{port}")
+
+            assign_causality_to_all_nodes(graph, report=False)
+            for e in graph:
+                if e.num in fixed and e.flow_side != fixed[e.num][0]:
+                    raise ValueError(f"Causality conflict at port {fixed[e.num][1]} (bond {e.num}).")
+
+            equations, sm = generate_symbols(graph)
+            self._cache["parent"] = (graph, equations, sm)
+        return self._cache["parent"]
+
+    def edges(self) -> list[FlyEdge]:
+        """
+        The flat FlyEdge list with causality, built on first use
+        """
+        if "edges" not in self._cache:
+            graph, _, _ = self._parent_level()
+            parent_sides = {e.num: e.flow_side for e in graph}
+            edges = self._flatten()
+            for e in edges[:len(self.parent_edges)]:
+                e.flow_side = parent_sides[e.num]
+            self._cache["edges"] = edges
+        return self._cache["edges"]
+
+    def generate_symbols(self) -> tuple[list[sym.Eq], SymbolManager]:
+        """
+        Same result as lib_bonds.generate_symbols on the flat edges, without rederiving the instances
+        """
+        if "symbols" not in self._cache:
+            _, parent_equations, parent_sm = self._parent_level()
+            sm = SymbolManager()
+            sm.symbols.update(parent_sm.symbols)
+            equations = list(parent_equations)
+            for inst in self.instances.values():
+                _, def_equations, def_names = inst.submodel.derive()
+                mapping = {sym.Symbol(n, real=True): sm.add_symbol(inst.rename_symbol(n)) for n in def_names}
+                equations.extend(eq.xreplace(mapping) for eq in def_equations)
+            self._cache["symbols"] = (equations, sm)
+        equations, sm = self._cache["symbols"]
+        return list(equations), sm
+
+    def bond_widths(self) -> dict[int, int]:
+        """
+        Same result as lib_bonds.bond_widths on the flat edges: the parent and port bonds are
+        checked at the parent level, the other bonds come from the definitions, offset per instance
+        """
+        if "widths" not in self._cache:
+            graph, _, _ = self._parent_level()
+            widths = bond_widths(graph)
+            definition_widths = {}
+            for inst in self.instances.values():
+                if id(inst.submodel) not in definition_widths:
+                    definition_widths[id(inst.submodel)] = bond_widths(inst.submodel.edges)
+                widths.update((num + inst.offset, w) for num, w in definition_widths[id(inst.submodel)].items())
+            self._cache["widths"] = widths
+        return dict(self._cache["widths"])
+
+    def __iter__(self):
+        return iter(self.edges())
+
+    def __len__(self):
+        return len(self.edges())
+
+    def __str__(self):
+        return (f"Composite: {len(self.parent_edges)} parent bonds, "
+                f"instances {', '.join(f'{i.name} ({i.submodel.name})' for i in self.instances.values())}")
+
+
+def symbols_of(es) -> tuple[list[sym.Eq], SymbolManager]:
+    """
+    generate_symbols for a FlyEdge list or a Composite
+    """
+    if isinstance(es, Composite):
+        return es.generate_symbols()
+    return generate_symbols(es)
+
+
+def widths_of(es) -> dict[int, int]:
+    """
+    bond_widths for a FlyEdge list or a Composite
+    """
+    if isinstance(es, Composite):
+        return es.bond_widths()
+    return bond_widths(es)
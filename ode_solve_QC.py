@@ -1,7 +1,7 @@
 import numpy as np
 import math as m
-from scipy.integrate import solve_ivp
 from matplotlib import pyplot as plt
+from lib_sim import simulate, decimate_minmax
 
 # DEFINE SYMBOLS
 
@@ -12,7 +12,7 @@ from matplotlib import pyplot as plt
 
 t = 0.0   # seconds, initial time for simulation
 t_final = 2.5 # seconds, final time for simulation
-dt = 1.0e-5 # time step for simulation
+n_plot = 2000 # points per plotted curve
 g = 9.81  # m/s^2, acceleration due to gravity
 
 m_s = 320
@@ -92,7 +92,6 @@ SE_11 = m_s*g
 # initial state vector
 y0 = [q_02, q_09, p_05, p_12]
 t_span = (0, t_final)
-t_eval = np.arange(0, t_final, dt)
 
 def ode_system(t, y):
     q_02, q_09, p_05, p_12 = y
@@ -141,17 +140,12 @@ def ode_system(t, y):
 
     return [qdot_02, qdot_09, pdot_05, pdot_12]
 
-sol = solve_ivp(ode_system, t_span, y0, t_eval=t_eval)
-
-ts = sol.t
-q_02s = sol.y[0]
-q_09s = sol.y[1]
-p_05s = sol.y[2]
-p_12s = sol.y[3]
+# keep the dense output, sample it only where plots need it
+sol = simulate(ode_system, t_span, y0, names=["q_02", "q_09", "p_05", "p_12"])
 
 # plot the displacements of the sprung and unsprung masses
-plt.plot(ts, q_09s, label="Sprung Mass Displacement")
-plt.plot(ts, q_02s, label="Unsprung Mass Displacement")
+plt.plot(*sol.plot_data("q_09", n_plot, t_range=(0, 2.0)), label="Sprung Mass Displacement")
+plt.plot(*sol.plot_data("q_02", n_plot, t_range=(0, 2.0)), label="Unsprung Mass Displacement")
 plt.title("Suspension System Displacements vs Time")
 plt.xlabel("Time (s)")
 plt.ylabel("Displacement (m)")
@@ -161,6 +155,7 @@ plt.legend()
 plt.show()
 
 # calculate forces for plotting
+ts, (q_02s, q_09s, p_05s, p_12s) = sol.resample(n=8 * n_plot, t_range=(0, 2.0))
 F_tires = [F_t(q) for q in q_02s]
 F_susps = [F_s(q) for q in q_09s]
 
@@ -168,9 +163,9 @@ f_08s = [p_05/I_05 - p_12/I_12 for p_05, p_12 in zip(p_05s, p_12s)]
 F_damps = [F_d(f) for f in f_08s]
 
 # plot the forces in the tire, suspension, and damper
-plt.plot(ts, F_tires, label="Tire Force")
-plt.plot(ts, F_susps, label="Suspension Force")
-plt.plot(ts, F_damps, label="Damper Force")
+plt.plot(*decimate_minmax(ts, np.array(F_tires), n_plot // 2), label="Tire Force")
+plt.plot(*decimate_minmax(ts, np.array(F_susps), n_plot // 2), label="Suspension Force")
+plt.plot(*decimate_minmax(ts, np.array(F_damps), n_plot // 2), label="Damper Force")
 plt.title("Suspension System Forces vs Time")
 plt.xlabel("Time (s)")
 plt.ylabel("Force (N)")
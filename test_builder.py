@@ -0,0 +1,65 @@
+import time
+import unittest
+import numpy as np
+from lib_bonds import *
+from lib_builder import *
+from lib_linear import SparseJunctionStructure
+from test_modal import mass_spring_chain
+
+
+class Test_GraphBuilder(unittest.TestCase):
+
+    def test_chain_matches_hand_built(self):
+        n = 5
+        gb = GraphBuilder()
+        gb.add("SE_0", "1_n0")
+        gb.chain(n)
+        es = gb.build(causality=True)
+        self.assertEqual(len(es), len(mass_spring_chain(n)))
+        self.assertTrue(all(e.flow_side != FLOWSIDE.IDK for e in es))
+
+        def eigs(es):
+            sjs = SparseJunctionStructure(es)
+            params = {name: {"I": 2.0, "R": 0.3, "C": 0.01}[name.split("_")[0]] for name in sjs.params}
+            return np.sort_complex(np.linalg.eigvals(sjs.state_space(params).A.toarray()))
+
+        np.testing.assert_allclose(eigs(es), eigs(mass_spring_chain(n)), rtol=1e-9)
+
+    def test_ladder_and_grid(self):
+        gb = GraphBuilder()
+        nodes = gb.ladder(4, tag="t")
+        self.assertEqual(nodes[0], "0_t0")
+        gb.add("SF_in", nodes[0])
+        es = gb.build()
+        self.assertEqual(len(es), 4 + 3 * 4 + 1)
+
+        gb = GraphBuilder()
+        nodes = gb.grid(3, 4)
+        self.assertEqual(nodes.shape, (3, 4))
+        es = gb.build(causality=True)
+        # 12 masses with I and R, (2*4 + 3*3) springs with three bonds each
+        self.assertEqual(len(es), 12 * 2 + 17 * 3)
+
+    def test_vectorized_validation(self):
+        with self.assertRaises(ValueError):
+            validate_edges([1, 1], ["SE_a", "1_a"], ["1_a", "I_a"], [1, 1])
+        with self.assertRaises(ValueError):
+            validate_edges([1, 2], ["SE_a", "1_a"], ["1_a", "Q_a"], [1, 1])
+        with self.assertRaises(ValueError):
+            validate_edges([1, 2], ["SE_a", "1_a"], ["1_a", "I_a"], [1, 2])
+        # I_a with two bonds
+        with self.assertRaises(ValueError):
+            validate_edges([1, 2, 3], ["SE_a", "1_a", "1_a"], ["1_a", "I_a", "I_a"], [1, 1, 1])
+        validate_edges([1, 2], ["SE_a", "1_a"], ["1_a", "I_a"], [1, 1])
+
+    def test_large_graph(self):
+        start = time.perf_counter()
+        gb = GraphBuilder()
+        gb.chain(5000, tag="m")
+        es = gb.build()
+        self.assertEqual(len(es), 5000 * 2 + 4999 * 3)
+        self.assertLess(time.perf_counter() - start, 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
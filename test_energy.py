@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+from scipy.integrate import solve_ivp
+from lib_model import *
+from lib_energy import *
+from lib_integrators import *
+from test_linear import quarter_car_edges, QC_PARAMS
+
+
+class Test_EnergyBalance(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.es = quarter_car_edges()
+        self.model = compile_model(self.es)
+        self.eb = EnergyBalance(self.model, self.es, QC_PARAMS)
+        self.u = self.model.input_vector({"SF_01": 0.1, "SE_04": 500.0, "SE_11": 3000.0})
+        self.x0 = np.array([0.0, 0.0, 0.01, 0.05])
+
+    def test_stored_energy(self):
+        E = self.eb.stored_energy(self.x0)[0]
+        i = self.eb.storage_names.index("q_09")
+        self.assertAlmostEqual(E[i], 0.05**2 / (2 * QC_PARAMS["C_09"]))
+        self.assertEqual(self.eb.storage_elements, ["I_a", "I_b", "C_t", "C_s"])
+
+    def test_accurate_solution_balances(self):
+        sol = solve_ivp(self.model.rhs(lambda t: self.u, QC_PARAMS), (0.0, 2.0), self.x0,
+                        rtol=1e-10, atol=1e-12, dense_output=True)
+        t = np.linspace(0.0, 2.0, 20001)
+        report = self.eb.analyze(t, sol.sol(t).T, self.u)
+        self.assertTrue(report.ok(rtol=1e-4))
+        self.assertTrue(np.all(report.dissipated >= 0.0))
+
+    def test_bad_step_size_is_flagged(self):
+        integ = FixedStepIntegrator(self.model, 5e-3, method="semi_implicit_euler", params=QC_PARAMS)
+        res = integ.run(self.x0, 400, inputs=self.u)
+        report = self.eb.analyze(res.t, res.x, self.u)
+        self.assertFalse(report.ok(rtol=1e-3))
+
+    def test_nonlinear_laws(self):
+        model = compile_model(self.es, laws={"e_02": "Piecewise((k_t*q_02, q_02 >= 0), (0, True))"})
+        params = dict(QC_PARAMS, k_t=126330.0)
+        eb = EnergyBalance(model, self.es, params)
+        E = eb.stored_energy(np.array([[0.0, 0.0, -0.01, 0.0], [0.0, 0.0, 0.01, 0.0]]))
+        i = eb.storage_names.index("q_02")
+        self.assertAlmostEqual(E[0, i], 0.0)
+        self.assertAlmostEqual(E[1, i], 126330.0 * 0.01**2 / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
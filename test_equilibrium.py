@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+from lib_model import *
+from lib_equilibrium import *
+from test_linear import quarter_car_edges
+
+
+class Test_Equilibrium(unittest.TestCase):
+
+    def setUp(self) -> None:
+        # same numbers as ode_solve_QC.py
+        self.g = 9.81
+        self.m_s = 320.0
+        self.m_us = self.m_s / 6
+        self.k_s1 = self.m_s * (2 * np.pi * 1.0)**2
+        self.k_t = 10 * self.k_s1
+
+        self.model = compile_model(quarter_car_edges(), laws={
+            "e_08": "B*f_08**3",
+            "e_02": "Piecewise((k_t*q_02, q_02 >= 0), (0, True))",
+        })
+        self.params = {"I_05": self.m_us, "I_12": self.m_s, "C_09": 1 / self.k_s1, "B": 1500.0, "k_t": self.k_t}
+        self.inputs = {"SE_04": self.m_us * self.g, "SE_11": self.m_s * self.g}
+
+    def test_matches_hand_initial_conditions(self):
+        res = solve_equilibrium(self.model, self.params, self.inputs)
+        self.assertTrue(res.success)
+
+        x = res.as_dict()
+        # q_09_ini = m_s*g/k_s1, q_02_ini = (m_s+m_us)*g/k_t
+        self.assertAlmostEqual(x["q_09"], self.m_s * self.g / self.k_s1)
+        self.assertAlmostEqual(x["q_02"], (self.m_s + self.m_us) * self.g / self.k_t)
+        self.assertAlmostEqual(x["p_05"], 0.0)
+        self.assertAlmostEqual(x["p_12"], 0.0)
+
+    def test_no_equilibrium(self):
+        # gravity pulling up lifts the wheel off the tyre, the spring force stays zero
+        inputs = {n: -v for n, v in self.inputs.items()}
+        res = solve_equilibrium(self.model, self.params, inputs)
+        self.assertFalse(res.success)
+        self.assertGreater(res.residual_norm, 1.0)
+
+        # the line search never takes a step that raises the residual, however few halvings it has
+        F0 = self.model.derivatives(np.zeros(self.model.n_states), self.model.input_vector(inputs),
+                                    self.model.param_vector(self.params))
+        for max_halvings in (0, 1, 20):
+            res = solve_equilibrium(self.model, self.params, inputs, max_halvings=max_halvings)
+            self.assertFalse(res.success)
+            self.assertLessEqual(res.residual_norm, np.linalg.norm(F0))
+        self.assertTrue(solve_equilibrium(self.model, self.params, self.inputs, max_halvings=0).success)
+
+    def test_batched_parameter_sets(self):
+        masses = np.array([250.0, 320.0, 400.0, 500.0])
+        params = dict(self.params, I_12=masses)
+        inputs = dict(self.inputs, SE_11=masses * self.g)
+
+        res = solve_equilibrium(self.model, params, inputs)
+        self.assertTrue(res.success)
+        self.assertEqual(res.x.shape, (4, 4))
+
+        q_09 = res.x[self.model.state_index["q_09"]]
+        np.testing.assert_allclose(q_09, masses * self.g / self.k_s1)
+
+        # the state derivatives vanish for every case
+        u = np.array([np.broadcast_to(inputs.get(n, 0.0), masses.shape) for n in self.model.inputs])
+        xdot = self.model.derivatives(res.x, u, self.model.param_vector(params))
+        np.testing.assert_allclose(xdot, 0.0, atol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+import numpy as np
+from lib_linear import *
+from lib_model import *
+from lib_freq import *
+from test_linear import quarter_car_edges, QC_PARAMS
+
+
+class Test_FrequencyResponse(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.es = quarter_car_edges()
+        self.ss = SparseJunctionStructure(self.es).state_space(QC_PARAMS)
+        self.freqs = np.logspace(-2, 2, 400)
+
+    def test_eig_matches_solve(self):
+        fr_eig = frequency_response(self.ss, self.freqs, inputs=["SF_01"], outputs=["f_12", "e_02"], method="eig")
+        fr_solve = frequency_response(self.ss, self.freqs, inputs=["SF_01"], outputs=["f_12", "e_02"], method="solve")
+        np.testing.assert_allclose(fr_eig.H, fr_solve.H, rtol=1e-6, atol=1e-9)
+
+    def test_auto_diagonalizes_once(self):
+        with mock.patch.object(np.linalg, "eig", wraps=np.linalg.eig) as eig:
+            fr = frequency_response(self.ss, self.freqs, inputs=["SF_01"], outputs=["f_12"])
+        self.assertEqual(eig.call_count, 1)
+        fr_solve = frequency_response(self.ss, self.freqs, inputs=["SF_01"], outputs=["f_12"], method="solve")
+        np.testing.assert_allclose(fr.H, fr_solve.H, rtol=1e-6, atol=1e-9)
+
+    def test_road_to_body_velocity(self):
+        fr = frequency_response(self.ss, self.freqs, inputs=["SF_01"], outputs=["f_12"])
+        h = np.abs(fr.tf("f_12", "SF_01"))
+
+        # the body follows the road at low frequency and is isolated at high frequency
+        self.assertAlmostEqual(h[0], 1.0, places=3)
+        self.assertLess(h[-1], 1e-2)
+
+        # body resonance near the 1 Hz suspension frequency of ode_solve_QC.py
+        f_peak, _ = fr.peak("f_12", "SF_01")
+        self.assertGreater(f_peak, 0.7)
+        self.assertLess(f_peak, 1.5)
+
+    def test_compiled_model_linearization(self):
+        model = compile_model(self.es)
+        fr_model = frequency_response(model, self.freqs, inputs=["SF_01"], outputs=["f_12"], params=QC_PARAMS)
+        fr_ss = frequency_response(self.ss, self.freqs, inputs=["SF_01"], outputs=["f_12"])
+        np.testing.assert_allclose(fr_model.H, fr_ss.H, rtol=1e-8, atol=1e-12)
+
+    def test_bode(self):
+        freqs, mag_db, phase_deg = bode(self.ss, "f_12", "SF_01", self.freqs)
+        self.assertEqual(mag_db.shape, freqs.shape)
+        self.assertAlmostEqual(mag_db[0], 0.0, places=2)
+        self.assertAlmostEqual(phase_deg[0], 0.0, delta=1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
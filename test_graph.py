@@ -1,5 +1,12 @@
+import io
+import json
+import os
+import tempfile
+import time
 import unittest
+import numpy as np
 from lib_bonds import *
+import lib_bonds
 
 
 
@@ -313,5 +320,212 @@ class Test_5p6(unittest.TestCase):
         # Flow must (should) come from source
         for e in edges_w_C_dest:
             self.assertEqual(e.flow_side, FLOWSIDE.SRC)
+
+
+class Test_BondTable(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.edge_list = [
+            (1, "SF_a", "0_a", 1),
+            (2, "0_a", "C_t", 1),
+            (3, "0_a", "1_a", 1),
+            (4, "1_a", "SE_a", 1),
+            (5, "1_a", "I_a", 1),
+            (6, "1_a", "0_b", 1),
+            (7, "0_b", "1_b", 1),
+            (8, "1_b", "R_a", 1),
+            (9, "1_b", "C_s", 1),
+        ]
+
+    def test_views_match_objects(self):
+        es = [FlyEdge(num, src, dest, pwr_to_dest=pwr) for num, src, dest, pwr in self.edge_list]
+        table = BondTable.from_edges(es)
+        assign_causality_to_all_nodes(es, report=False)
+        assign_causality_to_all_nodes(table, report=False)
+
+        self.assertEqual(len(table), len(es))
+        for e, v in zip(es, table):
+            self.assertEqual(str(e), str(v))
+        self.assertEqual(table[4], table[4])
+        self.assertEqual(table[-1].num, 9)
+
+        eqs, _ = generate_symbols(es)
+        table_eqs, _ = generate_symbols(table)
+        self.assertEqual(eqs, table_eqs)
+
+    def test_columns(self):
+        nums, src, dest, pwr = zip(*self.edge_list)
+        table = BondTable.from_arrays(nums, src, dest, pwr)
+        table[0].flow_side = FLOWSIDE.SRC
+        self.assertEqual(table.flow_side[0], FLOWSIDE.SRC.value)
+        table[1].dest = "C_new"
+        self.assertEqual(table.nodes[table.dest[1]], "C_new")
+        self.assertEqual(sorted(table.num[table.rows_with_type("C")].tolist()), [2, 9])
+        self.assertEqual(table.degree()[table.node_index["1_a"]], 4)
+
+    def test_memory(self):
+        n = 200_000
+        k = np.arange(n)
+        table = BondTable.from_arrays(k + 1, np.char.add("1_", (k // 2).astype(str)),
+                                      np.char.add("I_", k.astype(str)))
+        self.assertLess(table.nbytes / n, 32)
+
+
+class Test_Netlist(unittest.TestCase):
+
+    def test_round_trip(self):
+        edge_list = [(1, "SF_a", "0_a", 1), (2, "0_a", "C_t", 1), (3, "0_a", "1_a", 1),
+                     (4, "1_a", "SE_a", 0), (5, "1_a", "I_a", 1)]
+        es = [FlyEdge(num, src, dest, pwr_to_dest=pwr) for num, src, dest, pwr in edge_list]
+        es[4].width = 3
+        assign_causality_to_all_nodes(es, report=False)
+        # R_08 has no bond 8 and R_2 is not a bond-line name: both stay on the .param line
+        params = {"C_02": 7.9e-6, "I_05": 320.0 / 6, "k_t": 126330.0, "R_08": 2.0, "R_2": 3.0}
+
+        buf = io.StringIO()
+        write_netlist(buf, es, params, causality=True)
+        buf.seek(0)
+        ns, es2, params2 = load_netlist(buf)
+
+        self.assertEqual([str(e) for e in es], [str(e) for e in es2])
+        self.assertEqual(params, params2)
+        self.assertEqual(ns[:3], ["SF_a", "0_a", "C_t"])
+
+    def test_parse(self):
+        text = """
+        # quarter car tire
+        .param k_t=126330
+        1 SF_a 0_a 1
+        2 0_a  C_t 1 C=7.9e-6   # tire spring
+        """
+        ns, table, params = load_netlist(text.splitlines(), table=True)
+        self.assertIsInstance(table, BondTable)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(params, {"k_t": 126330.0, "C_02": 7.9e-6})
+        with self.assertRaises(ValueError):
+            load_netlist(["1 SF_a 0_a"])
+        with self.assertRaises(ValueError):
+            load_netlist(["1 SF_a 0_a 1", "1 0_a C_t 1"])
+        with self.assertRaises(ValueError):
+            load_netlist(["1 SF_a 0_a 1 foo=2"])
+        for lines in (["1 SF_a 0_a 1 flow=SOURCE"], ["1 SF_a 0_a 1 width=x"], ["1 SF_a 0_a 1 C=abc"],
+                      ["1 SF_a 0_a 1", ".param k=abc"]):
+            with self.assertRaisesRegex(ValueError, f"line {len(lines)}"):
+                load_netlist(lines)
+
+    def test_large(self):
+        n = 100_000
+        lines = (f"{k} 1_{k // 2} I_{k} 1\n" for k in range(1, n + 1))
+        start = time.perf_counter()
+        ns, table, _ = load_netlist(lines, table=True)
+        self.assertEqual(len(table), n)
+        self.assertLess(time.perf_counter() - start, 5.0)
+
+
+
+def editor_export(n: int) -> dict:
+    # the layout graph_editor_tk saves: a chain of 1 junctions with one I each
+    nodes = [{"id": k, "label": "1", "nodetype": "1", "x": 10.0 * k, "y": 0.0} for k in range(n)]
+    nodes += [{"id": n + k, "label": "I", "nodetype": "I", "x": 10.0 * k, "y": 50.0} for k in range(n)]
+    edges = [{"id": k, "startNodeId": k, "endNodeId": n + k, "label": str(k + 1), "flow_side": 0} for k in range(n)]
+    return {"nodes": nodes, "edges": edges, "next_node_id": 2 * n, "next_edge_id": n}
+
+
+class Test_JsonGraph(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tmp.name, "graph.json")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def dump(self, graph: dict) -> None:
+        with open(self.fname, "w") as f:
+            json.dump(graph, f)
+
+    def test_duplicate_labels_stay_distinct(self):
+        self.dump(editor_export(3))
+        ns, es = load_json_graph(self.fname)
+        self.assertEqual(ns, ["1_00", "1_01", "1_02", "I_03", "I_04", "I_05"])
+        self.assertEqual([(e.src, e.dest) for e in es], [("1_00", "I_03"), ("1_01", "I_04"), ("1_02", "I_05")])
+
+    def test_unknown_node_id(self):
+        graph = {"nodes": [{"id": 1, "label": "SE_a"}],
+                 "edges": [{"id": 0, "startNodeId": 1, "endNodeId": 7, "label": "1"}]}
+        self.dump(graph)
+        ns, es = load_json_graph(self.fname)
+        self.assertEqual((es[0].src, es[0].dest), ("SE_a", "#7"))
+        with self.assertRaises(ValueError):
+            load_json_graph(self.fname, strict=True)
+
+    def test_stream_chunk_boundaries(self):
+        graph = editor_export(4)
+        text = json.dumps({"next_node_id": 123456, **graph}, indent=1)
+        items = list(lib_bonds._JsonStream(io.StringIO(text), chunk_size=7))
+        self.assertEqual(items, [("nodes", node) for node in graph["nodes"]] + [("edges", e) for e in graph["edges"]])
+
+    def test_large(self):
+        n = 50_000
+        self.dump(editor_export(n))
+        start = time.perf_counter()
+        ns, table = load_json_graph(self.fname, table=True)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(table), n)
+        self.assertEqual(len(set(ns)), 2 * n)
+
+
+
+class Test_Snapshot(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self.tmp.name, "graph" + SNAPSHOT_SUFFIX)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_lossless(self):
+        graph = editor_export(5)
+        graph["nodes"][0]["x"] = 100                  # int coordinate from the web editor
+        graph["nodes"][1]["label"] = "SE\u00e9"
+        del graph["nodes"][2]["y"]
+        graph["nodes"][3]["note"] = {"color": "red"}
+        graph["edges"][0]["label"] = 4                # not a string
+        graph["edges"][1]["id"] = 1 << 70             # does not fit int64
+        graph["edges"][2]["width"] = 3
+        save_snapshot(self.fname, graph)
+        data = read_graph_data(self.fname)
+        self.assertEqual(data, graph)
+        self.assertIs(type(data["nodes"][0]["x"]), int)
+        self.assertEqual(list(data), list(graph))
+
+    def test_mapped_columns(self):
+        save_snapshot(self.fname, editor_export(4))
+        with load_snapshot(self.fname) as snap:
+            ids = snap.column("edges", "startNodeId")
+            np.testing.assert_array_equal(ids, [0, 1, 2, 3])
+            self.assertFalse(ids.flags.writeable)
+            self.assertEqual(snap.strings[snap.column("nodes", "label")[0]], "1")
+            del ids
+
+    def test_bonds_match_json(self):
+        graph = editor_export(50)
+        save_snapshot(self.fname, graph)
+        json_name = os.path.join(self.tmp.name, "graph.json")
+        with open(json_name, "w") as f:
+            json.dump(graph, f)
+        ns, es = load_json_graph(self.fname)
+        ns_json, es_json = load_json_graph(json_name)
+        self.assertEqual(ns, ns_json)
+        self.assertEqual([str(e) for e in es], [str(e) for e in es_json])
+
+    def test_not_a_snapshot(self):
+        with open(self.fname, "wb") as f:
+            f.write(b"{}" * 40)
+        with self.assertRaises(ValueError):
+            load_snapshot(self.fname)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,87 @@
+import time
+import unittest
+from lib_bonds import *
+from lib_graph import GraphModel
+from test_graph import editor_export
+
+
+def mass_damper_model() -> GraphModel:
+    # SE -> 1 junction -> I and R, as drawn in the editor
+    graph = GraphModel()
+    se = graph.add_node({"x": 0.0, "y": 0.0, "label": "SE", "nodetype": "SE"})
+    one = graph.add_node({"x": 100.0, "y": 0.0, "label": "1", "nodetype": "1"})
+    i = graph.add_node({"x": 200.0, "y": -50.0, "label": "I", "nodetype": "I"})
+    r = graph.add_node({"x": 200.0, "y": 50.0, "label": "R", "nodetype": "R"})
+    for label, (a, b) in enumerate(((se, one), (one, i), (one, r)), start=1):
+        graph.add_edge({"startNodeId": a["id"], "endNodeId": b["id"], "label": str(label)})
+    return graph
+
+
+class Test_GraphModel(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = mass_damper_model()
+
+    def test_indices(self):
+        g = self.graph
+        self.assertEqual(g.node_names(), ["SE_01", "1_02", "I_03", "R_04"])
+        self.assertEqual(g.nodes[2]["type"], "junction")
+        self.assertEqual([e["label"] for e in g.incident(2)], ["1", "2", "3"])
+        self.assertEqual(g.edge_by_label("2")["endNodeId"], 3)
+        self.assertEqual(g.next_id, 8)
+        self.assertEqual(g.next_bond_number(), 4)
+
+    def test_causality_lands_in_the_model(self):
+        g = self.graph
+        es = g.bonds()
+        assign_causality_to_all_nodes(es, report=False)
+        edge = g.edge_by_label("1")
+        self.assertIs(g.bond(edge["id"]), es[0])
+        self.assertEqual(g.flow_side(edge["id"]), FLOWSIDE.DEST)
+        self.assertEqual([e["flow_side"] for e in g.to_json()["edges"]], [e.flow_side.value for e in es])
+        g.clear_causality()
+        self.assertTrue(all(e.flow_side == FLOWSIDE.IDK for e in es))
+
+    def test_edits(self):
+        g = self.graph
+        edge = g.edge_by_label("3")
+        g.set_edge_label(edge["id"], "7")
+        self.assertIsNone(g.edge_by_label("3"))
+        self.assertEqual(g.bond(edge["id"]).num, 7)
+        self.assertEqual(g.next_bond_number(), 3)
+
+        removed = g.remove_node(2)
+        self.assertEqual(len(removed), 3)
+        self.assertEqual(len(g), 0)
+        self.assertEqual(g.incident(1), [])
+        self.assertEqual(g.bonds(), [])
+
+        with self.assertRaises(ValueError):
+            g.add_edge({"startNodeId": 1, "endNodeId": 2, "label": "1"})
+        g.add_edge({"startNodeId": 1, "endNodeId": 3, "label": "x"})
+        with self.assertRaises(ValueError):
+            g.bonds()
+
+    def test_json_round_trip(self):
+        data = self.graph.to_json()
+        data["view"] = {"scale": 2.0}
+        graph = GraphModel.from_json(data)
+        self.assertEqual(graph.to_json(), data)
+        with self.assertRaises(ValueError):
+            self.graph.add_edge(dict(data["edges"][0]))
+        data["edges"][0]["flow_side"] = 2
+        with self.assertRaises(ValueError):
+            GraphModel.from_json(data)
+
+    def test_large(self):
+        data = editor_export(50_000)
+        start = time.perf_counter()
+        graph = GraphModel.from_json(data)
+        es = graph.bonds()
+        self.assertLess(time.perf_counter() - start, 5.0)
+        self.assertEqual(len(es), 50_000)
+        self.assertEqual(len(graph.incident(0)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+from scipy.integrate import solve_ivp
+from lib_linear import *
+from lib_model import *
+from lib_integrators import *
+from test_linear import quarter_car_edges, QC_PARAMS
+
+
+class Test_FixedStep(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.es = quarter_car_edges()
+        self.ss = SparseJunctionStructure(self.es).state_space(QC_PARAMS)
+        self.model = compile_model(self.es)
+
+        self.u = np.zeros(len(self.ss.inputs))
+        self.u[self.ss.input_index["SE_11"]] = 320.0 * 9.81
+        self.x0 = np.zeros(self.ss.n_states)
+
+        sol = solve_ivp(self.ss.rhs(lambda t: self.u), (0.0, 0.5), self.x0, rtol=1e-10, atol=1e-12)
+        self.x_ref = sol.y[:, -1]
+
+    def check_method(self, system, method, dt, rtol, **kwargs):
+        integ = FixedStepIntegrator(system, dt, method=method, **kwargs)
+        res = integ.run(self.x0, int(round(0.5 / dt)), inputs=self.u, record_every=100)
+        np.testing.assert_allclose(res.x[-1], self.x_ref, rtol=rtol, atol=rtol * np.abs(self.x_ref).max())
+        self.assertAlmostEqual(res.t[-1], 0.5)
+        return res
+
+    def test_rk4(self):
+        self.check_method(self.ss, "rk4", 1e-3, 1e-6)
+
+    def test_semi_implicit_euler(self):
+        self.check_method(self.ss, "semi_implicit_euler", 1e-4, 1e-2)
+
+    def test_trapezoidal(self):
+        self.check_method(self.ss, "trapezoidal", 1e-3, 1e-3)
+
+    def test_compiled_model(self):
+        self.check_method(self.model, "rk4", 1e-3, 1e-6, params=QC_PARAMS)
+
+    def test_timing_stats(self):
+        integ = FixedStepIntegrator(self.ss, 1e-3, method="rk4")
+        res = integ.run(self.x0, 200, inputs=self.u, deadline=1.0)
+        self.assertEqual(res.timing.n_steps, 200)
+        self.assertEqual(res.timing.overruns, 0)
+        self.assertTrue(res.timing.fits_budget())
+        self.assertLessEqual(res.timing.mean_us, res.timing.max_us)
+
+    def test_input_table_and_callable(self):
+        n_steps = 100
+        table = np.tile(self.u, (n_steps, 1))
+        def u_fun(t, u):
+            u[:] = self.u
+
+        a = FixedStepIntegrator(self.ss, 1e-3).run(self.x0, n_steps, inputs=table)
+        b = FixedStepIntegrator(self.ss, 1e-3).run(self.x0, n_steps, inputs=u_fun)
+        np.testing.assert_array_equal(a.x, b.x)
+
+    def test_last_step_is_recorded(self):
+        full = FixedStepIntegrator(self.ss, 1e-3).run(self.x0, 105, inputs=self.u)
+        res = FixedStepIntegrator(self.ss, 1e-3).run(self.x0, 105, inputs=self.u, record_every=10)
+        self.assertEqual(len(res.t), 12)
+        self.assertAlmostEqual(res.t[-1], 0.105)
+        np.testing.assert_array_equal(res.x[-1], full.x[-1])
+
+    def test_kernel_names(self):
+        # a law parameter named like a kernel argument must not shadow it
+        model = compile_model(self.es, laws={"e_08": "out*f_08"})
+        out = np.empty(model.n_states)
+        params = dict(QC_PARAMS, out=QC_PARAMS["R_08"])
+        ref = FixedStepIntegrator(self.ss, 1e-3).run(self.x0, 1, inputs=self.u)
+        kernel = model.kernel()
+        kernel(ref.x[-1], model.input_vector({"SE_11": 320.0 * 9.81}), model.param_vector(params), out)
+        np.testing.assert_allclose(out, self.ss.rhs(lambda t: self.u)(0.0, ref.x[-1]))
+        with self.assertRaises(ValueError):
+            compile_model(self.es, laws={"e_08": "math*f_08"}).kernel()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import numpy as np
+from lib_bonds import *
+from lib_linear import *
+
+
+def quarter_car_edges() -> list[FlyEdge]:
+    # linear version of the quarter car model in ode_solve_QC.py
+    edge_list = [
+        (1, "SF_a", "0_a", 1),
+        (2, "0_a", "C_t", 1),
+        (3, "0_a", "1_a", 1),
+        (4, "1_a", "SE_a", 1),
+        (5, "1_a", "I_a", 1),
+        (6, "1_a", "0_b", 1),
+        (7, "0_b", "1_b", 1),
+        (8, "1_b", "R_a", 1),
+        (9, "1_b", "C_s", 1),
+        (10, "0_b", "1_c", 1),
+        (11, "1_c", "SE_b", 1),
+        (12, "1_c", "I_b", 1),
+    ]
+    es = [FlyEdge(num, src, dest, pwr_to_dest=pwr) for num, src, dest, pwr in edge_list]
+    assign_causality_to_all_nodes(es, report=False)
+    return es
+
+
+QC_PARAMS = {
+    "I_05": 320.0 / 6,
+    "I_12": 320.0,
+    "C_02": 1.0 / 126330.0,
+    "C_09": 1.0 / 12633.0,
+    "R_08": 1500.0,
+}
+
+
+class Test_StateSpace(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.es = quarter_car_edges()
+        self.sjs = SparseJunctionStructure(self.es)
+        self.ss = self.sjs.state_space(QC_PARAMS)
+
+    def test_names(self):
+        self.assertEqual(sorted(self.ss.states), ["p_05", "p_12", "q_02", "q_09"])
+        self.assertEqual(sorted(self.ss.inputs), ["SE_04", "SE_11", "SF_01"])
+        self.assertEqual(sorted(self.sjs.params), sorted(QC_PARAMS))
+
+    def test_A_matches_hand_derivation(self):
+        p = QC_PARAMS
+        i = self.ss.state_index
+        A = self.ss.A.toarray()
+
+        # pdot_05 = q_02/C_02 - q_09/C_09 - R_08 (p_05/I_05 - p_12/I_12) - SE_04
+        self.assertAlmostEqual(A[i["p_05"], i["q_02"]], 1 / p["C_02"])
+        self.assertAlmostEqual(A[i["p_05"], i["q_09"]], -1 / p["C_09"])
+        self.assertAlmostEqual(A[i["p_05"], i["p_05"]], -p["R_08"] / p["I_05"])
+        self.assertAlmostEqual(A[i["p_05"], i["p_12"]], p["R_08"] / p["I_12"])
+
+        # qdot_09 = p_05/I_05 - p_12/I_12
+        self.assertAlmostEqual(A[i["q_09"], i["p_05"]], 1 / p["I_05"])
+        self.assertAlmostEqual(A[i["q_09"], i["p_12"]], -1 / p["I_12"])
+
+        B = self.ss.B.toarray()
+        self.assertAlmostEqual(B[i["p_05"], self.ss.input_index["SE_04"]], -1.0)
+        self.assertAlmostEqual(B[i["q_02"], self.ss.input_index["SF_01"]], 1.0)
+
+    def test_outputs(self):
+        x = np.zeros(self.ss.n_states)
+        x[self.ss.state_index["q_09"]] = 0.01
+        u = np.zeros(len(self.ss.inputs))
+        y = self.ss.output(x, u)
+
+        # spring effort e_09 = q_09 / C_09
+        self.assertAlmostEqual(y[self.ss.output_index["e_09"]], 0.01 / QC_PARAMS["C_09"])
+
+    def test_cache(self):
+        self.assertIs(self.sjs.state_space(dict(QC_PARAMS)), self.ss)
+        other = dict(QC_PARAMS, R_08=1000.0)
+        self.assertIsNot(self.sjs.state_space(other), self.ss)
+
+    def test_missing_params(self):
+        params = dict(QC_PARAMS)
+        del params["R_08"]
+        with self.assertRaises(ValueError):
+            self.sjs.state_space(params)
+
+
+def vector_chain_edges(n: int) -> list[FlyEdge]:
+    # mass_spring_chain of test_modal with one vector bond per element type,
+    # the springs see the velocity differences through a (n-1, n) TF matrix
+    es = [
+        FlyEdge(1, "SE_f", "1_m", width=n),
+        FlyEdge(2, "1_m", "I_m", width=n),
+        FlyEdge(3, "1_m", "R_m", width=n),
+        FlyEdge(4, "1_m", "TF_d", width=n),
+        FlyEdge(5, "TF_d", "0_s", width=n - 1),
+        FlyEdge(6, "0_s", "C_s", width=n - 1),
+    ]
+    assign_causality_to_all_nodes(es, report=False)
+    return es
+
+
+class Test_VectorBonds(unittest.TestCase):
+
+    def test_elementwise_cells(self):
+        # n parallel RC cells fed by a vector current source
+        n = 500
+        es = [FlyEdge(1, "SF_i", "0_c", width=n), FlyEdge(2, "0_c", "C_c", width=n), FlyEdge(3, "0_c", "R_c", width=n)]
+        assign_causality_to_all_nodes(es, report=False)
+        sjs = SparseJunctionStructure(es)
+        self.assertEqual(sjs.states, ["q_02"])
+
+        C = np.linspace(1.0, 2.0, n)
+        ss = sjs.state_space({"C_02": C, "R_03": 0.5})
+        self.assertEqual(ss.n_states, n)
+        self.assertEqual(ss.states[3], "q_02[3]")
+        np.testing.assert_allclose(ss.A.diagonal(), -1 / (0.5 * C))
+        self.assertEqual(ss.A.nnz, n)
+
+    def test_matrix_tf_matches_scalar_chain(self):
+        from test_modal import mass_spring_chain
+        n = 6
+        m, r, c = 2.0, 0.3, 0.01
+        scalar = SparseJunctionStructure(mass_spring_chain(n))
+        params = {name: {"I": m, "R": r, "C": c}[name.split("_")[0]] for name in scalar.params}
+        ref = np.sort_complex(np.linalg.eigvals(scalar.state_space(params).A.toarray()))
+
+        D = np.eye(n - 1, n) - np.eye(n - 1, n, k=1)
+        sjs = SparseJunctionStructure(vector_chain_edges(n))
+        for I in (m, np.full(n, m), m * np.eye(n)):
+            ss = sjs.state_space({"I_02": I, "R_03": r, "TF_04": D, "C_06": c})
+            self.assertEqual(ss.n_states, 2 * n - 1)
+            np.testing.assert_allclose(np.sort_complex(np.linalg.eigvals(ss.A.toarray())), ref, rtol=1e-9)
+
+    def test_width_checks(self):
+        es = [FlyEdge(1, "SF_i", "0_c", width=3), FlyEdge(2, "0_c", "C_c", width=2)]
+        with self.assertRaises(ValueError):
+            SparseJunctionStructure(es)
+        sjs = SparseJunctionStructure(vector_chain_edges(4))
+        with self.assertRaises(ValueError):
+            sjs.state_space({"I_02": 1.0, "R_03": 1.0, "TF_04": np.eye(4), "C_06": 1.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+from lib_bonds import *
+from lib_linear import *
+from lib_modal import *
+from test_linear import quarter_car_edges, vector_chain_edges, QC_PARAMS
+
+
+def mass_spring_chain(n: int) -> list[FlyEdge]:
+    # SE -> 1_k (mass I_k) -> 0_k (spring C_k to the next mass) -> 1_k+1 ...
+    es = []
+    num = 1
+    es.append(FlyEdge(num, "SE_0", "1_1", pwr_to_dest=1))
+    for k in range(1, n + 1):
+        num += 1
+        es.append(FlyEdge(num, f"1_{k}", f"I_{k}", pwr_to_dest=1))
+        num += 1
+        es.append(FlyEdge(num, f"1_{k}", f"R_{k}", pwr_to_dest=1))
+        if k < n:
+            num += 1
+            es.append(FlyEdge(num, f"1_{k}", f"0_{k}", pwr_to_dest=1))
+            num += 1
+            es.append(FlyEdge(num, f"0_{k}", f"C_{k}", pwr_to_dest=1))
+            num += 1
+            es.append(FlyEdge(num, f"0_{k}", f"1_{k + 1}", pwr_to_dest=1))
+    assign_causality_to_all_nodes(es, report=False)
+    return es
+
+
+class Test_Modal(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.es = quarter_car_edges()
+        self.ss = SparseJunctionStructure(self.es).state_space(QC_PARAMS)
+
+    def test_quarter_car_modes(self):
+        res = modal_analysis(self.ss, self.es)
+        self.assertEqual(len(res.modes), 2)
+
+        body, wheel = res.modes
+        self.assertTrue(body.is_oscillatory and wheel.is_oscillatory)
+
+        # body bounce near 1 Hz, wheel hop near sqrt((k_s + k_t)/m_us) / 2 pi
+        k_s = 1 / QC_PARAMS["C_09"]
+        k_t = 1 / QC_PARAMS["C_02"]
+        self.assertAlmostEqual(body.freq, 1.0, delta=0.15)
+        self.assertAlmostEqual(wheel.freq, np.sqrt((k_s + k_t) / QC_PARAMS["I_05"]) / (2 * np.pi), delta=0.5)
+        self.assertTrue(0 < body.zeta < 1)
+
+        # modes map back to the storage element nodes
+        self.assertEqual(dict(zip(body.states, body.elements)),
+                         {"p_05": "I_a", "p_12": "I_b", "q_02": "C_t", "q_09": "C_s"})
+
+    def test_sparse_matches_dense(self):
+        es = mass_spring_chain(60)
+        sjs = SparseJunctionStructure(es)
+        params = {n: 1.0 if n.startswith(("I_", "C_")) else 0.05 for n in sjs.params}
+        ss = sjs.state_space(params)
+
+        dense = modal_analysis(ss, es)
+        sparse = modal_analysis(ss, es, n_modes=6, sigma=0.0, dense_limit=10)
+
+        # n_modes distinct modes, not n_modes eigenvalues that are half conjugates
+        self.assertEqual(len(sparse.modes), 6)
+        np.testing.assert_allclose(sparse.frequencies, dense.frequencies[:6], rtol=1e-6)
+        np.testing.assert_allclose(sparse.damping_ratios, dense.damping_ratios[:6], rtol=1e-5)
+
+    def test_vector_bonds(self):
+        n = 6
+        es = vector_chain_edges(n)
+        D = np.eye(n - 1, n) - np.eye(n - 1, n, k=1)
+        ss = SparseJunctionStructure(es).state_space({"I_02": 2.0, "R_03": 0.3, "TF_04": D, "C_06": 0.01})
+        chain = mass_spring_chain(n)
+        sjs = SparseJunctionStructure(chain)
+        ref = sjs.state_space({name: {"I": 2.0, "R": 0.3, "C": 0.01}[name.split("_")[0]] for name in sjs.params})
+
+        result = modal_analysis(ss, es)
+        np.testing.assert_allclose(result.frequencies, modal_analysis(ref).frequencies, rtol=1e-9)
+        mode = result.modes[-1]
+        self.assertEqual(mode.bonds, [2] * n + [6] * (n - 1))
+        self.assertEqual(set(mode.elements), {"I_m", "C_s"})
+
+    def test_zero_eigenvalue_has_no_damping_ratio(self):
+        mode = Mode(0.0, np.array([1.0]), ["p_01"], {})
+        self.assertEqual(mode.wn, 0.0)
+        self.assertTrue(np.isnan(mode.zeta))
+
+
+if __name__ == '__main__':
+    unittest.main()
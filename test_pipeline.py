@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from lib_pipeline import *
+from test_graph_model import mass_damper_model
+
+STAGES_NO_PLOT = ["load", "causality", "equations"]
+
+
+class Test_Pipeline(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = os.path.join(self.tmp.name, "out")
+        self.graphs = os.path.join(self.tmp.name, "graphs")
+        os.makedirs(self.graphs)
+        self.data = mass_damper_model().to_json()
+        for name in ("a", "b"):
+            self.write(name, self.data)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def write(self, name: str, data: dict) -> str:
+        path = os.path.join(self.graphs, f"{name}.json")
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return path
+
+    def test_stage_order(self):
+        self.assertEqual(stage_order(["equations"]), ["load", "causality", "equations"])
+        self.assertEqual(stage_order(["plot", "load"]), ["load", "causality", "plot"])
+        with self.assertRaises(ValueError):
+            stage_order(["solve"])
+
+    def test_only_changed_stages_rerun(self):
+        pipeline = Pipeline(self.out, stages=STAGES_NO_PLOT)
+        path = os.path.join(self.graphs, "a.json")
+        self.assertEqual(set(pipeline.run_file(path).values()), {"ran"})
+        self.assertTrue(os.path.exists(os.path.join(self.out, "a_equations.txt")))
+        self.assertEqual(set(pipeline.run_file(path).values()), {"cached"})
+
+        # moving a node changes the file, not the bonds
+        self.data["nodes"][0]["x"] += 25.0
+        self.write("a", self.data)
+        self.assertEqual(pipeline.run_file(path), {"load": "ran", "causality": "cached", "equations": "cached"})
+
+        # a deleted report is written again
+        os.remove(os.path.join(self.out, "a_equations.txt"))
+        self.assertEqual(pipeline.run_file(path)["equations"], "ran")
+
+        # reversing a bond changes everything downstream
+        edge = self.data["edges"][2]
+        edge["startNodeId"], edge["endNodeId"] = edge["endNodeId"], edge["startNodeId"]
+        self.write("a", self.data)
+        self.assertEqual(set(pipeline.run_file(path).values()), {"ran"})
+
+    def test_errors_and_parallel(self):
+        bad = os.path.join(self.graphs, "c.json")
+        with open(bad, "w") as f:
+            f.write("{\"nodes\": [")
+        pipeline = Pipeline(self.out, stages=STAGES_NO_PLOT)
+        results = pipeline.run(expand_inputs([self.graphs]), jobs=2)
+        self.assertEqual(list(results), [os.path.join(self.graphs, f"{n}.json") for n in "abc"])
+        self.assertEqual(set(results[os.path.join(self.graphs, "b.json")].values()), {"ran"})
+        self.assertTrue(results[bad]["load"].startswith("error"))
+        self.assertEqual(results[bad]["equations"], "skipped")
+
+        code = main([os.path.join(self.graphs, "[ab].json"), "-o", self.out, "-s", "equations", "-j", "1"])
+        self.assertEqual(code, 0)
+
+    def test_same_stem_is_rejected(self):
+        other = os.path.join(self.graphs, "sub")
+        os.makedirs(other)
+        with open(os.path.join(other, "a.json"), "w") as f:
+            json.dump(self.data, f)
+        paths = expand_inputs([self.graphs, other])
+        with self.assertRaisesRegex(ValueError, "a.json"):
+            Pipeline(self.out, stages=STAGES_NO_PLOT).run(paths)
+        self.assertEqual(main([self.graphs, other, "-o", self.out, "-s", "equations"]), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.out, "a_equations.txt")))
+
+
+class Test_Watcher(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = mass_damper_model().to_json()
+        self.path = os.path.join(self.tmp.name, "a.json")
+        self.write()
+        self.watcher = Watcher(Pipeline(os.path.join(self.tmp.name, "out"), stages=STAGES_NO_PLOT),
+                               [self.tmp.name], interval=0.0, report=None)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def write(self) -> None:
+        with open(self.path, "w") as f:
+            json.dump(self.data, f)
+
+    def test_reruns_on_content_change(self):
+        self.assertEqual(set(self.watcher.poll()[self.path].values()), {"ran"})
+        self.assertEqual(self.watcher.poll(), {})
+
+        # saved again without changes
+        self.write()
+        os.utime(self.path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        self.assertEqual(self.watcher.poll(), {})
+
+        # a new bond: every stage reruns, with SymPy and the earlier artifacts already loaded
+        one = next(n["id"] for n in self.data["nodes"] if n["nodetype"] == "1")
+        c = {"id": 50, "x": 0.0, "y": 90.0, "label": "C", "type": "node", "nodetype": "C"}
+        self.data["nodes"].append(c)
+        self.data["edges"].append({"id": 51, "startNodeId": one, "endNodeId": 50, "label": "4", "flow_side": 0})
+        self.write()
+        start = time.perf_counter()
+        results = self.watcher.poll()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(set(results[self.path].values()), {"ran"})
+        with open(os.path.join(self.tmp.name, "out", "a_equations.txt"), encoding="utf-8") as f:
+            self.assertIn("q_04", f.read())
+
+        os.remove(self.path)
+        self.assertEqual(self.watcher.poll(), {})
+        self.assertEqual(self.watcher.seen, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
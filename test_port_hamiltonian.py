@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from lib_bonds import *
+from lib_linear import *
+from lib_integrators import *
+from test_linear import quarter_car_edges, QC_PARAMS
+
+
+class Test_PortHamiltonian(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.es = quarter_car_edges()
+        self.ph = port_hamiltonian_form(self.es)
+        self.x0 = np.array([0.0, 0.0, 0.01, 0.05])
+
+    def test_structure(self):
+        J = self.ph.J
+        R = self.ph.R
+        self.assertEqual(J, -J.T)
+        self.assertEqual(R, R.T)
+        self.assertEqual([s.name for s in self.ph.states], ["p_05", "p_12", "q_02", "q_09"])
+
+        # (J - R) grad H + G u reproduces the state-space model
+        params = QC_PARAMS
+        ss = SparseJunctionStructure(self.es).state_space(params)
+        subs = {s: params[s.name] for s in self.ph.params}
+        Q = np.diag([1 / params["I_05"], 1 / params["I_12"], 1 / params["C_02"], 1 / params["C_09"]])
+        K = np.array((J - R).xreplace(subs), dtype=float)
+        np.testing.assert_allclose(K @ Q, ss.A.toarray())
+        np.testing.assert_allclose(np.array(self.ph.G, dtype=float), ss.B.toarray())
+
+    def test_undamped_energy_conservation(self):
+        params = dict(QC_PARAMS, R_08=0.0)
+        dt = 0.02   # about 6 steps per wheel-hop period
+        for method in PH_METHODS:
+            res = PortHamiltonianIntegrator(self.ph, params, dt, method=method).run(self.x0, 500)
+            np.testing.assert_allclose(res.H, res.H[0], rtol=1e-9)
+
+        ss = SparseJunctionStructure(self.es).state_space(params)
+        rk4 = FixedStepIntegrator(ss, dt, method="rk4").run(self.x0, 500)
+        integ = PortHamiltonianIntegrator(self.ph, params, dt)
+        drift = abs(integ.energy(rk4.x[-1]) - integ.energy(self.x0)) / integ.energy(self.x0)
+        self.assertGreater(drift, 1e-3)
+
+    def test_damped_energy_balance(self):
+        ph = port_hamiltonian_form(self.es, energies={"q_02": "Piecewise((q_02**2/(2*C_02), q_02 >= 0), (0, True))"})
+        integ = PortHamiltonianIntegrator(ph, QC_PARAMS, 0.01)
+        res = integ.run(self.x0, 300, inputs=np.array([0.1, 500.0, 3000.0]))
+        scale = np.abs(res.H).max()
+        np.testing.assert_allclose(res.balance_residual, 0.0, atol=1e-9 * scale)
+        self.assertGreater(res.dissipated[-1], 0.0)
+
+    def test_last_step_is_recorded(self):
+        integ = PortHamiltonianIntegrator(self.ph, QC_PARAMS, 0.01)
+        full = integ.run(self.x0, 25)
+        res = integ.run(self.x0, 25, record_every=10)
+        self.assertEqual(len(res.t), 4)
+        self.assertAlmostEqual(res.t[-1], 0.25)
+        np.testing.assert_allclose(res.x[-1], full.x[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import numpy as np
+from scipy.integrate import trapezoid
+from lib_model import compile_model
+from lib_probes import *
+from lib_sim import simulate
+from test_linear import quarter_car_edges, QC_PARAMS
+
+
+class Test_Reducers(unittest.TestCase):
+
+    def test_streamed_matches_batch(self):
+        t = np.linspace(0.0, 1.0, 10_001)
+        y = np.sin(2 * np.pi * 3 * t) + 0.2
+        reducers = [Min(), Max(), RMS(), Histogram(np.linspace(-1, 1, 9)), Crossings(0.0, "up")]
+        for chunk in np.array_split(np.arange(len(t)), 37):
+            for r in reducers:
+                r.update(t[chunk], y[chunk])
+        mn, mx, rms, hist, cross = reducers
+        self.assertAlmostEqual(mn.result(), y.min())
+        self.assertAlmostEqual(mx.result(), y.max())
+        self.assertAlmostEqual(rms.result(), np.sqrt(trapezoid(y**2, t) / t[-1]))
+        np.testing.assert_array_equal(hist.result(), np.histogram(y, np.linspace(-1, 1, 9))[0])
+        self.assertEqual(hist.overflow, np.count_nonzero(y > 1))
+        self.assertEqual(cross.result(), 3)
+
+    def test_reducer_is_abstract(self):
+        class Last(Reducer):
+            def update(self, t, y):
+                self.last = y[-1]
+
+        with self.assertRaises(TypeError):
+            Reducer()
+        with self.assertRaises(TypeError):
+            Last()
+
+    def test_bad_direction(self):
+        with self.assertRaises(ValueError):
+            Crossings(0.0, "sideways")
+
+
+class Test_Probes(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.model = compile_model(quarter_car_edges())
+        self.u = self.model.input_vector({"SF_01": 0.1, "SE_04": 500.0, "SE_11": 3000.0})
+        self.x0 = np.array([0.0, 0.0, 0.01, 0.05])
+        self.fun = self.model.rhs(lambda t: self.u, QC_PARAMS)
+
+    def make_probes(self):
+        probes = Probes(self.model, QC_PARAMS, lambda t: self.u, samples_per_step=8)
+        probes.add("e_02", Min(), Max())
+        probes.add("pdot_12", RMS())
+        probes.add("q_09", Max(), Crossings(0.05))
+        return probes
+
+    def test_unknown_variable(self):
+        probes = Probes(self.model, QC_PARAMS)
+        with self.assertRaises(ValueError):
+            probes.add("e_99", Max())
+        with self.assertRaises(ValueError):
+            Probes(names=["x"]).add("e_02", Max())
+
+    def test_matches_full_trajectory(self):
+        probes = self.make_probes()
+        full = simulate(self.fun, (0.0, 1.0), self.x0, rtol=1e-9, atol=1e-12,
+                        names=self.model.states, probes=probes)
+        t = np.linspace(0.0, 1.0, 20_001)
+        X = full(t)
+        U = np.broadcast_to(self.u[:, None], (len(self.u), len(t)))
+        Y = self.model.output(X, U, self.model.param_vector(QC_PARAMS)[:, None])
+        e_02 = Y[self.model.output_index["e_02"]]
+        pdot_12 = self.model.derivatives(X, U, self.model.param_vector(QC_PARAMS)[:, None])[1]
+
+        res = probes.results()
+        self.assertAlmostEqual(res["e_02"]["max"] / e_02.max(), 1.0, places=3)
+        self.assertAlmostEqual(res["e_02"]["min"] / e_02.min(), 1.0, places=3)
+        self.assertAlmostEqual(res["pdot_12"]["rms"] / np.sqrt(trapezoid(pdot_12**2, t)), 1.0, places=3)
+        self.assertAlmostEqual(res["q_09"]["max"], X[3].max(), places=6)
+
+    def test_no_dense_output(self):
+        probes = self.make_probes()
+        res = simulate(self.fun, (0.0, 1.0), self.x0, rtol=1e-9, atol=1e-12,
+                       probes=probes, keep_dense=False)
+        self.assertTrue(res.success)
+        self.assertEqual(len(res.t_steps), 2)
+        with self.assertRaises(ValueError):
+            res(0.5)
+        self.assertTrue(np.isfinite(probes.results()["pdot_12"]["rms"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import time
+import unittest
+from lib_bonds import *
+from lib_report import ReportJob
+from test_graph_model import mass_damper_model
+
+
+def wait(job: ReportJob, timeout: float = 60.0) -> list[tuple]:
+    messages = []
+    deadline = time.perf_counter() + timeout
+    while not job.finished and time.perf_counter() < deadline:
+        messages += job.poll()
+        time.sleep(0.02)
+    return messages
+
+
+class Test_ReportJob(unittest.TestCase):
+
+    def test_report(self):
+        es = mass_damper_model().bonds()
+        with tempfile.TemporaryDirectory() as tmp:
+            fname = os.path.join(tmp, "equations.txt")
+            job = ReportJob(es, [], png_name=None, equations_name=fname).start()
+            messages = wait(job)
+            self.assertIsNone(job.error)
+            self.assertEqual(job.result, [-1, -1, 1])
+            self.assertIn(("progress", "Solving equations"), messages)
+            self.assertIn(("causality", [-1, -1, 1]), messages)
+            self.assertTrue(os.path.getsize(fname) > 0)
+        # the worker has copies, the caller's bonds are untouched
+        self.assertTrue(all(e.flow_side == FLOWSIDE.IDK for e in es))
+        self.assertFalse(job.process.is_alive())
+
+    def test_error(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            png_name = os.path.join(tmp, "missing", "graph.png")
+            job = ReportJob(mass_damper_model().bonds(), [], png_name=png_name, equations_name=None).start()
+            wait(job)
+        self.assertIsNone(job.result)
+        self.assertIsNotNone(job.error)
+
+    def test_cancel(self):
+        job = ReportJob(mass_damper_model().bonds(), [], png_name=None).start()
+        job.cancel()
+        self.assertFalse(job.process.is_alive())
+        self.assertEqual(job.error, "cancelled")
+        self.assertIsNone(job.result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import itertools
+import json
+import unittest
+from lib_server import AnalysisServer, analyze_graph, graph_fingerprint
+from test_graph_model import mass_damper_model
+
+
+async def http(port: int, method: str, path: str, payload=None, origin: str | None = None,
+               host: str = "127.0.0.1") -> tuple[int, dict | None]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    head = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", f"Content-Length: {len(body)}"]
+    if origin is not None:
+        head.append(f"Origin: {origin}")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(data) if data else None
+
+
+def mass_damper_request(simulate: bool = False) -> dict:
+    request = {"graph": mass_damper_model().to_json()}
+    if simulate:
+        request["simulate"] = {"t_end": 2.0, "params": {"I_02": 1.0, "R_03": 1.0}, "inputs": {"SE_01": 1.0},
+                               "n_points": 5}
+    return request
+
+
+class Test_Analyze(unittest.TestCase):
+
+    def test_analyze_graph(self):
+        result = analyze_graph(mass_damper_request(simulate=True))
+        self.assertEqual([c["flow_side"] for c in result["causality"]], [-1, -1, 1])
+        self.assertEqual(result["states"], ["p_02"])
+        self.assertEqual(result["equations"], ["pdot_02 = (I_02*SE_01 - R_03*p_02)/I_02"])
+        sim = result["simulation"]
+        self.assertEqual(len(sim["t"]), 5)
+        # first order lag towards SE/R = 1
+        self.assertAlmostEqual(sim["states"]["p_02"][-1], 1.0 - 2.718281828 ** -2.0, places=3)
+
+    def test_posted_causality_is_recomputed(self):
+        # whatever flow sides the editor sends back, the analysis starts from scratch
+        for flow_sides in itertools.product((-1, 0, 1), repeat=3):
+            request = mass_damper_request()
+            for edge, flow_side in zip(request["graph"]["edges"], flow_sides):
+                edge["flow_side"] = flow_side
+            result = analyze_graph(request)
+            self.assertEqual([c["flow_side"] for c in result["causality"]], [-1, -1, 1])
+
+    def test_fingerprint_ignores_layout(self):
+        request = mass_damper_request()
+        moved = mass_damper_request()
+        for node in moved["graph"]["nodes"]:
+            node["x"] += 40.0
+        self.assertEqual(graph_fingerprint(request), graph_fingerprint(moved))
+        moved["graph"]["edges"][2]["label"] = "4"
+        self.assertNotEqual(graph_fingerprint(request), graph_fingerprint(moved))
+
+    def test_local_only(self):
+        with self.assertRaises(ValueError):
+            AnalysisServer(host="0.0.0.0")
+
+
+class Test_Server(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.server = AnalysisServer(port=0, workers=1, allow_null_origin=True)
+        _, self.port = await self.server.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.server.close()
+
+    async def test_health(self):
+        status, payload = await http(self.port, "GET", "/health")
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["status"], "ok")
+        status, _ = await http(self.port, "GET", "/nowhere")
+        self.assertEqual(status, 404)
+
+    async def test_analyze_and_cache(self):
+        status, first = await http(self.port, "POST", "/analyze", mass_damper_request(simulate=True), origin="null")
+        self.assertEqual(status, 200)
+        self.assertFalse(first.pop("cached"))
+        self.assertIn("simulation", first)
+
+        request = mass_damper_request(simulate=True)
+        request["graph"]["nodes"][0]["x"] = 300.0
+        status, second = await http(self.port, "POST", "/analyze", request)
+        self.assertTrue(second.pop("cached"))
+        self.assertEqual(second, first)
+        self.assertEqual(self.server.n_computed, 1)
+
+    async def test_concurrent_requests_share_one_computation(self):
+        results = await asyncio.gather(*(http(self.port, "POST", "/analyze", mass_damper_request()) for _ in range(4)))
+        self.assertEqual({status for status, _ in results}, {200})
+        self.assertEqual(self.server.n_computed, 1)
+
+    async def test_errors(self):
+        request = mass_damper_request()
+        request["graph"]["edges"][0]["label"] = "x"
+        status, payload = await http(self.port, "POST", "/analyze", request)
+        self.assertEqual(status, 400)
+        self.assertIn("x", payload["error"])
+        self.assertEqual(len(self.server.cache), 0)
+        status, _ = await http(self.port, "POST", "/analyze", {"nodes": []})
+        self.assertEqual(status, 400)
+        status, _ = await http(self.port, "POST", "/analyze", mass_damper_request(), origin="https://example.com")
+        self.assertEqual(status, 403)
+        # DNS rebinding: a foreign name resolving to 127.0.0.1
+        status, _ = await http(self.port, "POST", "/analyze", mass_damper_request(), host="evil.example.com")
+        self.assertEqual(status, 403)
+        status, _ = await http(self.port, "GET", "/health", host="localhost")
+        self.assertEqual(status, 200)
+
+    async def test_null_origin_needs_opt_in(self):
+        self.server.allow_null_origin = False
+        status, _ = await http(self.port, "POST", "/analyze", mass_damper_request(), origin="null")
+        self.assertEqual(status, 403)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from scipy.integrate import solve_ivp
+from lib_sim import *
+from lib_probes import Probes, Max, RMS
+
+
+def forced_oscillator(road):
+    def fun(t, y):
+        w = 2 * np.pi * 5.0
+        return [y[1], -w**2 * (y[0] - road(t)[0]) - 0.5 * y[1]]
+    return fun
+
+
+def oscillator(t, y):
+    # lightly damped oscillator, 5 Hz
+    w = 2 * np.pi * 5.0
+    return [y[1], -w**2 * y[0] - 0.5 * y[1]]
+
+
+class Test_DenseOutput(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.y0 = [1.0, 0.0]
+        self.res = simulate(oscillator, (0.0, 2.0), self.y0, rtol=1e-8, atol=1e-10, names=["x", "v"])
+
+    def test_matches_solve_ivp(self):
+        t = np.linspace(0.0, 2.0, 1001)
+        ref = solve_ivp(oscillator, (0.0, 2.0), self.y0, t_eval=t, rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(self.res(t), ref.y, atol=1e-6)
+        self.assertTrue(self.res.success)
+
+    def test_memory_follows_steps(self):
+        # far fewer stored steps than the 250k point t_eval grid of ode_solve_QC.py
+        self.assertLess(len(self.res.t_steps), 5000)
+        t, y = self.res.resample(dt=1e-5)
+        self.assertEqual(y.shape, (2, len(t)))
+
+    def test_minmax_keeps_peaks(self):
+        t_fine = np.linspace(0.0, 2.0, 200_001)
+        x_fine = self.res.state("x", t_fine)
+        t, x = self.res.plot_data("x", n_points=400)
+        self.assertLessEqual(len(t), 400)
+        self.assertTrue(np.all(np.diff(t) >= 0))
+        self.assertAlmostEqual(x.max(), x_fine.max(), places=3)
+        self.assertAlmostEqual(x.min(), x_fine.min(), places=3)
+
+    def test_lttb(self):
+        t, x = self.res.plot_data("x", n_points=300, method="lttb")
+        self.assertEqual(len(t), 300)
+        self.assertEqual(t[0], 0.0)
+        self.assertEqual(t[-1], 2.0)
+
+    def test_without_dense_output(self):
+        res = simulate(oscillator, (0.0, 2.0), self.y0, names=["x", "v"], keep_dense=False)
+        self.assertIsNone(res.sol)
+        for call in (lambda: res(1.0), lambda: res.resample(n=10),
+                     lambda: res.plot_data("x"), lambda: res.plot_data("x", method="lttb")):
+            with self.assertRaisesRegex(ValueError, "keep_dense"):
+                call()
+
+    def test_decimate_functions(self):
+        t = np.linspace(0, 1, 10_000)
+        y = np.sin(40 * t)
+        td, yd = decimate_minmax(t, y, 100)
+        self.assertEqual(len(td), 200)
+        self.assertAlmostEqual(yd.max(), y.max())
+        tl, yl = lttb(t, y, 50)
+        self.assertEqual(len(tl), 50)
+
+
+class Test_Checkpoint(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "run.ckpt")
+        t = np.linspace(0.0, 2.0, 401)
+        self.road = TableInput(t, 0.01 * np.sin(2 * np.pi * 3 * t))
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def make_sim(self, method, road, probes):
+        return Simulation(forced_oscillator(road), (0.0, 2.0), [1.0, 0.0], method=method, names=["x", "v"],
+                          probes=probes, sources=[road], checkpoint_path=self.path,
+                          checkpoint_every=0.25, rtol=1e-8, atol=1e-10)
+
+    def make_probes(self):
+        return Probes(names=["x", "v"]).add("x", Max()).add("v", RMS())
+
+    def test_resume_is_identical(self):
+        for method in ("RK45", "DOP853", "Radau", "BDF"):
+            probes = self.make_probes()
+            sim = self.make_sim(method, self.road, probes)
+            while sim.solver.t < 1.1:
+                sim.step()
+            # the run "crashes" here, the latest checkpoint on disk is from t >= 1.0
+            crash = self.path + ".crash"
+            os.replace(self.path, crash)
+            sim.run()
+            ref, ref_probes = sim.solver, probes.results()
+
+            road = TableInput(self.road.t, self.road.values)
+            probes2 = self.make_probes()
+            resumed = Simulation.from_checkpoint(crash, forced_oscillator(road), probes=probes2, sources=[road])
+            self.assertTrue(1.0 <= resumed.t_span[0] < 1.1 + 0.1)
+            res = resumed.run()
+            self.assertTrue(res.success)
+            self.assertEqual(res.t_span, (resumed.t_span[0], 2.0))
+            np.testing.assert_array_equal(resumed.solver.y, ref.y, err_msg=method)
+            self.assertEqual(probes2.results(), ref_probes, msg=method)
+
+    def test_fork(self):
+        sim = self.make_sim("RK45", self.road, None)
+        while sim.solver.t < 1.0:
+            sim.step()
+        state = sim.checkpoint()
+        t0, y0 = sim.solver.t, sim.solver.y.copy()
+        stiffer = lambda t, y: [y[1], -(2 * np.pi * 8.0)**2 * y[0]]
+        fork = Simulation.from_checkpoint(state, stiffer, sources=[self.road], fork=True, t_end=1.5)
+        res = fork.run()
+        ref = solve_ivp(stiffer, (t0, 1.5), y0, rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(res(1.5), ref.y[:, -1], atol=1e-6)
+        # the original run is unaffected and can continue
+        sim.run()
+        self.assertEqual(sim.solver.t, 2.0)
+
+    def test_table_input(self):
+        road = TableInput([0.0, 1.0, 2.0], [0.0, 1.0, 0.0])
+        self.assertAlmostEqual(road(1.5)[0], 0.5)
+        self.assertEqual(road.state(), 1)
+        self.assertAlmostEqual(road(0.25)[0], 0.25)
+        self.assertEqual(road.state(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import random
+import time
+import unittest
+import numpy as np
+from lib_spatial import SpatialGrid, density_raster, fit_bounds
+
+
+class Test_SpatialGrid(unittest.TestCase):
+
+    def test_points_and_boxes(self):
+        grid = SpatialGrid(cell_size=10.0)
+        grid.insert("a", 5.0, 5.0)
+        grid.insert("b", -15.0, 3.0)
+        grid.insert("e", 0.0, 0.0, 35.0, 8.0)
+        self.assertEqual(grid.near(4.0, 4.0, 2.0), {"a", "e"})
+        self.assertEqual(grid.query(-20.0, 0.0, -10.0, 10.0), {"b"})
+        self.assertEqual(grid.query(30.0, 7.0, 50.0, 20.0), {"e"})
+        self.assertEqual(grid.query(100.0, 100.0, 0.0, 0.0), {"a", "e"})
+        self.assertEqual(grid.query(36.0, 0.0, 40.0, 5.0), set())
+
+        grid.insert("a", 55.0, 5.0)
+        self.assertEqual(grid.near(5.0, 5.0, 1.0), {"e"})
+        self.assertEqual(grid.near(55.0, 5.0, 1.0), {"a"})
+        grid.remove("e")
+        self.assertNotIn("e", grid)
+        self.assertEqual(len(grid), 2)
+        self.assertEqual(grid.query(-1000.0, -1000.0, 1000.0, 1000.0), {"a", "b"})
+        grid.discard("e")
+        grid.clear()
+        self.assertEqual(grid.cells, {})
+        with self.assertRaises(ValueError):
+            SpatialGrid(cell_size=0)
+
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        grid = SpatialGrid(cell_size=50.0)
+        points = {}
+        for key in range(2000):
+            points[key] = (rng.uniform(-1000, 1000), rng.uniform(-1000, 1000))
+            grid.insert(key, *points[key])
+        for key in range(0, 2000, 3):
+            points[key] = (rng.uniform(-1000, 1000), rng.uniform(-1000, 1000))
+            grid.insert(key, *points[key])
+        for _ in range(50):
+            x1, x2 = sorted(rng.uniform(-1200, 1200) for _ in range(2))
+            y1, y2 = sorted(rng.uniform(-1200, 1200) for _ in range(2))
+            expected = {k for k, (x, y) in points.items() if x1 <= x <= x2 and y1 <= y <= y2}
+            self.assertEqual(grid.query(x1, y1, x2, y2), expected)
+
+    def test_local_queries_do_not_scan(self):
+        grid = SpatialGrid(cell_size=100.0)
+        for i in range(300):
+            for j in range(300):
+                grid.insert((i, j), i * 100.0, j * 100.0)
+        start = time.perf_counter()
+        for _ in range(1000):
+            self.assertEqual(grid.near(5000.0, 5000.0, 10.0), {(50, 50)})
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+
+class Test_Overview(unittest.TestCase):
+
+    def test_fit_bounds(self):
+        x0, y0, scale = fit_bounds([0.0, 200.0], [0.0, 50.0], 160, 120)
+        # the wide side fills the image, the other is centered
+        self.assertAlmostEqual((200.0 - 0.0) * scale, 160 / 1.1)
+        self.assertAlmostEqual((0.0 - x0) * scale + (200.0 - x0) * scale, 160)
+        self.assertAlmostEqual((0.0 - y0) * scale + (50.0 - y0) * scale, 120)
+        self.assertEqual(fit_bounds([], [], 160, 120), (0.0, 0.0, 1.0))
+
+    def test_density_raster(self):
+        xs = [0.0, 100.0, 100.0, 100.0, 5000.0]
+        ys = [0.0, 50.0, 50.0, 50.0, 5000.0]
+        bounds = fit_bounds(xs[:4], ys[:4], 40, 30)
+        raster = density_raster(xs, ys, 40, 30, bounds)
+        self.assertEqual(raster.shape, (30, 40))
+        self.assertEqual(raster.dtype, np.uint8)
+        # two occupied pixels, the point outside the bounds is dropped
+        self.assertEqual(np.count_nonzero(raster), 2)
+        self.assertEqual(raster.max(), 255)
+        self.assertGreater(raster[raster > 0].min(), 0)
+        self.assertFalse(density_raster([], [], 40, 30, bounds).any())
+
+
+if __name__ == '__main__':
+    unittest.main()
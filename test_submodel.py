@@ -0,0 +1,100 @@
+import unittest
+import numpy as np
+from lib_bonds import *
+from lib_linear import SparseJunctionStructure
+from lib_submodel import *
+from test_linear import quarter_car_edges, QC_PARAMS
+
+
+def corner_submodel() -> Submodel:
+    # the quarter car without its share of the body: road velocity in, suspension force out
+    edge_list = [
+        (1, "P_road", "0_a", 1),
+        (2, "0_a", "C_t", 1),
+        (3, "0_a", "1_a", 1),
+        (4, "1_a", "SE_a", 1),
+        (5, "1_a", "I_a", 1),
+        (6, "1_a", "0_b", 1),
+        (7, "0_b", "1_b", 1),
+        (8, "1_b", "R_a", 1),
+        (9, "1_b", "C_s", 1),
+        (10, "0_b", "P_body", 1),
+    ]
+    es = [FlyEdge(num, src, dest, pwr_to_dest=pwr) for num, src, dest, pwr in edge_list]
+    return Submodel("corner", es, ports={"road": "flow", "body": "flow"})
+
+
+CORNER_PARAMS = {k: v for k, v in QC_PARAMS.items() if k != "I_12"}
+
+
+class Test_Submodel(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.corner = corner_submodel()
+
+    def test_bad_ports(self):
+        es = [FlyEdge(1, "P_road", "0_a"), FlyEdge(2, "0_a", "C_t")]
+        with self.assertRaises(ValueError):
+            Submodel("bad", es, ports={"road": "flow", "body": "flow"})
+        with self.assertRaises(ValueError):
+            Submodel("bad", es, ports={"road": "pressure"})
+
+    def test_single_corner_is_the_quarter_car(self):
+        comp = Composite([FlyEdge(1, "1_body", "SE_b"), FlyEdge(2, "1_body", "I_b")])
+        fl = comp.add_instance("fl", self.corner, {"road": "SF_fl", "body": "1_body"})
+        params = dict(fl.params(CORNER_PARAMS), I_02=QC_PARAMS["I_12"])
+        ss = SparseJunctionStructure(comp).state_space(params)
+        ref = SparseJunctionStructure(quarter_car_edges()).state_space(QC_PARAMS)
+        np.testing.assert_allclose(np.sort_complex(np.linalg.eigvals(ss.A.toarray())),
+                                   np.sort_complex(np.linalg.eigvals(ref.A.toarray())), rtol=1e-10)
+
+    def test_full_vehicle_reuses_derivation(self):
+        comp = Composite([FlyEdge(1, "1_body", "SE_g"), FlyEdge(2, "1_body", "I_body")])
+        for name in ("fl", "fr", "rl", "rr"):
+            comp.add_instance(name, self.corner, {"road": f"SF_{name}", "body": "1_body"})
+        equations, sm = comp.generate_symbols()
+        self.assertEqual(self.corner.n_derivations, 1)
+        self.assertEqual(len(comp.edges()), 2 + 4 * 10)
+        self.assertEqual(comp.instances["rr"].port_bond("body"), 50)
+
+        # the same equations as deriving the flat graph from scratch
+        flat_equations, flat_sm = generate_symbols(list(comp))
+        self.assertEqual(set(equations), set(flat_equations))
+        self.assertEqual(set(sm.symbols), set(flat_sm.symbols))
+
+        params = {"I_02": 1280.0}
+        for inst in comp.instances.values():
+            params.update(inst.params(CORNER_PARAMS))
+        ss = SparseJunctionStructure(comp).state_space(params)
+        self.assertEqual(ss.n_states, 1 + 4 * 3)
+
+    def test_widths_without_flattening(self):
+        comp = Composite([FlyEdge(1, "1_body", "SE_g"), FlyEdge(2, "1_body", "I_body")])
+        for name in ("fl", "fr"):
+            comp.add_instance(name, self.corner, {"road": f"SF_{name}", "body": "1_body"})
+        SparseJunctionStructure(comp)
+        self.assertNotIn("edges", comp._cache)
+        self.assertEqual(comp.bond_widths(), bond_widths(list(comp)))
+
+    def test_causality_conflict(self):
+        # an SE at the body port imposes effort where the corner expects flow
+        comp = Composite()
+        comp.add_instance("fl", self.corner, {"road": "SF_fl", "body": "SE_body"})
+        with self.assertRaises(ValueError):
+            comp.generate_symbols()
+
+    def test_nested(self):
+        axle = Composite([FlyEdge(1, "1_axle", "P_body")])
+        for name in ("l", "r"):
+            axle.add_instance(name, self.corner, {"road": f"P_{name}", "body": "1_axle"})
+        axle_def = axle.as_submodel("axle", ports={"body": "flow", "l": "flow", "r": "flow"})
+        comp = Composite([FlyEdge(1, "1_body", "I_body")])
+        comp.add_instance("front", axle_def, {"body": "1_body", "l": "SF_fl", "r": "SF_fr"})
+        comp.add_instance("rear", axle_def, {"body": "1_body", "l": "SF_rl", "r": "SF_rr"})
+        equations, sm = comp.generate_symbols()
+        self.assertEqual(axle_def.n_derivations, 1)
+        self.assertEqual(len(equations), len([n for n in sm.symbols if n.startswith(("e_", "f_", "pdot_", "qdot_"))]))
+
+
+if __name__ == '__main__':
+    unittest.main()